@@ -1,17 +1,40 @@
 import os
+import base64
 import json
+import queue
+import socket
 import threading
 import time
 import requests
-from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from pathlib import Path
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import bindparam, delete, event, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, load_only
 from werkzeug.utils import secure_filename
-import psutil
-from app.transcoder import VideoTranscoder
+from app.transcoder import PLAYLIST_NAMES, VideoTranscoder, parse_renditions
 from app.watcher import FolderWatcher
+from app.scheduler import JobScheduler, default_slot_count
+from app.cluster import ChunkCoordinator, HttpTransport, LocalTransport, encode_chunk
+from app.progress import ProgressTracker
+from app.events import ChangeFeed, EventBroker
+from app.monitor import SystemSampler
+from app.autotune import Autotuner, HostTuning
+from app.schema import upgrade_schema
+from app.settings_store import VERSION_KEY, SettingsStore
+from app.profiles import PROFILE_FIELDS, PROFILES_VERSION_KEY, ProfileStore, parse_profile
+from app.file_index import quick_fingerprint, scan_tree
+from app.probe_cache import ProbeCache
+from app.rag_cache import RagCache, rag_cache_key
+from app.rag_client import RagBusy, RagClient, RagUnavailable
+from app.circuit_breaker import CircuitBreaker, LatencyTracker
+from app.result_cache import cache_key, full_hash, reuse_output, settings_key
+from app.metrics import REGISTRY
 from app.config import Config
 
 app = Flask(__name__)
@@ -27,28 +50,154 @@ watcher = None
 # Database Models
 class TranscodeJob(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    source_file = db.Column(db.String(500), nullable=False)
+    source_file = db.Column(db.String(500), nullable=False, index=True)
     output_file = db.Column(db.String(500))
-    status = db.Column(db.String(50), default='pending')
+    status = db.Column(db.String(50), default='pending', index=True)
+    priority = db.Column(db.Integer, default=0, server_default='0')
+    claimed_by = db.Column(db.String(255))
+    lease_expires_at = db.Column(db.DateTime)
+    attempts = db.Column(db.Integer, default=0, server_default='0')
     progress = db.Column(db.Float, default=0.0)
     error_message = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     started_at = db.Column(db.DateTime)
     completed_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    reused_job_id = db.Column(db.Integer)
+    encode_mode = db.Column(db.String(20))
+    profile_id = db.Column(db.Integer, db.ForeignKey('encode_profile.id'), index=True)
+    encode_fps = db.Column(db.Float)
+    encode_speed = db.Column(db.Float)
+    encode_bitrate = db.Column(db.Float)  # kbit/s
+    eta_seconds = db.Column(db.Float)
+    
+    # Fields exposed by the API, in output order
+    API_FIELDS = (
+        'id', 'source_file', 'output_file', 'status', 'priority', 'claimed_by',
+        'attempts', 'progress', 'error_message', 'created_at', 'started_at', 'completed_at',
+        'reused_job_id', 'encode_mode', 'profile_id',
+        'encode_fps', 'encode_speed', 'encode_bitrate', 'eta_seconds'
+    )
+    
+    # Encode stat columns and their key in EncodeStats.summary()
+    STATS_FIELDS = {
+        'encode_fps': 'fps',
+        'encode_speed': 'speed',
+        'encode_bitrate': 'bitrate',
+        'eta_seconds': 'eta',
+    }
+    
+    def to_dict(self, fields=None):
+        data = {}
+        stats = None
+        for field in fields or self.API_FIELDS:
+            value = getattr(self, field)
+            if field == 'progress':
+                value = progress_tracker.get(self.id, value)
+            elif field in self.STATS_FIELDS:
+                if stats is None:
+                    stats = progress_tracker.get_stats(self.id) or {}
+                value = stats.get(self.STATS_FIELDS[field], value)
+            elif isinstance(value, datetime):
+                value = value.isoformat()
+            data[field] = value
+        return data
+
+class EncodeProfile(db.Model):
+    """Named encode settings that jobs can reference instead of the global ones"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), unique=True, nullable=False)
+    folder = db.Column(db.String(500))
+    video_codec = db.Column(db.String(50))
+    audio_codec = db.Column(db.String(50))
+    audio_bitrate = db.Column(db.String(20))
+    preset = db.Column(db.String(50))
+    crf = db.Column(db.Integer)
+    max_height = db.Column(db.Integer)
+    threads = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        data = {'id': self.id, 'name': self.name, 'folder': self.folder}
+        for field in PROFILE_FIELDS:
+            data[field] = getattr(self, field)
+        return data
+
+class TranscodeChunk(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('transcode_job.id'), nullable=False, index=True)
+    chunk_index = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.Float)
+    end_time = db.Column(db.Float)
+    status = db.Column(db.String(50), default='pending')
+    attempts = db.Column(db.Integer, default=0)
+    worker = db.Column(db.String(255))
+    error_message = db.Column(db.Text)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     def to_dict(self):
         return {
             'id': self.id,
-            'source_file': self.source_file,
-            'output_file': self.output_file,
+            'job_id': self.job_id,
+            'chunk_index': self.chunk_index,
+            'start_time': self.start_time,
+            'end_time': self.end_time,
             'status': self.status,
-            'progress': self.progress,
+            'attempts': self.attempts,
+            'worker': self.worker,
             'error_message': self.error_message,
-            'created_at': self.created_at.isoformat() if self.created_at else None,
-            'started_at': self.started_at.isoformat() if self.started_at else None,
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class SourceFile(db.Model):
+    """Video files found by folder scans"""
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500), unique=True, nullable=False)
+    size = db.Column(db.BigInteger)
+    mtime = db.Column(db.Float)
+    inode = db.Column(db.BigInteger)
+    fingerprint = db.Column(db.String(64), index=True)
+    content_hash = db.Column(db.String(64))
+    probe = db.Column(db.Text)
+    seen_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TranscodeOutput(db.Model):
+    """One rendition written by a ladder job"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('transcode_job.id'), nullable=False, index=True)
+    label = db.Column(db.String(20), nullable=False)
+    height = db.Column(db.Integer)
+    output_file = db.Column(db.String(500), nullable=False)
+    size = db.Column(db.BigInteger)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'label': self.label,
+            'height': self.height,
+            'output_file': self.output_file,
+            'size': self.size
         }
 
+class TranscodeResult(db.Model):
+    """Finished outputs keyed by source content and encode settings"""
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(128), unique=True, nullable=False)
+    output_file = db.Column(db.String(500), nullable=False)
+    output_size = db.Column(db.BigInteger)
+    output_mtime = db.Column(db.Float)
+    job_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class ScannedDirectory(db.Model):
+    """Directories under the source folder and when they were last listed"""
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(500), unique=True, nullable=False)
+    parent = db.Column(db.String(500), index=True)
+    mtime = db.Column(db.Float)
+    scanned_at = db.Column(db.Float)
+
 class Settings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(100), unique=True, nullable=False)
@@ -56,22 +205,92 @@ class Settings(db.Model):
     
     @staticmethod
     def get_value(key, default=None):
-        setting = Settings.query.filter_by(key=key).first()
-        return setting.value if setting else default
+        return settings_store.get_raw(key, default)
     
     @staticmethod
     def set_value(key, value):
-        setting = Settings.query.filter_by(key=key).first()
-        if setting:
-            setting.value = value
-        else:
-            setting = Settings(key=key, value=value)
-            db.session.add(setting)
+        settings_store.update({key: value})
+
+def load_settings():
+    """Read every stored setting as raw strings"""
+    with app.app_context():
+        return {setting.key: setting.value for setting in Settings.query.all()}
+
+def read_settings_version():
+    with app.app_context():
+        return db.session.query(Settings.value).filter_by(key=VERSION_KEY).scalar()
+
+def save_settings(raw_values):
+    """Upsert several settings in one transaction"""
+    with app.app_context():
+        existing = {
+            setting.key: setting
+            for setting in Settings.query.filter(Settings.key.in_(raw_values)).all()
+        }
+        for key, value in raw_values.items():
+            if key in existing:
+                existing[key].value = value
+            else:
+                db.session.add(Settings(key=key, value=value))
         db.session.commit()
 
+settings_store = SettingsStore(
+    load_settings,
+    read_settings_version,
+    save_settings,
+    check_interval=app.config['SETTINGS_CHECK_INTERVAL']
+)
+
+def load_profiles():
+    with app.app_context():
+        return [profile.to_dict() for profile in EncodeProfile.query.all()]
+
+def read_profiles_version():
+    with app.app_context():
+        return db.session.query(Settings.value).filter_by(key=PROFILES_VERSION_KEY).scalar()
+
+def write_profiles_version(version):
+    save_settings({PROFILES_VERSION_KEY: version})
+
+profile_store = ProfileStore(
+    load_profiles,
+    read_profiles_version,
+    write_profiles_version,
+    check_interval=app.config['SETTINGS_CHECK_INTERVAL']
+)
+
+def folder_profile_id(path):
+    """Id of the profile assigned to a source file's folder, if any"""
+    profile = profile_store.for_source(path)
+    return profile['id'] if profile else None
+
 # Initialize database
 with app.app_context():
     db.create_all()
+    upgrade_schema(db)
+
+# Metrics, summed over every worker process of this host
+REGISTRY.share(os.path.join(app.config['RUN_DIR'], 'metrics'))
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    'transcode_queue_wait_seconds', 'Time jobs spent queued before a worker started them'
+)
+JOB_SECONDS = REGISTRY.histogram(
+    'transcode_job_seconds', 'Time from a worker starting a job until it finished', labels=('status',)
+)
+DB_COMMIT_SECONDS = REGISTRY.histogram('db_commit_seconds', 'Time spent committing database sessions')
+RAG_PROXY_SECONDS = REGISTRY.histogram(
+    'rag_proxy_seconds', 'Time spent waiting on the RAG service', labels=('outcome',)
+)
+
+@event.listens_for(Session, 'before_commit')
+def start_commit_timer(session):
+    session.info['commit_started'] = time.perf_counter()
+
+@event.listens_for(Session, 'after_commit')
+def stop_commit_timer(session):
+    started = session.info.pop('commit_started', None)
+    if started is not None:
+        DB_COMMIT_SECONDS.observe(time.perf_counter() - started)
 
 # Routes
 @app.route('/')
@@ -81,16 +300,7 @@ def index():
 @app.route('/api/settings', methods=['GET'])
 def get_settings():
     """Get current settings"""
-    return jsonify({
-        'source_folder': Settings.get_value('source_folder', ''),
-        'output_folder': Settings.get_value('output_folder', ''),
-        'watch_enabled': Settings.get_value('watch_enabled', 'false') == 'true',
-        'output_format': Settings.get_value('output_format', 'mp4'),
-        'video_codec': Settings.get_value('video_codec', 'libx264'),
-        'audio_codec': Settings.get_value('audio_codec', 'aac'),
-        'preset': Settings.get_value('preset', 'medium'),
-        'crf': Settings.get_value('crf', '23')
-    })
+    return jsonify(settings_store.all())
 
 @app.route('/api/settings', methods=['POST'])
 def update_settings():
@@ -112,21 +322,29 @@ def update_settings():
         except Exception as e:
             return jsonify({'error': f'Cannot create output folder: {str(e)}'}), 400
     
+    try:
+        crf = int(data.get('crf', 23))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'CRF must be a number'}), 400
+    
     # Save settings
-    Settings.set_value('source_folder', source_folder)
-    Settings.set_value('output_folder', output_folder)
-    Settings.set_value('watch_enabled', 'true' if data.get('watch_enabled') else 'false')
-    Settings.set_value('output_format', data.get('output_format', 'mp4'))
-    Settings.set_value('video_codec', data.get('video_codec', 'libx264'))
-    Settings.set_value('audio_codec', data.get('audio_codec', 'aac'))
-    Settings.set_value('preset', data.get('preset', 'medium'))
-    Settings.set_value('crf', str(data.get('crf', 23)))
+    settings_store.update({
+        'source_folder': source_folder,
+        'output_folder': output_folder,
+        'watch_enabled': bool(data.get('watch_enabled')),
+        'output_format': data.get('output_format', 'mp4'),
+        'video_codec': data.get('video_codec', 'libx264'),
+        'audio_codec': data.get('audio_codec', 'aac'),
+        'preset': data.get('preset', 'medium'),
+        'crf': crf,
+        'renditions': ','.join(f'{height}' for height in parse_renditions(data.get('renditions')))
+    })
     
     # Restart watcher if enabled
     if data.get('watch_enabled') and source_folder:
         if watcher:
             watcher.stop()
-        watcher = FolderWatcher(source_folder, on_new_file)
+        watcher = create_watcher(source_folder)
         watcher.start()
     elif watcher:
         watcher.stop()
@@ -134,17 +352,163 @@ def update_settings():
     
     return jsonify({'message': 'Settings updated successfully'})
 
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """List encode profiles"""
+    return jsonify(profile_store.all())
+
+@app.route('/api/profiles', methods=['POST'])
+def create_profile():
+    """Create an encode profile"""
+    values, error = parse_profile(request.json or {})
+    if error:
+        return jsonify({'error': error}), 400
+    if EncodeProfile.query.filter_by(name=values['name']).first():
+        return jsonify({'error': 'A profile with this name already exists'}), 400
+    
+    profile = EncodeProfile(**values)
+    db.session.add(profile)
+    db.session.commit()
+    profile_store.changed()
+    
+    return jsonify(profile.to_dict()), 201
+
+@app.route('/api/profiles/<int:profile_id>', methods=['PUT'])
+def update_profile(profile_id):
+    """Update an encode profile; jobs that have not started pick up the change"""
+    profile = EncodeProfile.query.get_or_404(profile_id)
+    values, error = parse_profile(request.json or {}, profile.to_dict())
+    if error:
+        return jsonify({'error': error}), 400
+    duplicate = EncodeProfile.query.filter(
+        EncodeProfile.name == values['name'], EncodeProfile.id != profile_id
+    ).first()
+    if duplicate:
+        return jsonify({'error': 'A profile with this name already exists'}), 400
+    
+    values.pop('id', None)
+    for field, value in values.items():
+        setattr(profile, field, value)
+    db.session.commit()
+    profile_store.changed()
+    
+    return jsonify(profile.to_dict())
+
+@app.route('/api/profiles/<int:profile_id>', methods=['DELETE'])
+def delete_profile(profile_id):
+    """Delete an encode profile that no unfinished job uses"""
+    profile = EncodeProfile.query.get_or_404(profile_id)
+    in_use = TranscodeJob.query.filter(
+        TranscodeJob.profile_id == profile_id,
+        TranscodeJob.status.in_(('pending', 'processing'))
+    ).count()
+    if in_use:
+        return jsonify({'error': f'Profile is used by {in_use} unfinished job(s)'}), 400
+    
+    TranscodeJob.query.filter_by(profile_id=profile_id).update({'profile_id': None})
+    db.session.delete(profile)
+    db.session.commit()
+    profile_store.changed()
+    
+    return jsonify({'message': 'Profile deleted successfully'})
+
 @app.route('/api/jobs', methods=['GET'])
 def get_jobs():
-    """Get all transcode jobs"""
-    status = request.args.get('status')
+    """Get transcode jobs, newest first, one page at a time
+    
+    Query parameters:
+        status: comma-separated statuses to include
+        source_prefix: only jobs whose source file path starts with this
+        created_after, created_before: ISO 8601 timestamps
+        fields: comma-separated job fields to return (default: all)
+        limit: page size
+        cursor: next_cursor returned with the previous page
+    """
     query = TranscodeJob.query
     
+    try:
+        fields = parse_job_fields(request.args.get('fields'))
+        limit = max(1, min(
+            int(request.args.get('limit', app.config['JOBS_PAGE_SIZE'])),
+            app.config['JOBS_MAX_PAGE_SIZE']
+        ))
+        created_after = parse_timestamp(request.args.get('created_after'))
+        created_before = parse_timestamp(request.args.get('created_before'))
+        cursor = decode_job_cursor(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    status = request.args.get('status')
     if status:
-        query = query.filter_by(status=status)
+        query = query.filter(TranscodeJob.status.in_(status.split(',')))
+    
+    source_prefix = request.args.get('source_prefix')
+    if source_prefix:
+        # A range instead of LIKE so the source_file index can be used
+        query = query.filter(
+            TranscodeJob.source_file >= source_prefix,
+            TranscodeJob.source_file < source_prefix + '\uffff'
+        )
+    
+    if created_after:
+        query = query.filter(TranscodeJob.created_at >= created_after)
+    if created_before:
+        query = query.filter(TranscodeJob.created_at < created_before)
+    
+    if cursor:
+        cursor_created_at, cursor_id = cursor
+        query = query.filter(or_(
+            TranscodeJob.created_at < cursor_created_at,
+            (TranscodeJob.created_at == cursor_created_at) & (TranscodeJob.id < cursor_id)
+        ))
+    
+    columns = {'created_at', *fields} - {'id'}
+    jobs = query.options(
+        load_only(*[getattr(TranscodeJob, column) for column in columns])
+    ).order_by(
+        TranscodeJob.created_at.desc(),
+        TranscodeJob.id.desc()
+    ).limit(limit + 1).all()
     
-    jobs = query.order_by(TranscodeJob.created_at.desc()).all()
-    return jsonify([job.to_dict() for job in jobs])
+    next_cursor = None
+    if len(jobs) > limit:
+        jobs = jobs[:limit]
+        next_cursor = encode_job_cursor(jobs[-1])
+    
+    return jsonify({
+        'jobs': [job.to_dict(fields) for job in jobs],
+        'next_cursor': next_cursor
+    })
+
+def parse_job_fields(value):
+    if not value:
+        return TranscodeJob.API_FIELDS
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = set(fields) - set(TranscodeJob.API_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid timestamp: {value}")
+
+def encode_job_cursor(job):
+    raw = f"{job.created_at.isoformat()}|{job.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_job_cursor(value):
+    if not value:
+        return None
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(value.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(job_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
 
 @app.route('/api/jobs/<int:job_id>', methods=['GET'])
 def get_job(job_id):
@@ -161,12 +525,34 @@ def create_job():
     if not source_file or not os.path.exists(source_file):
         return jsonify({'error': 'Source file does not exist'}), 400
     
-    job = TranscodeJob(source_file=source_file, status='pending')
+    if data.get('profile') is not None:
+        profile = profile_store.find(data['profile'])
+        if not profile:
+            return jsonify({'error': 'Unknown profile'}), 400
+        profile_id = profile['id']
+    else:
+        profile_id = folder_profile_id(source_file)
+    
+    try:
+        priority = int(data.get('priority', 0))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'priority must be an integer'}), 400
+    
+    if queue_capacity() == 0:
+        return jsonify({'error': 'Job queue is full, try again later'}), 429
+    
+    job = TranscodeJob(
+        source_file=source_file,
+        status='pending',
+        priority=priority,
+        profile_id=profile_id
+    )
     db.session.add(job)
     db.session.commit()
     
-    # Start transcoding in background
-    threading.Thread(target=process_job, args=(job.id,), daemon=True).start()
+    # Hand the job to the scheduler
+    scheduler.notify()
+    publish_job(job)
     
     return jsonify(job.to_dict()), 201
 
@@ -178,70 +564,321 @@ def delete_job(job_id):
     if job.status == 'processing':
         return jsonify({'error': 'Cannot delete job in progress'}), 400
     
+    TranscodeChunk.query.filter_by(job_id=job.id).delete()
+    TranscodeOutput.query.filter_by(job_id=job.id).delete()
     db.session.delete(job)
     db.session.commit()
+    event_broker.publish('job_deleted', {'id': job_id})
     
     return jsonify({'message': 'Job deleted successfully'})
 
+@app.route('/api/jobs/<int:job_id>/chunks', methods=['GET'])
+def get_job_chunks(job_id):
+    """Get the state of a job's distributed chunks"""
+    TranscodeJob.query.get_or_404(job_id)
+    chunks = TranscodeChunk.query.filter_by(job_id=job_id).order_by(TranscodeChunk.chunk_index).all()
+    return jsonify([chunk.to_dict() for chunk in chunks])
+
+@app.route('/api/jobs/<int:job_id>/outputs', methods=['GET'])
+def get_job_outputs(job_id):
+    """Get the renditions written by a ladder job"""
+    TranscodeJob.query.get_or_404(job_id)
+    outputs = TranscodeOutput.query.filter_by(job_id=job_id).order_by(TranscodeOutput.height.desc()).all()
+    return jsonify([output.to_dict() for output in outputs])
+
+# Content types of streaming files that mimetypes may not know
+STREAM_MIMETYPES = {
+    '.m3u8': 'application/vnd.apple.mpegurl',
+    '.mpd': 'application/dash+xml',
+    '.ts': 'video/mp2t',
+    '.m4s': 'video/iso.segment',
+}
+
+@app.route('/media/<path:filename>')
+def serve_media(filename):
+    """Serve files from the output folder, including HLS/DASH outputs still being written"""
+    output_folder = settings_store.get('output_folder')
+    if not output_folder:
+        return jsonify({'error': 'Output folder not configured'}), 404
+    
+    extension = os.path.splitext(filename)[1].lower()
+    # Playlists change while a job runs; segments never change once written
+    max_age = 0 if extension in ('.m3u8', '.mpd') else 3600
+    response = send_from_directory(
+        output_folder, filename, mimetype=STREAM_MIMETYPES.get(extension), max_age=max_age
+    )
+    if max_age == 0:
+        response.cache_control.no_cache = True
+    return response
+
 @app.route('/api/scan', methods=['POST'])
 def scan_folder():
-    """Scan source folder for new videos"""
-    source_folder = Settings.get_value('source_folder')
+    """Scan source folder for new videos
+    
+    Only directories whose contents changed since the previous scan are
+    listed again; pass ?full=1 to list every directory.
+    """
+    source_folder = settings_store.get('source_folder')
     
     if not source_folder or not os.path.exists(source_folder):
         return jsonify({'error': 'Source folder not configured or does not exist'}), 400
     
-    video_extensions = {'.mp4', '.avi', '.mkv', '.mov', '.flv', '.wmv', '.m4v', '.webm'}
-    new_files = []
+    full = request.args.get('full') in ('1', 'true')
+    scanned_at = time.time()
+    
+    known_dirs = load_directory_index()
+    result = scan_tree(source_folder, set(app.config['SUPPORTED_VIDEO_FORMATS']), known_dirs, full)
     
-    for root, dirs, files in os.walk(source_folder):
-        for file in files:
-            if Path(file).suffix.lower() in video_extensions:
-                file_path = os.path.join(root, file)
-                # Check if already in database
-                existing = TranscodeJob.query.filter_by(source_file=file_path).first()
-                if not existing:
-                    new_files.append(file_path)
+    # One set difference against every path that already has a job
+    known_paths = {path for (path,) in db.session.query(TranscodeJob.source_file)}
+    new_files = sorted(set(result.files) - known_paths)
+    
+    # Only admit as many jobs as the queue has room for
+    capacity = queue_capacity()
+    skipped_files = []
+    if capacity is not None and len(new_files) > capacity:
+        skipped_files = new_files[capacity:]
+        new_files = new_files[:capacity]
+    skipped = len(skipped_files)
+    
+    # Directories with skipped files are listed again next time
+    unfinished_dirs = {os.path.dirname(path) for path in skipped_files}
+    update_file_index(result, scanned_at, unfinished_dirs)
     
     # Create jobs for new files
-    jobs_created = []
-    for file_path in new_files:
-        job = TranscodeJob(source_file=file_path, status='pending')
-        db.session.add(job)
-        jobs_created.append(job)
+    jobs_created = [
+        TranscodeJob(source_file=file_path, status='pending', profile_id=folder_profile_id(file_path))
+        for file_path in new_files
+    ]
+    db.session.add_all(jobs_created)
     
     db.session.commit()
     
+    # Probe new files in the background so workers find them in the cache
+    probe_queued = 0
+    if app.config['PROBE_ON_SCAN'] and new_files:
+        scan_prober.submit(probe_new_files, new_files)
+        probe_queued = len(new_files)
+    
     # Start processing
+    scheduler.notify(len(jobs_created))
     for job in jobs_created:
-        threading.Thread(target=process_job, args=(job.id,), daemon=True).start()
+        publish_job(job)
+    
+    message = f'Found {len(new_files)} new files'
+    if skipped:
+        message += f' ({skipped} more skipped, job queue is full)'
     
     return jsonify({
-        'message': f'Found {len(new_files)} new files',
-        'jobs': [job.to_dict() for job in jobs_created]
+        'message': message,
+        'skipped': skipped,
+        'directories_listed': len(result.listed_dirs),
+        'directories_skipped': result.skipped_dirs,
+        'jobs_created': len(jobs_created),
+        'probe_queued': probe_queued,
+        'jobs': [job.to_dict() for job in jobs_created[:app.config['JOBS_PAGE_SIZE']]]
     })
 
+def load_directory_index():
+    """Directories from previous scans as {path: (mtime, scanned_at, children)}"""
+    rows = db.session.query(
+        ScannedDirectory.path, ScannedDirectory.parent,
+        ScannedDirectory.mtime, ScannedDirectory.scanned_at
+    ).all()
+    
+    children = defaultdict(list)
+    for path, parent, _, _ in rows:
+        if parent:
+            children[parent].append(path)
+    return {path: (mtime, scanned_at or 0.0, children[path]) for path, _, mtime, scanned_at in rows}
+
+def update_file_index(result, scanned_at, unfinished_dirs):
+    """Record a scan in the file and directory index (without committing)"""
+    directories = ScannedDirectory.__table__
+    files = SourceFile.__table__
+    
+    for path in result.removed_dirs:
+        db.session.execute(delete(directories).where(or_(
+            directories.c.path == path,
+            directories.c.path.startswith(path + os.sep, autoescape=True)
+        )))
+    
+    listed = [
+        {
+            'b_path': path,
+            'b_mtime': None if path in unfinished_dirs else mtime,
+            'b_scanned_at': scanned_at
+        }
+        for path, mtime in result.listed_dirs.items()
+    ]
+    existing = [row for row in listed if row['b_path'] not in result.new_dirs]
+    if existing:
+        db.session.execute(
+            update(directories)
+            .where(directories.c.path == bindparam('b_path'))
+            .values(mtime=bindparam('b_mtime'), scanned_at=bindparam('b_scanned_at')),
+            existing
+        )
+    new = [
+        {
+            'path': row['b_path'],
+            'parent': result.new_dirs[row['b_path']],
+            'mtime': row['b_mtime'],
+            'scanned_at': scanned_at
+        }
+        for row in listed if row['b_path'] in result.new_dirs
+    ]
+    if new:
+        db.session.execute(insert(directories), new)
+    
+    if not result.files:
+        return
+    
+    indexed = {
+        path: (size, mtime)
+        for path, size, mtime in db.session.query(SourceFile.path, SourceFile.size, SourceFile.mtime)
+    }
+    new_files = []
+    changed_files = []
+    for path, stat in result.files.items():
+        if path not in indexed:
+            new_files.append({
+                'path': path,
+                'size': stat.st_size,
+                'mtime': stat.st_mtime,
+                'inode': stat.st_ino,
+                'seen_at': datetime.utcnow()
+            })
+        elif indexed[path] != (stat.st_size, stat.st_mtime):
+            # Content changed, the old fingerprint no longer applies
+            changed_files.append({
+                'b_path': path,
+                'b_size': stat.st_size,
+                'b_mtime': stat.st_mtime,
+                'b_inode': stat.st_ino
+            })
+    
+    if new_files:
+        db.session.execute(insert(files), new_files)
+    if changed_files:
+        db.session.execute(
+            update(files)
+            .where(files.c.path == bindparam('b_path'))
+            .values(
+                size=bindparam('b_size'),
+                mtime=bindparam('b_mtime'),
+                inode=bindparam('b_inode'),
+                fingerprint=None,
+                content_hash=None,
+                probe=None
+            ),
+            changed_files
+        )
+
 @app.route('/api/status', methods=['GET'])
 def get_status():
     """Get system status"""
-    total_jobs = TranscodeJob.query.count()
-    pending_jobs = TranscodeJob.query.filter_by(status='pending').count()
-    processing_jobs = TranscodeJob.query.filter_by(status='processing').count()
-    completed_jobs = TranscodeJob.query.filter_by(status='completed').count()
-    failed_jobs = TranscodeJob.query.filter_by(status='failed').count()
+    with status_cache_lock:
+        if status_cache['data'] is None or time.monotonic() >= status_cache['expires']:
+            status_cache['data'] = build_status()
+            status_cache['expires'] = time.monotonic() + app.config['STATUS_CACHE_TTL']
+        return jsonify(status_cache['data'])
+
+@app.route('/metrics')
+def metrics():
+    """Timing histograms, counters and gauges of this host in the Prometheus text format"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+status_cache = {'data': None, 'expires': 0.0}
+status_cache_lock = threading.Lock()
+
+def build_status():
+    # One GROUP BY over the status index instead of a COUNT per status
+    counts = dict(
+        db.session.query(TranscodeJob.status, func.count(TranscodeJob.id))
+        .group_by(TranscodeJob.status)
+        .all()
+    )
+    system = system_sampler.latest()
     
-    return jsonify({
-        'total_jobs': total_jobs,
-        'pending_jobs': pending_jobs,
-        'processing_jobs': processing_jobs,
-        'completed_jobs': completed_jobs,
-        'failed_jobs': failed_jobs,
-        'cpu_percent': psutil.cpu_percent(),
-        'memory_percent': psutil.virtual_memory().percent,
-        'watch_enabled': Settings.get_value('watch_enabled', 'false') == 'true'
+    return {
+        'total_jobs': sum(counts.values()),
+        'pending_jobs': counts.get('pending', 0),
+        'processing_jobs': counts.get('processing', 0),
+        'completed_jobs': counts.get('completed', 0),
+        'failed_jobs': counts.get('failed', 0),
+        'cpu_percent': system['cpu_percent'],
+        'memory_percent': system['memory_percent'],
+        'disk': system['disk'],
+        'ffmpeg_processes': system['ffmpeg_processes'],
+        'worker_slots': scheduler.concurrency(),
+        'active_workers': scheduler.active_count(),
+        'autotune': autotuner.status() if autotuner else None,
+        'watch_enabled': settings_store.get('watch_enabled')
+    }
+
+@app.route('/api/events')
+def stream_events():
+    """Stream job changes to the dashboard as Server-Sent Events"""
+    # Each stream holds a worker thread, so only a few may be open per
+    # process; dashboards turned away here poll instead
+    with event_streams_lock:
+        if event_streams['open'] >= app.config['EVENTS_MAX_STREAMS']:
+            return jsonify({'error': 'Too many live update streams, poll instead'}), 503, {
+                'Retry-After': str(int(app.config['EVENTS_STREAM_MAX_AGE']))
+            }
+        event_streams['open'] += 1
+    closed = threading.Event()
+    
+    def release():
+        if not closed.is_set():
+            closed.set()
+            with event_streams_lock:
+                event_streams['open'] -= 1
+    
+    subscriber = event_broker.subscribe()
+    keepalive = app.config['EVENTS_KEEPALIVE']
+    deadline = time.monotonic() + app.config['EVENTS_STREAM_MAX_AGE']
+    
+    def stream():
+        try:
+            # Browsers reconnect by themselves once the stream ends
+            yield 'retry: 3000\n\n'
+            while time.monotonic() < deadline:
+                try:
+                    yield subscriber.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            event_broker.unsubscribe(subscriber)
+    
+    response = Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
     })
+    response.call_on_close(release)
+    return response
+
+event_streams = {'open': 0}
+event_streams_lock = threading.Lock()
 
 # RAG Routes
+rag_client = RagClient(
+    f"http://{app.config['RAG_URL']}:{app.config['RAG_PORT']}{app.config['RAG_ENDPOINT']}",
+    max_concurrent=app.config['RAG_MAX_CONCURRENT'],
+    connect_timeout=app.config['RAG_CONNECT_TIMEOUT'],
+    read_timeout=app.config['RAG_READ_TIMEOUT'],
+    queue_timeout=app.config['RAG_QUEUE_TIMEOUT'],
+    breaker=CircuitBreaker(app.config['RAG_BREAKER_FAILURES'], app.config['RAG_BREAKER_RESET_SECONDS']),
+    latency=LatencyTracker(
+        app.config['RAG_READ_TIMEOUT'],
+        minimum=app.config['RAG_MIN_READ_TIMEOUT'],
+        percentile=app.config['RAG_TIMEOUT_PERCENTILE'],
+        multiplier=app.config['RAG_TIMEOUT_MULTIPLIER']
+    ) if app.config['RAG_ADAPTIVE_TIMEOUT'] else None
+)
+rag_cache = RagCache(app.config['RAG_CACHE_SIZE'], app.config['RAG_CACHE_TTL'])
+
 @app.route('/rag')
 def rag_page():
     """Render RAG query interface"""
@@ -249,65 +886,252 @@ def rag_page():
 
 @app.route('/api/rag/query', methods=['POST'])
 def rag_query():
-    """Query the RAG service"""
+    """Query the RAG service, streaming its answer through as it arrives"""
     data = request.json
 
-    print("************************************\n Got data " + data.get("query"))
-
     # Validate request
     if not data or 'query' not in data:
         return jsonify({'error': 'Query is required'}), 400
     
-    query = data.get('query')
-    top_k = data.get('top_k', app.config['RAG_DEFAULT_TOP_K'])
-    use_rag = data.get('use_rag', True)
-    temperature = data.get('temperature', app.config['RAG_DEFAULT_TEMPERATURE'])
+    try:
+        payload = rag_payload(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Build RAG service URL
-    rag_url = f"http://{app.config['RAG_URL']}:{app.config['RAG_PORT']}{app.config['RAG_ENDPOINT']}"
+    # Callers may ask for a shorter timeout than the configured one
+    try:
+        timeout = float(data['timeout']) if data.get('timeout') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'timeout must be a number of seconds'}), 400
     
-    # Prepare request payload
-    payload = {
-        'query': query,
-        'top_k': top_k,
-        'use_rag': use_rag,
-        'temperature': temperature
-    }
-    print("************************************\n hit rag_url " + rag_url)
-    print("************************************\n with payload " + str(payload))
+    # Repeated questions are answered from the cache, and identical questions
+    # asked at the same time share one upstream call
+    key = None
+    flight = None
+    if rag_cache.enabled and data.get('cache', True):
+        key = rag_cache_key(payload)
+        state, found = rag_cache.claim(key)
+        if state == 'follower':
+            entry = found.wait(timeout or rag_client.read_timeout)
+            if entry:
+                return rag_cached_response(entry, 'COALESCED')
+        elif state == 'hit':
+            return rag_cached_response(found, 'HIT')
+        else:
+            flight = found
 
+    started = time.perf_counter()
+    outcome = 'error'
+    streaming = False
     try:
-        # Call RAG service
-        response = requests.post(rag_url, json=payload, timeout=120)
-        response.raise_for_status()
+        upstream = rag_client.open(payload, timeout=timeout)
+        if upstream.status_code >= 400:
+            body = upstream.read()
+            return jsonify({
+                'error': 'RAG service error',
+                'details': body.decode('utf-8', errors='replace')[:1000],
+                'status_code': upstream.status_code
+            }), upstream.status_code
+        outcome = 'ok'
         
-        # Return RAG service response
-        return jsonify(response.json())
+        # Pass the body through in chunks; the connection returns to the pool once it is sent
+        body = rag_relay(upstream, key, flight) if flight else upstream
+        streaming = True
+        return Response(
+            stream_with_context(body),
+            status=upstream.status_code,
+            content_type=upstream.content_type,
+            headers={'X-Cache': 'MISS'} if flight else None
+        )
+    
+    except RagBusy as e:
+        outcome = 'busy'
+        return jsonify({
+            'error': 'RAG service busy',
+            'details': str(e)
+        }), 503, {'Retry-After': '1'}
+    
+    except RagUnavailable as e:
+        outcome = 'circuit_open'
+        return jsonify({
+            'error': 'RAG service unavailable',
+            'details': str(e)
+        }), 503, {'Retry-After': str(max(1, round(e.retry_after)))}
         
     except requests.exceptions.ConnectionError:
+        outcome = 'unreachable'
         return jsonify({
             'error': 'Cannot connect to RAG service',
-            'details': f'Unable to reach {rag_url}. Make sure the RAG service is running.'
+            'details': f'Unable to reach {rag_client.url}. Make sure the RAG service is running.'
         }), 503
         
     except requests.exceptions.Timeout:
+        outcome = 'timeout'
         return jsonify({
             'error': 'RAG service timeout',
             'details': 'The RAG service took too long to respond.'
         }), 504
         
-    except requests.exceptions.HTTPError as e:
-        return jsonify({
-            'error': 'RAG service error',
-            'details': str(e),
-            'status_code': response.status_code
-        }), response.status_code
-        
     except Exception as e:
         return jsonify({
             'error': 'Unexpected error',
             'details': str(e)
         }), 500
+    
+    finally:
+        if flight and not streaming:
+            rag_cache.abandon(key, flight)
+        RAG_PROXY_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+
+def rag_payload(data, defaults=None):
+    """
+    RAG service payload for a query, filling in anything not given from ``defaults`` and the config
+
+    Raises ValueError if ``top_k`` or ``temperature`` is not a number.
+    """
+    defaults = defaults or {}
+    try:
+        top_k = int(data.get('top_k', defaults.get('top_k', app.config['RAG_DEFAULT_TOP_K'])))
+        temperature = float(data.get(
+            'temperature', defaults.get('temperature', app.config['RAG_DEFAULT_TEMPERATURE'])
+        ))
+    except (TypeError, ValueError):
+        raise ValueError('top_k and temperature must be numbers')
+    return {
+        'query': data.get('query'),
+        'top_k': top_k,
+        'use_rag': data.get('use_rag', defaults.get('use_rag', True)),
+        'temperature': temperature
+    }
+
+@app.route('/api/rag/batch', methods=['POST'])
+def rag_batch():
+    """Answer a list of queries, asking the RAG service about several at once"""
+    data = request.json
+    if not data or not isinstance(data.get('queries'), list) or not data['queries']:
+        return jsonify({'error': 'queries must be a non-empty list'}), 400
+    
+    max_items = app.config['RAG_BATCH_MAX_ITEMS']
+    if len(data['queries']) > max_items:
+        return jsonify({'error': f'At most {max_items} queries per batch'}), 400
+    
+    try:
+        timeout = float(data['timeout']) if data.get('timeout') else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'timeout must be a number of seconds'}), 400
+    
+    # Items are query strings or objects with their own parameters; the
+    # batch's parameters apply to whatever an item leaves out. Each entry is
+    # (payload, None) or (None, error message)
+    payloads = []
+    for item in data['queries']:
+        item = {'query': item} if isinstance(item, str) else item
+        if not isinstance(item, dict) or not item.get('query'):
+            payloads.append((None, 'Query is required'))
+            continue
+        try:
+            payloads.append((rag_payload(item, data), None))
+        except ValueError as e:
+            payloads.append((None, str(e)))
+    use_cache = data.get('cache', True)
+    
+    def answer(entry):
+        payload, error = entry
+        if error:
+            return {'error': error, 'status_code': 400}
+        try:
+            return {'answer': rag_answer(payload, timeout, use_cache)}
+        except Exception as e:
+            return rag_item_error(e)
+    
+    workers = min(app.config['RAG_BATCH_CONCURRENCY'], rag_client.max_concurrent, len(payloads))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(answer, payloads))
+    
+    failed = sum(1 for result in results if 'error' in result)
+    return jsonify({
+        'results': results,
+        'succeeded': len(results) - failed,
+        'failed': failed
+    })
+
+def rag_answer(payload, timeout=None, use_cache=True):
+    """Decoded RAG answer for a payload, from the cache when possible"""
+    key = None
+    flight = None
+    if rag_cache.enabled and use_cache:
+        key = rag_cache_key(payload)
+        state, found = rag_cache.claim(key)
+        if state == 'follower':
+            entry = found.wait(timeout or rag_client.read_timeout)
+            if entry:
+                return json.loads(entry['body'])
+        elif state == 'hit':
+            return json.loads(found['body'])
+        else:
+            flight = found
+    
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        answer = rag_client.query(payload, timeout=timeout)
+        outcome = 'ok'
+    except RagBusy:
+        outcome = 'busy'
+        raise
+    except RagUnavailable:
+        outcome = 'circuit_open'
+        raise
+    except requests.exceptions.ConnectionError:
+        outcome = 'unreachable'
+        raise
+    except requests.exceptions.Timeout:
+        outcome = 'timeout'
+        raise
+    finally:
+        RAG_PROXY_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+        if flight and outcome != 'ok':
+            rag_cache.abandon(key, flight)
+    
+    if flight:
+        rag_cache.finish(key, flight, json.dumps(answer).encode(), 'application/json')
+    return answer
+
+def rag_item_error(e):
+    """Error entry of a batch item, shaped like the errors of /api/rag/query"""
+    if isinstance(e, RagBusy):
+        return {'error': 'RAG service busy', 'details': str(e), 'status_code': 503}
+    if isinstance(e, RagUnavailable):
+        return {'error': 'RAG service unavailable', 'details': str(e), 'status_code': 503}
+    if isinstance(e, requests.exceptions.ConnectionError):
+        return {'error': 'Cannot connect to RAG service', 'details': str(e), 'status_code': 503}
+    if isinstance(e, requests.exceptions.Timeout):
+        return {'error': 'RAG service timeout', 'details': str(e), 'status_code': 504}
+    if isinstance(e, requests.exceptions.HTTPError):
+        return {'error': 'RAG service error', 'details': str(e), 'status_code': e.response.status_code}
+    if isinstance(e, requests.exceptions.RequestException):
+        return {'error': 'RAG service error', 'details': str(e), 'status_code': 502}
+    if isinstance(e, (TypeError, ValueError)):
+        return {'error': 'Invalid query', 'details': str(e), 'status_code': 400}
+    return {'error': 'Unexpected error', 'details': str(e), 'status_code': 500}
+
+def rag_relay(upstream, key, flight):
+    """Stream an upstream answer through, caching it once it is complete"""
+    chunks = []
+    complete = False
+    try:
+        for chunk in upstream:
+            chunks.append(chunk)
+            yield chunk
+        complete = True
+    finally:
+        if complete:
+            rag_cache.finish(key, flight, b''.join(chunks), upstream.content_type)
+        else:
+            rag_cache.abandon(key, flight)
+
+def rag_cached_response(entry, cache_state):
+    return Response(entry['body'], content_type=entry['content_type'], headers={'X-Cache': cache_state})
 
 @app.route('/api/rag/config', methods=['GET'])
 def get_rag_config():
@@ -316,51 +1140,185 @@ def get_rag_config():
         'rag_url': app.config['RAG_URL'],
         'rag_port': app.config['RAG_PORT'],
         'default_top_k': app.config['RAG_DEFAULT_TOP_K'],
-        'default_temperature': app.config['RAG_DEFAULT_TEMPERATURE']
+        'default_temperature': app.config['RAG_DEFAULT_TEMPERATURE'],
+        'upstream': rag_client.status()
     })
 
+# Cluster Routes
+@app.route('/api/cluster/chunks', methods=['POST'])
+def encode_cluster_chunk():
+    """Encode a chunk on behalf of a coordinating node"""
+    # Without a shared secret this node does not encode for others
+    token = app.config['CLUSTER_TOKEN']
+    if not token:
+        return jsonify({'error': 'Cluster encoding is disabled, set CLUSTER_TOKEN'}), 403
+    if request.headers.get('X-Cluster-Token') != token:
+        return jsonify({'error': 'Invalid cluster token'}), 403
+    
+    chunk = request.json
+    if not chunk or not os.path.exists(chunk.get('input_file') or ''):
+        return jsonify({'error': 'Chunk input file does not exist'}), 400
+    
+    # Only read from the source folder and only write chunk files into a
+    # segment work directory of the output folder
+    stored = settings_store.all()
+    output_file = os.path.realpath(chunk.get('output_file') or '')
+    work_dir = os.path.dirname(output_file)
+    if not path_within(chunk['input_file'], stored['source_folder']):
+        return jsonify({'error': 'Chunk input file is outside the source folder'}), 400
+    if (not os.path.basename(work_dir).startswith('.segments-')
+            or not path_within(work_dir, stored['output_folder'])):
+        return jsonify({'error': 'Chunk output file is outside a segment work directory'}), 400
+    
+    try:
+        return jsonify(encode_chunk(chunk))
+    except Exception as e:
+        return jsonify({'error': 'Chunk encode failed', 'details': str(e)}), 500
+
+def path_within(path, folder):
+    """Whether ``path`` is inside ``folder`` once symlinks are resolved"""
+    if not folder:
+        return False
+    path = os.path.realpath(path)
+    folder = os.path.realpath(folder)
+    return os.path.commonpath([path, folder]) == folder
+
 # Background processing
 def process_job(job_id):
     """Process a transcode job"""
     with app.app_context():
         job = TranscodeJob.query.get(job_id)
-        if not job:
+        if not job or job.claimed_by != worker_id():
             return
         
-        job.status = 'processing'
-        job.started_at = datetime.utcnow()
-        db.session.commit()
+        publish_job(job)
+        started = time.perf_counter()
+        if job.started_at and job.created_at:
+            QUEUE_WAIT_SECONDS.observe(max(0.0, (job.started_at - job.created_at).total_seconds()))
         
         try:
-            output_folder = Settings.get_value('output_folder')
-            output_format = Settings.get_value('output_format', 'mp4')
+            stored = settings_store.all()
+            output_folder = stored['output_folder']
+            output_format = stored['output_format']
             
             # Generate output filename
             source_path = Path(job.source_file)
-            output_filename = f"{source_path.stem}_transcoded.{output_format}"
-            output_path = os.path.join(output_folder, output_filename)
+            if output_format in PLAYLIST_NAMES:
+                # Streaming outputs are a folder of segments with a playlist
+                output_path = os.path.join(
+                    output_folder, f"{source_path.stem}_transcoded", PLAYLIST_NAMES[output_format]
+                )
+            else:
+                output_filename = f"{source_path.stem}_transcoded.{output_format}"
+                output_path = os.path.join(output_folder, output_filename)
             
             # Get transcoding settings
             settings = {
-                'video_codec': Settings.get_value('video_codec', 'libx264'),
-                'audio_codec': Settings.get_value('audio_codec', 'aac'),
-                'preset': Settings.get_value('preset', 'medium'),
-                'crf': int(Settings.get_value('crf', '23'))
+                'video_codec': stored['video_codec'],
+                'audio_codec': stored['audio_codec'],
+                'preset': stored['preset'],
+                'crf': stored['crf'],
+                'threads': autotuner.threads_per_job() if autotuner else app.config['FFMPEG_THREADS_PER_JOB'],
+                'segments': app.config['PARALLEL_SEGMENTS'],
+                'segment_min_duration': app.config['PARALLEL_SEGMENT_MIN_DURATION'],
+                'passthrough': app.config['PASSTHROUGH_ENABLED'],
+                'max_video_bitrate': app.config['PASSTHROUGH_MAX_VIDEO_BITRATE'],
+                'max_audio_bitrate': app.config['PASSTHROUGH_MAX_AUDIO_BITRATE']
             }
             
+            # The job's profile overrides whatever it sets
+            profile = profile_store.get(job.profile_id) if job.profile_id else None
+            if profile:
+                settings.update({
+                    field: profile[field] for field in PROFILE_FIELDS if profile[field] is not None
+                })
+            
+            source = index_source_file(job.source_file, app.config['RESULT_CACHE_FULL_HASH'])
+            renditions = parse_renditions(stored['renditions'])
+            
+            # Identical content with identical settings was transcoded before
+            result_key = None
+            cached = None
+            if app.config['RESULT_CACHE_ENABLED'] and not renditions and output_format not in PLAYLIST_NAMES:
+                content_key = source.content_hash if app.config['RESULT_CACHE_FULL_HASH'] else source.fingerprint
+                result_key = cache_key(content_key, settings_key(settings, output_format))
+                cached = find_cached_result(result_key)
+            
             # Transcode
-            transcoder = VideoTranscoder()
+            transcoder = VideoTranscoder(
+                probe_cache=probe_cache,
+                frame_counter=autotuner.record_frames if autotuner else None,
+                stats_callback=lambda stats: progress_tracker.update_stats(job.id, stats)
+            )
+            
+            last_published = [0.0]
             
             def progress_callback(progress):
-                job.progress = progress
-                db.session.commit()
+                progress_tracker.update(job.id, progress)
+                if abs(progress - last_published[0]) >= 1.0:
+                    last_published[0] = progress
+                    stats = progress_tracker.get_stats(job.id) or {}
+                    event_broker.publish('progress', {
+                        'id': job.id,
+                        'progress': progress,
+                        **{field: stats.get(key) for field, key in TranscodeJob.STATS_FIELDS.items()}
+                    })
             
-            transcoder.transcode(
-                job.source_file,
-                output_path,
-                settings,
-                progress_callback
-            )
+            if cached:
+                reuse_output(cached.output_file, output_path)
+                job.reused_job_id = cached.job_id
+            elif output_format in PLAYLIST_NAMES:
+                plan = transcoder.plan_streams(job.source_file, output_path, settings)
+                job.encode_mode = 'ladder' if renditions else plan.mode
+                # Segments are playable while the encode runs, so publish the playlist now
+                job.output_file = output_path
+                db.session.commit()
+                publish_job(job)
+                transcoder.package_stream(
+                    job.source_file,
+                    output_path,
+                    settings,
+                    output_format,
+                    heights=renditions,
+                    progress_callback=progress_callback,
+                    plan=plan,
+                    segment_seconds=app.config['STREAM_SEGMENT_SECONDS']
+                )
+            elif renditions:
+                # Decode once and encode every rendition from the same frames
+                outputs = transcoder.transcode_ladder(
+                    job.source_file, output_path, settings, renditions, progress_callback
+                )
+                job.encode_mode = 'ladder'
+                TranscodeOutput.query.filter_by(job_id=job.id).delete()
+                db.session.add_all(
+                    TranscodeOutput(
+                        job_id=job.id,
+                        label=output['label'],
+                        height=output['height'],
+                        output_file=output['output_file'],
+                        size=os.path.getsize(output['output_file'])
+                    )
+                    for output in outputs
+                )
+                output_path = outputs[0]['output_file']
+            else:
+                # Copy streams that already match the target instead of encoding them
+                plan = transcoder.plan_streams(job.source_file, output_path, settings)
+                job.encode_mode = plan.mode
+                transcoder.transcode(
+                    job.source_file,
+                    output_path,
+                    settings,
+                    progress_callback,
+                    dispatcher=chunk_dispatcher(job.id) if app.config['CLUSTER_TRANSPORT'] else None,
+                    plan=plan,
+                    dispatch_workers=(
+                        get_cluster_transport().chunks_per_host if app.config['CLUSTER_TRANSPORT'] else None
+                    )
+                )
+                if result_key:
+                    record_result(result_key, output_path, job.id)
             
             job.output_file = output_path
             job.status = 'completed'
@@ -371,7 +1329,144 @@ def process_job(job_id):
             job.status = 'failed'
             job.error_message = str(e)
         
+        # Keep how fast the job ran once the live stats are gone
+        stats = progress_tracker.get_stats(job_id)
+        if stats:
+            for field, key in TranscodeJob.STATS_FIELDS.items():
+                setattr(job, field, stats.get(key))
+        progress_tracker.finish(job_id)
+        
+        # Another worker may have taken the job over if our lease lapsed
+        with db.session.no_autoflush:
+            owner = db.session.query(TranscodeJob.claimed_by).filter_by(id=job_id).scalar()
+        if owner != worker_id():
+            print(f"Lost lease on job {job_id}, discarding result")
+            db.session.rollback()
+            return
+        
+        job.lease_expires_at = None
         db.session.commit()
+        publish_job(job)
+        JOB_SECONDS.observe(time.perf_counter() - started, status=job.status)
+
+def index_source_file(path, with_content_hash=False):
+    """Make sure a source file is in the file index with a current fingerprint"""
+    stat = os.stat(path)
+    entry = SourceFile.query.filter_by(path=path).first()
+    if entry is None:
+        entry = SourceFile(path=path)
+        db.session.add(entry)
+    
+    changed = (entry.size, entry.mtime) != (stat.st_size, stat.st_mtime)
+    if changed:
+        entry.size = stat.st_size
+        entry.mtime = stat.st_mtime
+        entry.inode = stat.st_ino
+        entry.content_hash = None
+        entry.probe = None
+    if changed or entry.fingerprint is None:
+        entry.fingerprint = quick_fingerprint(path, stat.st_size)
+    if with_content_hash and entry.content_hash is None:
+        entry.content_hash = full_hash(path)
+    
+    if db.session.is_modified(entry) or entry.id is None:
+        db.session.commit()
+    return entry
+
+def find_cached_result(result_key):
+    """Earlier output for the same input and settings, if it is still intact"""
+    result = TranscodeResult.query.filter_by(cache_key=result_key).first()
+    if not result:
+        return None
+    
+    try:
+        stat = os.stat(result.output_file)
+        intact = (stat.st_size, stat.st_mtime) == (result.output_size, result.output_mtime)
+    except OSError:
+        intact = False
+    if not intact:
+        db.session.delete(result)
+        db.session.commit()
+        return None
+    return result
+
+def record_result(result_key, output_file, job_id):
+    """Remember a finished output so identical inputs can reuse it"""
+    stat = os.stat(output_file)
+    values = {
+        'output_file': output_file,
+        'output_size': stat.st_size,
+        'output_mtime': stat.st_mtime,
+        'job_id': job_id,
+        'created_at': datetime.utcnow()
+    }
+    result = TranscodeResult.query.filter_by(cache_key=result_key).first()
+    if result is not None:
+        for key, value in values.items():
+            setattr(result, key, value)
+        return
+    
+    try:
+        with db.session.begin_nested():
+            db.session.add(TranscodeResult(cache_key=result_key, **values))
+    except IntegrityError:
+        # Another worker finished the same input first; its result is as good
+        pass
+
+def load_probe(key):
+    """Stored ffprobe result for a (path, size, mtime) key"""
+    path, size, mtime = key
+    row = db.session.query(SourceFile.size, SourceFile.mtime, SourceFile.probe).filter_by(path=path).first()
+    if row is None or row.probe is None or (row.size, row.mtime) != (size, mtime):
+        return None
+    return json.loads(row.probe)
+
+def save_probe(key, probe):
+    """Store an ffprobe result in the file index (without committing)"""
+    path, size, mtime = key
+    entry = SourceFile.query.filter_by(path=path).first()
+    if entry is None:
+        entry = SourceFile(path=path, size=size, mtime=mtime)
+        db.session.add(entry)
+    elif (entry.size, entry.mtime) != (size, mtime):
+        entry.size = size
+        entry.mtime = mtime
+        entry.fingerprint = None
+        entry.content_hash = None
+    entry.probe = json.dumps(probe)
+
+# One ffprobe per file version, shared by scans, workers and progress
+probe_cache = ProbeCache(app.config['PROBE_CACHE_SIZE'], load_probe, save_probe)
+
+# Files found by scans are probed by one background thread, so a scan of a
+# large folder returns without waiting for ffprobe
+scan_prober = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scan-probe')
+
+def probe_new_files(paths):
+    """Probe files found by a scan in batches, committing after each batch"""
+    workers = max(1, app.config['PROBE_WORKERS'])
+    batch_size = workers * 16
+    transcoder = VideoTranscoder(probe_cache=probe_cache)
+    probed = 0
+    for start in range(0, len(paths), batch_size):
+        with app.app_context():
+            try:
+                probes = transcoder.probe_many(paths[start:start + batch_size], workers)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error probing scanned files: {e}")
+                continue
+        probed += sum(1 for probe in probes.values() if probe is not None)
+    print(f"Probed {probed} of {len(paths)} scanned files")
+
+def create_watcher(source_folder):
+    return FolderWatcher(
+        source_folder,
+        on_new_file,
+        settle_time=app.config['WATCH_SETTLE_SECONDS'],
+        poll_interval=app.config['WATCH_POLL_INTERVAL']
+    )
 
 def on_new_file(file_path):
     """Callback when new file is detected"""
@@ -379,12 +1474,352 @@ def on_new_file(file_path):
         # Check if file already exists in database
         existing = TranscodeJob.query.filter_by(source_file=file_path).first()
         if not existing:
-            job = TranscodeJob(source_file=file_path, status='pending')
+            if queue_capacity() == 0:
+                print(f"Job queue is full, skipping {file_path} until the next scan")
+                return
+            
+            job = TranscodeJob(
+                source_file=file_path,
+                status='pending',
+                profile_id=folder_profile_id(file_path)
+            )
             db.session.add(job)
             db.session.commit()
             
             # Start processing
-            threading.Thread(target=process_job, args=(job.id,), daemon=True).start()
+            start_background_services()
+            scheduler.notify()
+            publish_job(job)
+
+# Distributed chunk encoding
+cluster_transport = None
+cluster_lock = threading.Lock()
+
+def get_cluster_transport():
+    """Create the configured chunk transport on first use"""
+    global cluster_transport
+    
+    with cluster_lock:
+        if cluster_transport is None:
+            kind = app.config['CLUSTER_TRANSPORT']
+            if kind == 'local':
+                cluster_transport = LocalTransport(app.config['CLUSTER_LOCAL_WORKERS'] or None)
+            elif kind == 'http':
+                cluster_transport = HttpTransport(
+                    app.config['CLUSTER_NODES'],
+                    chunks_per_node=app.config['CLUSTER_CHUNKS_PER_NODE'],
+                    timeout=app.config['CLUSTER_CHUNK_TIMEOUT'],
+                    token=app.config['CLUSTER_TOKEN'] or None
+                )
+            else:
+                raise ValueError(f"Unknown cluster transport: {kind}")
+        return cluster_transport
+
+def chunk_dispatcher(job_id):
+    """Build a dispatcher that encodes a job's chunks on the cluster and records their state"""
+    def on_update(chunk, status, attempt, worker, error):
+        with app.app_context():
+            row = TranscodeChunk.query.filter_by(job_id=job_id, chunk_index=chunk['index']).first()
+            if not row:
+                return
+            row.status = status
+            row.attempts = attempt
+            row.worker = worker or row.worker
+            row.error_message = error
+            row.updated_at = datetime.utcnow()
+            db.session.commit()
+    
+    def dispatch(chunks, on_chunk_done):
+        with app.app_context():
+            TranscodeChunk.query.filter_by(job_id=job_id).delete()
+            db.session.add_all([
+                TranscodeChunk(
+                    job_id=job_id,
+                    chunk_index=chunk['index'],
+                    start_time=chunk['start'],
+                    end_time=chunk['end'],
+                    status='pending'
+                )
+                for chunk in chunks
+            ])
+            db.session.commit()
+        
+        coordinator = ChunkCoordinator(
+            get_cluster_transport(),
+            max_retries=app.config['CLUSTER_CHUNK_RETRIES'],
+            on_update=on_update
+        )
+        coordinator.run(chunks, on_chunk_done)
+    
+    return dispatch
+
+# Job scheduling
+def worker_id():
+    """Identity this process uses when claiming jobs"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def lease_expiry():
+    return datetime.utcnow() + timedelta(seconds=app.config['JOB_LEASE_SECONDS'])
+
+def claim_next_job():
+    """Atomically claim the next pending job, highest priority first
+
+    The claim is a conditional UPDATE so that several gunicorn workers (or
+    hosts sharing the database) can never take the same row. It also refuses
+    to claim when this host already runs its share of concurrent jobs.
+    """
+    if scheduler.active_count() >= scheduler.concurrency():
+        return None
+    
+    with app.app_context():
+        host_jobs = aliased(TranscodeJob)
+        running_on_host = select(func.count(host_jobs.id)).where(
+            host_jobs.status == 'processing',
+            host_jobs.claimed_by.like(f"{socket.gethostname()}:%")
+        ).scalar_subquery()
+        
+        for _ in range(5):
+            candidate = db.session.query(TranscodeJob.id).filter_by(status='pending').order_by(
+                TranscodeJob.priority.desc(),
+                TranscodeJob.created_at,
+                TranscodeJob.id
+            ).first()
+            if candidate is None:
+                return None
+            
+            now = datetime.utcnow()
+            result = db.session.execute(
+                update(TranscodeJob)
+                .where(
+                    TranscodeJob.id == candidate.id,
+                    TranscodeJob.status == 'pending',
+                    running_on_host < scheduler.concurrency()
+                )
+                .values(
+                    status='processing',
+                    claimed_by=worker_id(),
+                    lease_expires_at=lease_expiry(),
+                    started_at=now,
+                    attempts=func.coalesce(TranscodeJob.attempts, 0) + 1
+                )
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+            if result.rowcount == 1:
+                return candidate.id
+        
+        return None
+
+def maintain_leases(active_job_ids):
+    """Renew leases on our running jobs and re-queue abandoned ones"""
+    with app.app_context():
+        if active_job_ids:
+            db.session.execute(
+                update(TranscodeJob)
+                .where(
+                    TranscodeJob.id.in_(active_job_ids),
+                    TranscodeJob.claimed_by == worker_id(),
+                    TranscodeJob.status == 'processing'
+                )
+                .values(lease_expires_at=lease_expiry())
+                .execution_options(synchronize_session=False)
+            )
+        
+        expired = (
+            (TranscodeJob.status == 'processing') &
+            or_(TranscodeJob.lease_expires_at.is_(None), TranscodeJob.lease_expires_at < datetime.utcnow())
+        )
+        exhausted = func.coalesce(TranscodeJob.attempts, 0) >= app.config['JOB_MAX_ATTEMPTS']
+        
+        failed = db.session.execute(
+            update(TranscodeJob)
+            .where(expired, exhausted)
+            .values(
+                status='failed',
+                lease_expires_at=None,
+                error_message='Worker stopped responding too many times'
+            )
+            .execution_options(synchronize_session=False)
+        )
+        requeued = db.session.execute(
+            update(TranscodeJob)
+            .where(expired, ~exhausted)
+            .values(status='pending', claimed_by=None, lease_expires_at=None, progress=0.0)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        
+        if failed.rowcount or requeued.rowcount:
+            print(f"Re-queued {requeued.rowcount} and failed {failed.rowcount} job(s) with expired leases")
+        return requeued.rowcount > 0
+
+def queue_capacity():
+    """Number of jobs that can still be queued, or None when unbounded"""
+    max_queued = app.config['MAX_QUEUED_JOBS']
+    if max_queued <= 0:
+        return None
+    pending = TranscodeJob.query.filter_by(status='pending').count()
+    return max(0, max_queued - pending)
+
+if app.config['AUTOTUNE_ENABLED']:
+    # The autotuner decides how many of these slots are used
+    worker_slots = app.config['MAX_CONCURRENT_JOBS'] or os.cpu_count() or 1
+else:
+    worker_slots = app.config['MAX_CONCURRENT_JOBS'] or default_slot_count(app.config['FFMPEG_THREADS_PER_JOB'])
+
+scheduler = JobScheduler(
+    claim_next_job,
+    process_job,
+    slots=worker_slots,
+    poll_interval=app.config['SCHEDULER_POLL_INTERVAL'],
+    maintenance=maintain_leases,
+    maintenance_interval=app.config['JOB_LEASE_SECONDS'] / 3
+)
+
+REGISTRY.gauge('transcode_active_jobs', 'Jobs running in this process', scheduler.active_count)
+REGISTRY.gauge('transcode_concurrency', 'Jobs this host may run at once', scheduler.concurrency)
+REGISTRY.gauge('rag_active_requests', 'RAG calls holding a connection', rag_client.active_count)
+REGISTRY.gauge(
+    'rag_circuit_open', '1 while RAG calls are refused after repeated failures',
+    lambda: int(rag_client.breaker.status()['state'] == CircuitBreaker.OPEN)
+)
+REGISTRY.gauge('rag_read_timeout_seconds', 'Read timeout RAG calls get now', lambda: rag_client.status()['read_timeout'])
+REGISTRY.gauge('rag_cache_entries', 'RAG answers held in memory', lambda: rag_cache.stats()['entries'])
+REGISTRY.gauge('probe_cache_entries', 'Probe results held in memory', lambda: probe_cache.stats()['entries'])
+
+def measure_encode_throughput(concurrency, threads):
+    """Combined fps of ``concurrency`` synthetic encodes with the stored codec settings"""
+    with app.app_context():
+        stored = settings_store.all()
+    settings = {'video_codec': stored['video_codec'], 'preset': stored['preset'], 'crf': stored['crf']}
+    return VideoTranscoder().measure_throughput(concurrency, threads, settings)
+
+def host_active_jobs():
+    """Jobs running on this host in any worker process"""
+    with app.app_context():
+        return TranscodeJob.query.filter(
+            TranscodeJob.status == 'processing',
+            TranscodeJob.claimed_by.like(f"{socket.gethostname()}:%")
+        ).count()
+
+# One worker process per host tunes; the others follow its decision
+autotuner = None
+if app.config['AUTOTUNE_ENABLED']:
+    autotuner = Autotuner(
+        scheduler.set_limit,
+        lambda: system_sampler.latest()['cpu_percent'],
+        host_active_jobs,
+        max_concurrency=worker_slots,
+        interval=app.config['AUTOTUNE_INTERVAL'],
+        measure_fps=measure_encode_throughput if app.config['AUTOTUNE_CALIBRATE'] else None,
+        shared=HostTuning(os.path.join(app.config['RUN_DIR'], 'autotune'))
+    )
+
+def flush_progress(changes, stats):
+    """Write buffered progress and encode stats for all running jobs in one statement"""
+    with app.app_context():
+        jobs = TranscodeJob.__table__
+        db.session.execute(
+            update(jobs)
+            .where(jobs.c.id == bindparam('job_id'), jobs.c.status == 'processing')
+            .values(
+                progress=bindparam('new_progress'),
+                **{
+                    field: func.coalesce(bindparam(f'new_{field}'), jobs.c[field])
+                    for field in TranscodeJob.STATS_FIELDS
+                }
+            ),
+            [
+                {
+                    'job_id': job_id,
+                    'new_progress': progress,
+                    **{
+                        f'new_{field}': stats.get(job_id, {}).get(key)
+                        for field, key in TranscodeJob.STATS_FIELDS.items()
+                    }
+                }
+                for job_id, progress in changes.items()
+            ]
+        )
+        db.session.commit()
+
+progress_tracker = ProgressTracker(
+    flush_progress,
+    interval=app.config['PROGRESS_FLUSH_INTERVAL'],
+    min_delta=app.config['PROGRESS_FLUSH_DELTA']
+)
+
+# Job events
+event_broker = EventBroker()
+published_states = {}
+published_states_lock = threading.Lock()
+
+def job_state(job):
+    return (job.status, round(job.progress or 0.0, 1))
+
+def publish_job(job):
+    """Push a job's current state to the event streams of this process"""
+    with published_states_lock:
+        published_states[job.id] = job_state(job)
+    event_broker.publish('job', job.to_dict())
+
+def fetch_job_changes(cursor):
+    """Find jobs changed by other workers since the last poll"""
+    with app.app_context():
+        if cursor is None:
+            return [], datetime.utcnow()
+        
+        changed = TranscodeJob.query.filter(TranscodeJob.updated_at > cursor).order_by(
+            TranscodeJob.updated_at
+        ).limit(500).all()
+        
+        events = []
+        with published_states_lock:
+            for job in changed:
+                state = job_state(job)
+                previous = published_states.get(job.id)
+                if job.status in ('completed', 'failed'):
+                    published_states.pop(job.id, None)
+                else:
+                    published_states[job.id] = state
+                if state != previous:
+                    events.append(('job', job.to_dict()))
+        
+        return events, changed[-1].updated_at if changed else cursor
+
+change_feed = ChangeFeed(event_broker, fetch_job_changes, interval=app.config['EVENTS_POLL_INTERVAL'])
+
+def monitored_folders():
+    """Folders whose disk usage is reported by /api/status"""
+    with app.app_context():
+        folders = [settings_store.get('source_folder'), settings_store.get('output_folder')]
+    return [folder for folder in folders if folder and os.path.exists(folder)]
+
+system_sampler = SystemSampler(
+    interval=app.config['SYSTEM_SAMPLE_INTERVAL'],
+    disk_paths=monitored_folders
+)
+
+def start_background_services():
+    """Start the scheduler and its helpers in the process serving requests"""
+    if not system_sampler.is_running():
+        system_sampler.start()
+    if not progress_tracker.is_running():
+        progress_tracker.start()
+    if not change_feed.is_running():
+        change_feed.start()
+    if autotuner and not autotuner.is_running():
+        autotuner.start()
+    if not scheduler.is_running():
+        scheduler.start()
+    if not REGISTRY.is_running():
+        REGISTRY.start(app.config['METRICS_WRITE_INTERVAL'])
+
+# Start as soon as the worker imports the app so queued jobs and expired
+# leases are picked up after a restart without waiting for a request. Under
+# `app.run(debug=True)` only the reloaded child (WERKZEUG_RUN_MAIN) runs them.
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    start_background_services()
 
 if __name__ == '__main__':
     print("Starting Video Transcoder...")
@@ -393,12 +1828,11 @@ if __name__ == '__main__':
     # Initialize watcher if enabled (with proper app context)
     with app.app_context():
         try:
-            watch_enabled = Settings.get_value('watch_enabled', 'false')
-            if watch_enabled == 'true':
-                source_folder = Settings.get_value('source_folder')
+            if settings_store.get('watch_enabled'):
+                source_folder = settings_store.get('source_folder')
                 if source_folder and os.path.exists(source_folder):
                     print(f"Starting folder watcher for: {source_folder}")
-                    watcher = FolderWatcher(source_folder, on_new_file)
+                    watcher = create_watcher(source_folder)
                     watcher.start()
                 else:
                     print("Folder watcher enabled but source folder not configured or doesn't exist")
@@ -0,0 +1,326 @@
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process tunes on its own
+    fcntl = None
+
+# Encoder threads per job that x264/x265 still scale well with; beyond this,
+# running another job in parallel gives more frames per second
+EFFICIENT_THREADS_PER_JOB = 4
+
+
+class HostTuning:
+    """Autotuning state shared by the worker processes of one host
+
+    The process holding the lock on ``leader.lock`` in ``directory`` tunes
+    for the whole host and publishes its decision in ``decision.json``; the
+    others follow it. Every process writes its total encoded frames to its
+    own ``frames-<pid>`` file so the tuning process measures the host's
+    throughput, not just its own.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock_file = None
+
+    def try_lead(self):
+        """Take the tuning role if no other process holds it"""
+        if self._lock_file:
+            return True
+        if fcntl is None:
+            return True
+        lock_file = open(os.path.join(self.directory, 'leader.lock'), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def publish(self, concurrency):
+        self._write('decision.json', json.dumps({'concurrency': concurrency}))
+
+    def decision(self):
+        """Concurrency published by the tuning process, or None"""
+        try:
+            with open(os.path.join(self.directory, 'decision.json')) as f:
+                return int(json.load(f)['concurrency'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def report_frames(self, total):
+        self._write(f'frames-{os.getpid()}', str(total))
+
+    def frame_totals(self, max_age=60.0):
+        """Frames reported by each process, dropping processes that stopped reporting"""
+        totals = {}
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.startswith('frames-'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) > max_age:
+                    os.remove(path)
+                    continue
+                with open(path) as f:
+                    totals[name] = int(f.read())
+            except (OSError, ValueError):
+                continue
+        return totals
+
+    def _write(self, name, content):
+        path = os.path.join(self.directory, name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(content)
+        os.replace(temp_path, path)
+
+
+class Autotuner:
+    """Pick how many jobs run at once and how many threads each job gets
+
+    The number of concurrent jobs starts from a quarter of the core count
+    (or from ``calibrate``) and is then adjusted by hill climbing on the aggregate
+    frames per second of all running encodes: while the CPU has headroom one
+    more job is tried, and a step that lowered throughput (or a CPU busy
+    with other work) is taken back. Each job gets an equal share of the
+    cores as FFmpeg threads so that jobs never oversubscribe the machine.
+
+    ``apply(concurrency)`` is called whenever the concurrency changes,
+    ``cpu_percent()`` returns the current system CPU usage and
+    ``active_jobs()`` the number of jobs running right now. If
+    ``measure_fps`` is given, ``calibrate`` runs with it once the tuning
+    thread starts.
+
+    With ``shared`` (a ``HostTuning``) only one process per host tunes and
+    the others apply its decision; ``active_jobs()`` should then count the
+    jobs of the whole host.
+    """
+
+    def __init__(self, apply, cpu_percent, active_jobs, max_concurrency=None, cores=None,
+                 interval=30.0, high_load=95.0, low_load=80.0, tolerance=0.05, memory=600.0,
+                 measure_fps=None, shared=None):
+        self.apply = apply
+        self.cpu_percent = cpu_percent
+        self.active_jobs = active_jobs
+        self.measure_fps = measure_fps
+        self.shared = shared
+        self.leading = shared is None
+        self.cores = cores or os.cpu_count() or 1
+        self.max_concurrency = max(1, max_concurrency or self.cores)
+        self.interval = interval
+        self.high_load = high_load
+        self.low_load = low_load
+        self.tolerance = tolerance
+        self.memory = memory
+        self.concurrency = min(self.max_concurrency, max(1, self.cores // EFFICIENT_THREADS_PER_JOB))
+        # concurrency -> (frames per second, measured at)
+        self.measurements = {}
+        self.thread = None
+        self._frames = 0
+        self._frames_total = 0
+        self._host_frames = {}
+        self._window_started = time.monotonic()
+        self._window_saturated = True
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Apply the initial concurrency and start adjusting it"""
+        if self.thread:
+            return
+        if self.shared:
+            self.concurrency = min(self.max_concurrency, self.shared.decision() or self.concurrency)
+            self.leading = self.shared.try_lead()
+            if self.leading:
+                self.shared.publish(self.concurrency)
+                self._start_window()
+        self.apply(self.concurrency)
+        self._stopped.clear()
+        self.thread = threading.Thread(target=self._tune_loop, name='autotuner', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop adjusting"""
+        self._stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        """Check if the tuning thread is running"""
+        return self.thread is not None
+
+    def threads_per_job(self):
+        """FFmpeg threads for one job at the current concurrency"""
+        with self._lock:
+            return max(1, self.cores // self.concurrency)
+
+    def record_frames(self, frames):
+        """Count frames encoded by any job"""
+        with self._lock:
+            self._frames += frames
+            self._frames_total += frames
+
+    def calibrate(self, measure_fps, candidates=None):
+        """
+        Pick the starting concurrency with a short benchmark
+
+        ``measure_fps(concurrency, threads)`` runs ``concurrency`` encodes of
+        ``threads`` threads each at the same time and returns their combined
+        frames per second.
+        """
+        if candidates is None:
+            candidates = sorted({1, 2, max(1, self.cores // 4), max(1, self.cores // 2), self.cores})
+        results = {}
+        for concurrency in candidates:
+            if concurrency > self.max_concurrency:
+                continue
+            try:
+                results[concurrency] = measure_fps(concurrency, max(1, self.cores // concurrency))
+            except Exception as e:
+                print(f"Calibration at {concurrency} job(s) failed: {e}")
+        if not results:
+            return self.concurrency
+
+        best = max(results, key=results.get)
+        print(f"Calibrated {best} concurrent job(s): " + ', '.join(
+            f"{concurrency}={fps:.0f}fps" for concurrency, fps in sorted(results.items())
+        ))
+        now = time.monotonic()
+        with self._lock:
+            self.measurements = {concurrency: (fps, now) for concurrency, fps in results.items()}
+        self._set_concurrency(best)
+        return best
+
+    def status(self):
+        """Current decision and recent measurements"""
+        with self._lock:
+            return {
+                'leader': self.leading,
+                'concurrency': self.concurrency,
+                'threads_per_job': max(1, self.cores // self.concurrency),
+                'fps': {str(c): round(fps, 1) for c, (fps, _) in sorted(self.measurements.items())}
+            }
+
+    def adjust(self):
+        """Measure the last window and move the concurrency one step if that helps"""
+        now = time.monotonic()
+        host_frames = self._take_host_frames() if self.shared else None
+        with self._lock:
+            frames, self._frames = self._frames, 0
+            if host_frames is not None:
+                frames = host_frames
+            elapsed = now - self._window_started
+            saturated = self._window_saturated
+            self._window_started = now
+            self._window_saturated = True
+            concurrency = self.concurrency
+
+            # Throughput only says something about this level if every slot was busy
+            if saturated and elapsed > 0 and frames > 0:
+                fps = frames / elapsed
+                previous = self.measurements.get(concurrency)
+                if previous and now - previous[1] < self.memory:
+                    fps = (fps + previous[0]) / 2
+                self.measurements[concurrency] = (fps, now)
+            measured = {
+                level: fps for level, (fps, at) in self.measurements.items()
+                if now - at < self.memory
+            }
+
+        cpu = self.cpu_percent()
+        current = measured.get(concurrency)
+        below = measured.get(concurrency - 1)
+        above = measured.get(concurrency + 1)
+
+        target = concurrency
+        if cpu >= self.high_load and concurrency > 1 and not saturated:
+            # Something other than our jobs is using the CPU
+            target = concurrency - 1
+        elif current is not None and below is not None and current < below * (1 - self.tolerance):
+            target = concurrency - 1
+        elif (saturated and cpu < self.low_load and concurrency < self.max_concurrency
+                and (above is None or current is None or above > current * (1 + self.tolerance))):
+            target = concurrency + 1
+
+        if target != concurrency:
+            self._set_concurrency(target)
+        return target
+
+    def _set_concurrency(self, concurrency, publish=True):
+        concurrency = min(self.max_concurrency, max(1, concurrency))
+        with self._lock:
+            if concurrency == self.concurrency:
+                return
+            self.concurrency = concurrency
+        print(f"Autotuner: {concurrency} concurrent job(s), "
+              f"{max(1, self.cores // concurrency)} thread(s) each")
+        if publish and self.shared:
+            self.shared.publish(concurrency)
+        self.apply(concurrency)
+
+    def _take_host_frames(self):
+        """Frames encoded by every process on the host since the last call"""
+        totals = self.shared.frame_totals()
+        frames = 0
+        for name, total in totals.items():
+            previous = self._host_frames.get(name, 0)
+            # A lower total belongs to a new process that reused the pid
+            frames += total - previous if total >= previous else total
+        self._host_frames = totals
+        return frames
+
+    def _start_window(self):
+        if self.shared:
+            self._take_host_frames()
+        with self._lock:
+            self._frames = 0
+            self._window_started = time.monotonic()
+            self._window_saturated = True
+
+    def _sync(self):
+        """Report this process's frames and take over or follow the host's decision"""
+        with self._lock:
+            total = self._frames_total
+        self.shared.report_frames(total)
+        if not self.leading and self.shared.try_lead():
+            print("Autotuner: tuning for this host")
+            self.leading = True
+            self._start_window()
+        if not self.leading:
+            decision = self.shared.decision()
+            if decision:
+                self._set_concurrency(decision, publish=False)
+
+    def _tune_loop(self):
+        calibrated = False
+        deadline = time.monotonic() + self.interval
+        # Sample a few times per interval whether every slot was busy
+        while not self._stopped.wait(min(5.0, self.interval)):
+            try:
+                if self.shared:
+                    self._sync()
+                if not self.leading:
+                    continue
+                if self.measure_fps and not calibrated:
+                    calibrated = True
+                    self.calibrate(self.measure_fps)
+                    self._start_window()
+                    deadline = time.monotonic() + self.interval
+                    continue
+                if self.active_jobs() < self.concurrency:
+                    with self._lock:
+                        self._window_saturated = False
+                if time.monotonic() >= deadline:
+                    deadline = time.monotonic() + self.interval
+                    self.adjust()
+            except Exception as e:
+                print(f"Error autotuning concurrency: {e}")
@@ -0,0 +1,119 @@
+import threading
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """Stop calling a service that keeps failing
+
+    After ``failure_threshold`` failures in a row the circuit opens and
+    ``allow()`` refuses calls for ``reset_timeout`` seconds. Then it is
+    half-open: one trial call goes through, and its outcome either closes
+    the circuit again or reopens it.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead now"""
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_running = False
+            if self.state == self.HALF_OPEN:
+                if self._trial_running:
+                    return False
+                self._trial_running = True
+            return True
+
+    def retry_after(self):
+        """Seconds until the circuit lets a trial call through"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print("RAG circuit closed")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_ignored(self):
+        """A call finished without saying whether the service is healthy"""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"RAG circuit opened after {self.failures} failure(s)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+                self._trial_running = False
+
+    def status(self):
+        with self._lock:
+            return {'state': self.state, 'failures': self.failures}
+
+
+class LatencyTracker:
+    """Recent call latencies, for timeouts that follow how fast a service really is
+
+    ``timeout()`` is ``multiplier`` times the ``percentile`` of the last
+    ``window`` latencies, kept between ``minimum`` and ``maximum``. Until
+    ``min_samples`` calls have been seen it is ``maximum``.
+    """
+
+    def __init__(self, maximum, minimum=5.0, percentile=99.0, multiplier=3.0, window=200, min_samples=20):
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def record_timeout(self, seconds):
+        """A call that gave up after ``seconds``
+
+        It counts as a sample of that length: had it only recorded the
+        calls that finished, a timeout learned while the service was fast
+        could never grow again once the service slowed down.
+        """
+        self.record(seconds)
+
+    def latency(self):
+        """The tracked percentile of recent latencies, or None without enough samples"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+
+    def timeout(self):
+        latency = self.latency()
+        if latency is None:
+            return self.maximum
+        return min(self.maximum, max(self.minimum, latency * self.multiplier))
@@ -0,0 +1,156 @@
+import itertools
+import multiprocessing
+import os
+import socket
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import requests
+
+from app.transcoder import VideoTranscoder
+
+
+def encode_chunk(chunk):
+    """Encode one chunk on this machine and report which worker did it"""
+    VideoTranscoder().encode_segment(
+        chunk['input_file'],
+        chunk['output_file'],
+        chunk['start'],
+        chunk['end'],
+        chunk['settings']
+    )
+    return {
+        'index': chunk['index'],
+        'output_file': chunk['output_file'],
+        'worker': f"{socket.gethostname()}:{os.getpid()}"
+    }
+
+
+class ChunkTransport:
+    """Send chunk encodes to workers
+
+    ``submit`` takes a chunk dict and returns a Future whose result is the
+    dict returned by ``encode_chunk`` on the worker that encoded it. Chunk
+    paths must be reachable by the workers, e.g. on shared storage.
+    ``chunks_per_host`` is how many chunks one machine encodes at once.
+    """
+
+    chunks_per_host = 1
+
+    def submit(self, chunk):
+        raise NotImplementedError
+
+    def shutdown(self):
+        pass
+
+
+class LocalTransport(ChunkTransport):
+    """Encode chunks in a pool of local worker processes
+
+    Behaves like a small cluster on one machine, which makes it a stand-in
+    for remote workers in development and tests.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_host = self.workers
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+
+    def submit(self, chunk):
+        return self.pool.submit(encode_chunk, chunk)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class HttpTransport(ChunkTransport):
+    """Encode chunks on other Video Transcoder nodes over HTTP
+
+    Chunks are posted round-robin to the ``/api/cluster/chunks`` endpoint of
+    each node, so a retried chunk usually lands on a different node.
+    """
+
+    def __init__(self, nodes, chunks_per_node=1, timeout=3600, token=None):
+        if not nodes:
+            raise ValueError("HttpTransport needs at least one node")
+        self.nodes = [node.rstrip('/') for node in nodes]
+        self.timeout = timeout
+        self.token = token
+        self.chunks_per_host = chunks_per_node
+        self.session = requests.Session()
+        self.pool = ThreadPoolExecutor(max_workers=len(self.nodes) * chunks_per_node)
+        self._next_node = itertools.cycle(self.nodes)
+        self._lock = threading.Lock()
+
+    def submit(self, chunk):
+        with self._lock:
+            node = next(self._next_node)
+        return self.pool.submit(self._post, node, chunk)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def _post(self, node, chunk):
+        headers = {'X-Cluster-Token': self.token} if self.token else {}
+        response = self.session.post(
+            f"{node}/api/cluster/chunks", json=chunk, headers=headers, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+class ChunkCoordinator:
+    """Dispatch chunks to a transport, retrying the ones that fail
+
+    ``on_update`` is called as ``on_update(chunk, status, attempt, worker,
+    error)`` whenever a chunk changes state, with status one of
+    ``dispatched``, ``completed``, ``retrying`` or ``failed``.
+    """
+
+    def __init__(self, transport, max_retries=2, on_update=None):
+        self.transport = transport
+        self.max_retries = max_retries
+        self.on_update = on_update
+
+    def run(self, chunks, on_chunk_done=None):
+        """Encode every chunk, blocking until all of them are done
+
+        Raises the last error of a chunk that failed ``max_retries + 1`` times.
+        """
+        attempts = {}
+        in_flight = {}
+
+        def dispatch(chunk):
+            attempts[chunk['index']] = attempts.get(chunk['index'], 0) + 1
+            in_flight[self.transport.submit(chunk)] = chunk
+            self._update(chunk, 'dispatched', attempts[chunk['index']])
+
+        for chunk in chunks:
+            dispatch(chunk)
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                chunk = in_flight.pop(future)
+                attempt = attempts[chunk['index']]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    if attempt > self.max_retries:
+                        self._update(chunk, 'failed', attempt, error=str(e))
+                        for pending in in_flight:
+                            pending.cancel()
+                        raise Exception(f"Chunk {chunk['index']} failed after {attempt} attempt(s): {e}")
+                    self._update(chunk, 'retrying', attempt, error=str(e))
+                    dispatch(chunk)
+                else:
+                    self._update(chunk, 'completed', attempt, worker=result.get('worker'))
+                    if on_chunk_done:
+                        on_chunk_done(chunk['index'])
+
+    def _update(self, chunk, status, attempt, worker=None, error=None):
+        if self.on_update:
+            self.on_update(chunk, status, attempt, worker, error)
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -15,12 +16,63 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///transcoder.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Seconds between checks whether another worker changed the settings
+    SETTINGS_CHECK_INTERVAL = float(os.getenv('SETTINGS_CHECK_INTERVAL', '2'))
+
+    # Job listing API
+    JOBS_PAGE_SIZE = int(os.getenv('JOBS_PAGE_SIZE', '50'))
+    JOBS_MAX_PAGE_SIZE = int(os.getenv('JOBS_MAX_PAGE_SIZE', '500'))
+
+    # Status endpoint
+    STATUS_CACHE_TTL = float(os.getenv('STATUS_CACHE_TTL', '2'))
+    SYSTEM_SAMPLE_INTERVAL = float(os.getenv('SYSTEM_SAMPLE_INTERVAL', '5'))
+
     # Upload settings
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024 * 1024  # 16GB max file size
 
     # FFmpeg settings
     FFMPEG_PATH = os.getenv('FFMPEG_PATH', 'ffmpeg')
     FFPROBE_PATH = os.getenv('FFPROBE_PATH', 'ffprobe')
+    FFMPEG_THREADS_PER_JOB = int(os.getenv('FFMPEG_THREADS_PER_JOB', '2'))  # used when autotuning is off
+
+    # Choose concurrent jobs and threads per job from the CPU and measured fps
+    AUTOTUNE_ENABLED = os.getenv('AUTOTUNE_ENABLED', 'True') == 'True'
+    AUTOTUNE_INTERVAL = float(os.getenv('AUTOTUNE_INTERVAL', '30'))
+    AUTOTUNE_CALIBRATE = os.getenv('AUTOTUNE_CALIBRATE', 'False') == 'True'
+
+    # State shared by the worker processes of one host (autotuning decision, metrics)
+    RUN_DIR = os.getenv('RUN_DIR', os.path.join(tempfile.gettempdir(), 'video-transcoder'))
+    METRICS_WRITE_INTERVAL = float(os.getenv('METRICS_WRITE_INTERVAL', '5'))
+
+    # Job scheduler settings
+    MAX_CONCURRENT_JOBS = int(os.getenv('MAX_CONCURRENT_JOBS', '0'))  # per host, 0 = cores (autotune) or cores / FFMPEG_THREADS_PER_JOB
+    MAX_QUEUED_JOBS = int(os.getenv('MAX_QUEUED_JOBS', '0'))  # 0 = unbounded
+    SCHEDULER_POLL_INTERVAL = float(os.getenv('SCHEDULER_POLL_INTERVAL', '5'))
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '60'))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+
+    # Job progress is buffered in memory and written in batches
+    PROGRESS_FLUSH_INTERVAL = float(os.getenv('PROGRESS_FLUSH_INTERVAL', '5'))
+    PROGRESS_FLUSH_DELTA = float(os.getenv('PROGRESS_FLUSH_DELTA', '5'))
+
+    # Server-Sent Events stream (/api/events)
+    EVENTS_POLL_INTERVAL = float(os.getenv('EVENTS_POLL_INTERVAL', '2'))
+    EVENTS_KEEPALIVE = float(os.getenv('EVENTS_KEEPALIVE', '15'))
+    EVENTS_STREAM_MAX_AGE = float(os.getenv('EVENTS_STREAM_MAX_AGE', '300'))
+    EVENTS_MAX_STREAMS = int(os.getenv('EVENTS_MAX_STREAMS', '2'))  # per worker process
+
+    # Segment-parallel transcoding of long videos
+    PARALLEL_SEGMENTS = int(os.getenv('PARALLEL_SEGMENTS', '0'))  # 0 = disabled
+    PARALLEL_SEGMENT_MIN_DURATION = float(os.getenv('PARALLEL_SEGMENT_MIN_DURATION', '600'))
+
+    # Distributed chunk encoding (requires PARALLEL_SEGMENTS)
+    CLUSTER_TRANSPORT = os.getenv('CLUSTER_TRANSPORT', '')  # '', 'local' or 'http'
+    CLUSTER_LOCAL_WORKERS = int(os.getenv('CLUSTER_LOCAL_WORKERS', '0'))  # 0 = CPU cores
+    CLUSTER_NODES = [node.strip() for node in os.getenv('CLUSTER_NODES', '').split(',') if node.strip()]
+    CLUSTER_CHUNKS_PER_NODE = int(os.getenv('CLUSTER_CHUNKS_PER_NODE', '1'))
+    CLUSTER_CHUNK_TIMEOUT = int(os.getenv('CLUSTER_CHUNK_TIMEOUT', '3600'))
+    CLUSTER_CHUNK_RETRIES = int(os.getenv('CLUSTER_CHUNK_RETRIES', '2'))
+    CLUSTER_TOKEN = os.getenv('CLUSTER_TOKEN', '')
 
     # RAG Service settings
     RAG_URL = os.getenv('RAG_URL', 'localhost')
@@ -28,6 +80,45 @@ class Config:
     RAG_ENDPOINT = os.getenv('RAG_ENDPOINT', '/query')
     RAG_DEFAULT_TOP_K = int(os.getenv('RAG_DEFAULT_TOP_K', '3'))
     RAG_DEFAULT_TEMPERATURE = float(os.getenv('RAG_DEFAULT_TEMPERATURE', '0.1'))
+    RAG_MAX_CONCURRENT = int(os.getenv('RAG_MAX_CONCURRENT', '4'))  # per process
+    RAG_CONNECT_TIMEOUT = float(os.getenv('RAG_CONNECT_TIMEOUT', '3'))
+    RAG_READ_TIMEOUT = float(os.getenv('RAG_READ_TIMEOUT', '120'))
+    RAG_QUEUE_TIMEOUT = float(os.getenv('RAG_QUEUE_TIMEOUT', '5'))
+    RAG_CACHE_SIZE = int(os.getenv('RAG_CACHE_SIZE', '256'))  # 0 disables the cache
+    RAG_CACHE_TTL = float(os.getenv('RAG_CACHE_TTL', '300'))
+    RAG_BATCH_MAX_ITEMS = int(os.getenv('RAG_BATCH_MAX_ITEMS', '50'))
+    RAG_BATCH_CONCURRENCY = int(os.getenv('RAG_BATCH_CONCURRENCY', '4'))
+    RAG_BREAKER_FAILURES = int(os.getenv('RAG_BREAKER_FAILURES', '5'))
+    RAG_BREAKER_RESET_SECONDS = float(os.getenv('RAG_BREAKER_RESET_SECONDS', '30'))
+    RAG_ADAPTIVE_TIMEOUT = os.getenv('RAG_ADAPTIVE_TIMEOUT', 'True') == 'True'
+    RAG_MIN_READ_TIMEOUT = float(os.getenv('RAG_MIN_READ_TIMEOUT', '5'))
+    RAG_TIMEOUT_PERCENTILE = float(os.getenv('RAG_TIMEOUT_PERCENTILE', '99'))
+    RAG_TIMEOUT_MULTIPLIER = float(os.getenv('RAG_TIMEOUT_MULTIPLIER', '3'))
+
+    # Folder watcher: new files are queued once their size and mtime
+    # have not changed for WATCH_SETTLE_SECONDS
+    WATCH_SETTLE_SECONDS = float(os.getenv('WATCH_SETTLE_SECONDS', '5'))
+    WATCH_POLL_INTERVAL = float(os.getenv('WATCH_POLL_INTERVAL', '1'))
+
+    # Reuse earlier outputs for identical input content and encode settings
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True') == 'True'
+    # Key on a hash of the whole file instead of its size, head and tail
+    RESULT_CACHE_FULL_HASH = os.getenv('RESULT_CACHE_FULL_HASH', 'False') == 'True'
+
+    # Segment length for HLS/DASH outputs
+    STREAM_SEGMENT_SECONDS = int(os.getenv('STREAM_SEGMENT_SECONDS', '6'))
+
+    # Copy streams that already match the target codec instead of re-encoding
+    PASSTHROUGH_ENABLED = os.getenv('PASSTHROUGH_ENABLED', 'True') == 'True'
+    # Streams above these bitrates (kbps), or of unknown bitrate, are re-encoded anyway; 0 = no limit
+    PASSTHROUGH_MAX_VIDEO_BITRATE = int(os.getenv('PASSTHROUGH_MAX_VIDEO_BITRATE', '8000'))
+    PASSTHROUGH_MAX_AUDIO_BITRATE = int(os.getenv('PASSTHROUGH_MAX_AUDIO_BITRATE', '320'))
+
+    # ffprobe results kept in memory (they are also stored in the file index)
+    PROBE_CACHE_SIZE = int(os.getenv('PROBE_CACHE_SIZE', '1024'))
+    # Probe new files in the background after a scan, with at most this many ffprobe processes
+    PROBE_ON_SCAN = os.getenv('PROBE_ON_SCAN', 'True') == 'True'
+    PROBE_WORKERS = int(os.getenv('PROBE_WORKERS', '4'))
 
     # Supported video formats
     SUPPORTED_VIDEO_FORMATS = ['.mp4', '.avi', '.mkv', '.mov', '.flv', '.wmv', '.m4v', '.webm', '.mpg', '.mpeg']
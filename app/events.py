@@ -0,0 +1,110 @@
+import json
+import queue
+import threading
+
+
+def format_sse(event, data):
+    """Format a message for a text/event-stream response"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class EventBroker:
+    """Fan out job events to the Server-Sent Event streams of this process
+
+    Each stream gets its own bounded queue. A stream that cannot keep up is
+    sent a ``resync`` event instead of the messages it missed, telling the
+    client to reload the job list.
+    """
+
+    def __init__(self, max_queued=1000):
+        self.max_queued = max_queued
+        self.subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Register a new stream and return its queue"""
+        subscriber = queue.Queue(self.max_queued)
+        with self._lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        """Remove a stream that has been closed"""
+        with self._lock:
+            self.subscribers.discard(subscriber)
+
+    def has_subscribers(self):
+        """Check if any stream is listening"""
+        return bool(self.subscribers)
+
+    def publish(self, event, data):
+        """Send an event to every stream"""
+        with self._lock:
+            subscribers = list(self.subscribers)
+
+        message = format_sse(event, data)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                self._resync(subscriber)
+
+    def _resync(self, subscriber):
+        try:
+            while True:
+                subscriber.get_nowait()
+        except queue.Empty:
+            pass
+        subscriber.put_nowait(format_sse('resync', {}))
+
+
+class ChangeFeed:
+    """Poll for changes made by other processes and publish them
+
+    Only runs queries while at least one stream is subscribed to the
+    broker. ``fetch_changes`` is called with the cursor returned by its
+    previous call (None the first time) and returns ``(events, cursor)``
+    where events is a list of ``(event, data)`` tuples.
+    """
+
+    def __init__(self, broker, fetch_changes, interval=2.0):
+        self.broker = broker
+        self.fetch_changes = fetch_changes
+        self.interval = interval
+        self.cursor = None
+        self.thread = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the polling thread"""
+        if self.thread:
+            return
+        self._stopped.clear()
+        self.thread = threading.Thread(target=self._poll_loop, name='event-change-feed', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the polling thread"""
+        self._stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        """Check if the polling thread is running"""
+        return self.thread is not None
+
+    def _poll_loop(self):
+        while not self._stopped.wait(self.interval):
+            if not self.broker.has_subscribers():
+                # Changes made while nobody was listening are covered by
+                # the job list clients load when they connect
+                self.cursor = None
+                continue
+            try:
+                events, self.cursor = self.fetch_changes(self.cursor)
+            except Exception as e:
+                print(f"Error polling for job changes: {e}")
+                continue
+            for event, data in events:
+                self.broker.publish(event, data)
@@ -0,0 +1,127 @@
+import itertools
+import threading
+import time
+
+
+def _seconds(value):
+    # out_time_us and (despite its name) out_time_ms are both microseconds
+    return int(value) / 1000000
+
+
+def _kbits(value):
+    return float(value[:-len('kbits/s')] if value.endswith('kbits/s') else value)
+
+
+def _speed(value):
+    return float(value[:-1] if value.endswith('x') else value)
+
+
+# -progress key -> (record field, converter)
+PROGRESS_FIELDS = {
+    'frame': ('frame', int),
+    'fps': ('fps', float),
+    'bitrate': ('bitrate', _kbits),
+    'total_size': ('total_size', int),
+    'out_time_us': ('out_time', _seconds),
+    'out_time_ms': ('out_time', _seconds),
+    'dup_frames': ('dup_frames', int),
+    'drop_frames': ('drop_frames', int),
+    'speed': ('speed', _speed),
+}
+
+
+class ProgressParser:
+    """Turn FFmpeg's ``-progress`` output into one record per block
+
+    FFmpeg writes a block of ``key=value`` lines and ends it with
+    ``progress=continue`` (or ``progress=end`` for the last one). ``feed``
+    returns the finished record on that line and None on every other line.
+    Values FFmpeg reports as ``N/A`` and lines that are not progress keys
+    (FFmpeg's log when stderr is merged) are skipped.
+    """
+
+    def __init__(self):
+        self._block = {}
+
+    def feed(self, line):
+        key, separator, value = line.partition('=')
+        if not separator:
+            return None
+        value = value.strip()
+
+        if key == 'progress':
+            record, self._block = self._block, {}
+            record['progress'] = value
+            return record
+
+        field = PROGRESS_FIELDS.get(key)
+        if field is not None:
+            try:
+                self._block[field[0]] = field[1](value)
+            except ValueError:
+                pass
+        return None
+
+
+class EncodeStats:
+    """Combined speed of the FFmpeg runs working on one job
+
+    Each run (a whole-file encode, or one chunk of a segmented encode) gets
+    an id from ``start()`` and reports its records with ``update()``. Runs
+    without video frames, such as the separate audio encode, do not count.
+    ``duration`` is the length of the source in seconds, used for the ETA.
+    """
+
+    def __init__(self, duration=0.0):
+        self.duration = duration
+        self.started_at = None
+        self._runs = {}
+        self._run_ids = itertools.count()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Id for a new run"""
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+            return next(self._run_ids)
+
+    def update(self, run, record):
+        with self._lock:
+            self._runs[run] = record
+
+    def summary(self):
+        """Frame rate, speed, bitrate and ETA of the job so far"""
+        with self._lock:
+            video = [record for record in self._runs.values() if record.get('frame')]
+            elapsed = time.monotonic() - self.started_at if self.started_at else 0.0
+        if not video:
+            return None
+
+        frames = sum(record['frame'] for record in video)
+        encoded = sum(record.get('out_time', 0.0) for record in video)
+        bitrates = [record['bitrate'] for record in video if record.get('bitrate')]
+        active = [record for record in video if record.get('progress') != 'end']
+        if active:
+            fps = sum(record.get('fps', 0.0) for record in active)
+            speed = sum(record.get('speed', 0.0) for record in active)
+        else:
+            # Every run has finished: average over the whole job
+            fps = frames / elapsed if elapsed > 0 else 0.0
+            speed = encoded / elapsed if elapsed > 0 else 0.0
+
+        eta = None
+        if active and self.duration and speed > 0:
+            eta = max(0.0, self.duration - encoded) / speed
+        elif not active:
+            eta = 0.0
+
+        return {
+            'frame': frames,
+            'fps': round(fps, 2),
+            'speed': round(speed, 3),
+            'bitrate': round(sum(bitrates) / len(bitrates), 1) if bitrates else None,
+            'dup_frames': sum(record.get('dup_frames', 0) for record in video),
+            'drop_frames': sum(record.get('drop_frames', 0) for record in video),
+            'eta': round(eta, 1) if eta is not None else None
+        }
@@ -0,0 +1,90 @@
+import hashlib
+import os
+from pathlib import Path
+
+# Bytes read from each end of a file for its quick fingerprint
+FINGERPRINT_CHUNK = 64 * 1024
+
+# Directory mtimes closer than this to the previous scan are not trusted,
+# since coarse filesystem timestamps could hide a later change
+MTIME_SLACK = 2.0
+
+
+def quick_fingerprint(path, size=None):
+    """Fingerprint a file from its size and the bytes at its head and tail"""
+    if size is None:
+        size = os.path.getsize(path)
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(size).encode())
+    with open(path, 'rb') as f:
+        digest.update(f.read(FINGERPRINT_CHUNK))
+        if size > FINGERPRINT_CHUNK:
+            f.seek(max(FINGERPRINT_CHUNK, size - FINGERPRINT_CHUNK))
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return digest.hexdigest()
+
+
+class ScanResult:
+    """What changed under a folder since the previous scan"""
+
+    def __init__(self):
+        # path -> mtime of directories that were listed
+        self.listed_dirs = {}
+        # path -> parent of directories seen for the first time
+        self.new_dirs = {}
+        # directories that no longer exist
+        self.removed_dirs = set()
+        # path -> os.stat_result of video files in listed directories
+        self.files = {}
+        self.skipped_dirs = 0
+
+
+def scan_tree(root, extensions, known_dirs, full=False):
+    """Walk ``root`` with os.scandir, skipping directories that did not change
+
+    ``known_dirs`` maps directory paths from the previous scan to
+    ``(mtime, scanned_at, children)``. A directory whose mtime is unchanged
+    has had no entries added or removed, so its files are not listed again
+    and only its known subdirectories are visited. ``full`` lists every
+    directory regardless.
+    """
+    result = ScanResult()
+    stack = [(root, None)]
+
+    while stack:
+        path, parent = stack.pop()
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            if path in known_dirs:
+                result.removed_dirs.add(path)
+            continue
+
+        known = known_dirs.get(path)
+        if known is None:
+            result.new_dirs[path] = parent
+        elif not full and known[0] == mtime and mtime < known[1] - MTIME_SLACK:
+            result.skipped_dirs += 1
+            stack.extend((child, path) for child in known[2])
+            continue
+
+        result.listed_dirs[path] = mtime
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file() and Path(entry.name).suffix.lower() in extensions:
+                        result.files[entry.path] = entry.stat()
+        except OSError as e:
+            print(f"Error scanning {path}: {e}")
+            continue
+
+        # Known children missing from the listing were removed
+        if known is not None:
+            result.removed_dirs.update(set(known[2]) - set(subdirs))
+        stack.extend((subdir, path) for subdir in subdirs)
+
+    return result
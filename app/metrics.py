@@ -0,0 +1,375 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshots of stopped processes are kept as they are
+    fcntl = None
+
+# Bucket upper bounds in seconds, from a fast commit to a long encode
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800, 7200)
+
+
+def format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self.labels = tuple(labels)
+        # label values -> [bucket counts..., sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """Record one value"""
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def series(self):
+        """{label values: [bucket counts..., sum, count]}"""
+        with self._lock:
+            return {key: list(values) for key, values in self._series.items()}
+
+    def samples(self, series=None):
+        series = self.series() if series is None else series
+        lines = []
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                labels = format_labels(self.labels, key, ('le', format_value(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(self.labels, key, ('le', '+Inf'))
+            lines.append(f'{self.name}_bucket{labels} {values[-1]}')
+            labels = format_labels(self.labels, key)
+            lines.append(f'{self.name}_sum{labels} {format_value(values[-2])}')
+            lines.append(f'{self.name}_count{labels} {values[-1]}')
+        return lines
+
+
+class Counter:
+    """Value that only goes up"""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        # An unlabelled counter reports 0 before its first increment
+        self._values = {} if self.labels else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def series(self):
+        """{label values: value}"""
+        with self._lock:
+            return dict(self._values)
+
+    def samples(self, series=None):
+        series = self.series() if series is None else series
+        return [
+            f'{self.name}{format_labels(self.labels, key)} {format_value(value)}'
+            for key, value in sorted(series.items())
+        ]
+
+
+class Gauge:
+    """Current value, read from a function when metrics are rendered"""
+
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, function):
+        self.name = name
+        self.help_text = help_text
+        self.function = function
+
+    def series(self):
+        try:
+            value = self.function()
+        except Exception:
+            return {}
+        if value is None:
+            return {}
+        return {(): value}
+
+    def samples(self, series=None, labels=()):
+        series = self.series() if series is None else series
+        return [
+            f'{self.name}{format_labels(labels, key)} {format_value(value)}'
+            for key, value in sorted(series.items())
+        ]
+
+
+# Counters and histograms of stopped processes, folded into one snapshot
+RETIRED_FILE = 'retired.json'
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def load_snapshot(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def add_series(total, values):
+    """Sum a counter value or a histogram's bucket list into ``total``"""
+    if total is None:
+        return values
+    if isinstance(values, list):
+        return [a + b for a, b in zip(total, values)]
+    return total + values
+
+
+class Registry:
+    """Collection of metrics rendered in the Prometheus text format
+
+    After ``share(directory)`` every process serving the app writes its
+    values to its own file in ``directory`` (from ``start()``'s thread and
+    on every render), and ``render()`` reports the whole host: counters and
+    histograms summed over every process, gauges once per live process with
+    a ``worker`` label. Snapshots of processes that have exited are folded
+    into one ``retired.json``, so the directory does not grow with every
+    worker restart.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.directory = None
+        self.interval = 5.0
+        self.thread = None
+        self._started_at = int(time.time())
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def _register(self, metric):
+        with self._lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS, labels=()):
+        return self._register(Histogram(name, help_text, buckets, labels))
+
+    def counter(self, name, help_text, labels=()):
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, function):
+        return self._register(Gauge(name, help_text, function))
+
+    def share(self, directory):
+        """Aggregate the metrics of every process writing to ``directory``"""
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def start(self, interval=5.0):
+        """Write this process's values to the shared directory every ``interval`` seconds"""
+        if self.thread or not self.directory:
+            return
+        self.interval = interval
+        self._stopped.clear()
+        self.thread = threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        return self.thread is not None
+
+    def render(self):
+        """Every metric as Prometheus exposition text"""
+        with self._lock:
+            metrics = list(self.metrics.values())
+
+        if self.directory:
+            self.write_snapshot()
+            self.retire_snapshots()
+            series = self._read_snapshots(metrics)
+        else:
+            series = {metric.name: metric.series() for metric in metrics}
+
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help_text}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            if metric.kind == 'gauge' and self.directory:
+                lines.extend(metric.samples(series.get(metric.name, {}), labels=('worker',)))
+            else:
+                lines.extend(metric.samples(series.get(metric.name, {})))
+        return '\n'.join(lines) + '\n'
+
+    def write_snapshot(self):
+        """Store this process's current values in the shared directory"""
+        with self._lock:
+            metrics = list(self.metrics.values())
+        snapshot = {
+            'pid': os.getpid(),
+            'metrics': {
+                metric.name: [[list(key), value] for key, value in metric.series().items()]
+                for metric in metrics
+            }
+        }
+        path = os.path.join(self.directory, f'{os.getpid()}-{self._started_at}.json')
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(snapshot, f)
+        os.replace(temp_path, path)
+
+    def retire_snapshots(self):
+        """Fold the snapshots of exited processes into the retired totals"""
+        if fcntl is None:
+            return
+        with self._lock:
+            kinds = {metric.name: metric.kind for metric in self.metrics.values()}
+        with open(os.path.join(self.directory, 'retire.lock'), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            retired_path = os.path.join(self.directory, RETIRED_FILE)
+            retired = load_snapshot(retired_path) or {'pid': None, 'metrics': {}, 'merged': []}
+
+            # Files already counted in the retired totals but not yet deleted
+            for name in retired.get('merged', []):
+                if os.path.exists(os.path.join(self.directory, name)):
+                    os.remove(os.path.join(self.directory, name))
+
+            totals = {
+                metric_name: {tuple(key): value for key, value in entries}
+                for metric_name, entries in retired['metrics'].items()
+            }
+            merged = []
+            for name in os.listdir(self.directory):
+                if not name.endswith('.json') or name == RETIRED_FILE:
+                    continue
+                snapshot = load_snapshot(os.path.join(self.directory, name))
+                if snapshot is None or process_alive(snapshot['pid']):
+                    continue
+                for metric_name, entries in snapshot.get('metrics', {}).items():
+                    if kinds.get(metric_name, 'gauge') == 'gauge':
+                        continue
+                    series = totals.setdefault(metric_name, {})
+                    for key, value in entries:
+                        series[tuple(key)] = add_series(series.get(tuple(key)), value)
+                merged.append(name)
+            if not merged:
+                return
+
+            retired = {
+                'pid': None,
+                'metrics': {
+                    metric_name: [[list(key), value] for key, value in series.items()]
+                    for metric_name, series in totals.items()
+                },
+                'merged': merged
+            }
+            temp_path = f'{retired_path}.{os.getpid()}.tmp'
+            with open(temp_path, 'w') as f:
+                json.dump(retired, f)
+            os.replace(temp_path, retired_path)
+            for name in merged:
+                os.remove(os.path.join(self.directory, name))
+
+    def _read_snapshots(self, metrics):
+        # Stopped processes keep counting towards counters and histograms,
+        # so those never go down; their gauges are left out
+        kinds = {metric.name: metric.kind for metric in metrics}
+        live_after = time.time() - 3 * self.interval
+        merged = {}
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                live = os.path.getmtime(path) >= live_after
+            except OSError:
+                continue
+            snapshot = load_snapshot(path)
+            if snapshot is None:
+                continue
+            for metric_name, entries in snapshot.get('metrics', {}).items():
+                kind = kinds.get(metric_name)
+                if kind is None:
+                    continue
+                series = merged.setdefault(metric_name, {})
+                for key, value in entries:
+                    if kind == 'gauge':
+                        if live and snapshot['pid'] is not None:
+                            series[(str(snapshot['pid']),)] = value
+                    else:
+                        key = tuple(key)
+                        series[key] = add_series(series.get(key), value)
+        return merged
+
+    def _write_loop(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.write_snapshot()
+                self.retire_snapshots()
+            except Exception as e:
+                print(f"Error writing metrics: {e}")
+
+
+# Metrics of this process (of the whole host once shared)
+REGISTRY = Registry()
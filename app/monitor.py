@@ -0,0 +1,91 @@
+import threading
+import time
+
+import psutil
+
+
+class SystemSampler:
+    """Sample system load in the background so requests never wait on psutil
+
+    ``disk_paths`` is called on every sample and returns the folders whose
+    disk usage should be reported.
+    """
+
+    def __init__(self, interval=5.0, disk_paths=None):
+        self.interval = interval
+        self.disk_paths = disk_paths
+        self.thread = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._sample = {
+            'cpu_percent': 0.0,
+            'memory_percent': 0.0,
+            'disk': {},
+            'ffmpeg_processes': 0,
+            'sampled_at': None
+        }
+
+    def start(self):
+        """Start the sampling thread"""
+        if self.thread:
+            return
+        self._stopped.clear()
+        # The first cpu_percent() call only sets the baseline
+        psutil.cpu_percent(interval=None)
+        self.thread = threading.Thread(target=self._sample_loop, name='system-sampler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the sampling thread"""
+        self._stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        """Check if the sampling thread is running"""
+        return self.thread is not None
+
+    def latest(self):
+        """Most recent sample"""
+        with self._lock:
+            return dict(self._sample)
+
+    def sample(self):
+        """Take a sample now"""
+        disk = {}
+        for path in (self.disk_paths() if self.disk_paths else []):
+            try:
+                usage = psutil.disk_usage(path)
+            except OSError:
+                continue
+            disk[path] = {'percent': usage.percent, 'free': usage.free}
+
+        ffmpeg_processes = 0
+        for process in psutil.process_iter(['name']):
+            name = process.info.get('name') or ''
+            if name.startswith('ffmpeg'):
+                ffmpeg_processes += 1
+
+        sample = {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'memory_percent': psutil.virtual_memory().percent,
+            'disk': disk,
+            'ffmpeg_processes': ffmpeg_processes,
+            'sampled_at': time.time()
+        }
+        with self._lock:
+            self._sample = sample
+        return sample
+
+    def _sample_loop(self):
+        # Give cpu_percent() a short window to measure before the first sample
+        if self._stopped.wait(min(self.interval, 1.0)):
+            return
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Error sampling system stats: {e}")
+            if self._stopped.wait(self.interval):
+                return
@@ -0,0 +1,77 @@
+import os
+import threading
+from collections import OrderedDict
+
+from app.metrics import REGISTRY
+
+CACHE_HITS = REGISTRY.counter('probe_cache_hits_total', 'Probe cache lookups answered without ffprobe')
+CACHE_MISSES = REGISTRY.counter('probe_cache_misses_total', 'Probe cache lookups that ran ffprobe')
+
+
+def probe_key(path):
+    """Cache key of a file: its path, size and mtime"""
+    stat = os.stat(path)
+    return (path, stat.st_size, stat.st_mtime)
+
+
+class ProbeCache:
+    """LRU cache of ffprobe results keyed by (path, size, mtime)
+
+    A file that is rewritten gets a new size or mtime and so a new key;
+    stale entries simply age out. Entries are also handed to the optional
+    ``save(key, probe)`` callable so they outlive the process, and
+    ``load(key)`` is asked for entries that are not in memory.
+    """
+
+    def __init__(self, max_entries=1024, load=None, save=None):
+        self.max_entries = max_entries
+        self.load = load
+        self.save = save
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Cached probe for a key, or None"""
+        with self._lock:
+            probe = self._entries.get(key)
+            if probe is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                CACHE_HITS.inc()
+                return probe
+
+        probe = self.load(key) if self.load else None
+        if probe is None:
+            with self._lock:
+                self.misses += 1
+            CACHE_MISSES.inc()
+            return None
+
+        with self._lock:
+            self.hits += 1
+        CACHE_HITS.inc()
+        self._remember(key, probe)
+        return probe
+
+    def put(self, key, probe):
+        """Cache a probe and persist it"""
+        self._remember(key, probe)
+        if self.save:
+            try:
+                self.save(key, probe)
+            except Exception as e:
+                print(f"Error saving probe for {key[0]}: {e}")
+
+    def stats(self):
+        """Entry count and hit/miss counters"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+    def _remember(self, key, probe):
+        with self._lock:
+            self._entries[key] = probe
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+import uuid
+
+# Settings row whose value changes whenever a profile is written
+PROFILES_VERSION_KEY = '_profiles_version'
+
+# Encode settings a profile can set, with their type
+PROFILE_FIELDS = {
+    'video_codec': str,
+    'audio_codec': str,
+    'audio_bitrate': str,
+    'preset': str,
+    'crf': int,
+    'max_height': int,
+    'threads': int,
+}
+
+
+def parse_profile(data, current=None):
+    """Validate profile fields from a request, returning (values, error)"""
+    values = dict(current or {})
+    name = data.get('name', values.get('name'))
+    if not name or not str(name).strip():
+        return None, 'Profile name is required'
+    values['name'] = str(name).strip()
+
+    folder = data.get('folder', values.get('folder'))
+    values['folder'] = os.path.normpath(folder) if folder else None
+
+    for field, kind in PROFILE_FIELDS.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if value in (None, ''):
+            values[field] = None
+            continue
+        try:
+            values[field] = kind(value)
+        except (TypeError, ValueError):
+            return None, f'{field} must be a {kind.__name__}'
+
+    if values.get('crf') is not None and not 0 <= values['crf'] <= 51:
+        return None, 'crf must be between 0 and 51'
+    return values, None
+
+
+class ProfileStore:
+    """In-memory copy of the encode profiles
+
+    Profiles are loaded once and served from memory, so resolving a job's
+    profile never touches the database. Writers call ``changed()``, which
+    stores a new version; other processes notice the version change (checked
+    at most every ``check_interval`` seconds) and reload.
+
+    ``load()`` returns every profile as a dict with at least ``id``, ``name``
+    and ``folder``, ``read_version()`` returns the stored version and
+    ``write_version(version)`` stores a new one.
+    """
+
+    def __init__(self, load, read_version, write_version, check_interval=2.0):
+        self.load = load
+        self.read_version = read_version
+        self.write_version = write_version
+        self.check_interval = check_interval
+        self.version = None
+        self.profiles = None
+        self.by_name = {}
+        self.folders = []
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, profile_id):
+        """Profile by id, or None"""
+        return self._current().get(profile_id)
+
+    def find(self, reference):
+        """Profile by id or name, or None"""
+        profiles = self._current()
+        with self._lock:
+            profile_id = self.by_name.get(str(reference))
+        if profile_id is None:
+            try:
+                profile_id = int(reference)
+            except (TypeError, ValueError):
+                return None
+        return profiles.get(profile_id)
+
+    def for_source(self, path):
+        """Profile assigned to the deepest folder containing ``path``, or None"""
+        profiles = self._current()
+        path = os.path.normpath(path)
+        with self._lock:
+            folders = self.folders
+        for folder, profile_id in folders:
+            if path.startswith(folder + os.sep):
+                return profiles.get(profile_id)
+        return None
+
+    def all(self):
+        """Every profile, ordered by name"""
+        return sorted(self._current().values(), key=lambda profile: profile['name'])
+
+    def changed(self):
+        """Record that profiles were written so every process reloads them"""
+        self.write_version(uuid.uuid4().hex)
+        with self._lock:
+            self.profiles = None
+
+    def _current(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.profiles is not None and now - self.checked_at < self.check_interval:
+                return self.profiles
+
+            version = self.read_version()
+            if self.profiles is None or version != self.version:
+                rows = self.load()
+                self.profiles = {row['id']: row for row in rows}
+                self.by_name = {row['name']: row['id'] for row in rows}
+                # Deepest folders first so the most specific assignment wins
+                self.folders = sorted(
+                    ((row['folder'], row['id']) for row in rows if row.get('folder')),
+                    key=lambda item: len(item[0]),
+                    reverse=True
+                )
+                self.version = version
+            self.checked_at = now
+            return self.profiles
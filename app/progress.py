@@ -0,0 +1,111 @@
+import threading
+
+
+class ProgressTracker:
+    """Keep live job progress in memory and write it to the database in batches
+
+    ``update`` is cheap and can be called for every progress line FFmpeg
+    prints. Changed values are handed to ``flush`` as a ``{job_id: progress}``
+    dict every ``interval`` seconds, or sooner once a job has moved by at
+    least ``min_delta`` percent since it was last written. The latest encode
+    stats given to ``update_stats`` are passed along as a second
+    ``{job_id: stats}`` dict.
+    """
+
+    def __init__(self, flush, interval=5.0, min_delta=5.0):
+        self.flush_callback = flush
+        self.interval = interval
+        self.min_delta = min_delta
+        self.live = {}
+        self.stats = {}
+        self.flushed = {}
+        self.dirty = set()
+        self.thread = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+
+    def start(self):
+        """Start the background flush thread"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+
+        self.thread = threading.Thread(target=self._flush_loop, name='progress-flush', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Flush outstanding progress and stop the background thread"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+        self._wakeup.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def is_running(self):
+        """Check if the flush thread is running"""
+        return self._running
+
+    def update(self, job_id, progress):
+        """Record the latest progress of a job"""
+        with self._lock:
+            self.live[job_id] = progress
+            self.dirty.add(job_id)
+            if abs(progress - self.flushed.get(job_id, 0.0)) >= self.min_delta:
+                self._wakeup.set()
+
+    def update_stats(self, job_id, stats):
+        """Record the latest encode stats (fps, speed, bitrate, ETA) of a job"""
+        with self._lock:
+            self.stats[job_id] = stats
+            self.dirty.add(job_id)
+
+    def get_stats(self, job_id):
+        """Live encode stats of a job, or None"""
+        with self._lock:
+            return self.stats.get(job_id)
+
+    def get(self, job_id, default=None):
+        """Live progress of a job, or ``default`` if it is not running here"""
+        with self._lock:
+            return self.live.get(job_id, default)
+
+    def finish(self, job_id):
+        """Forget a job once its final state has been written"""
+        with self._lock:
+            self.live.pop(job_id, None)
+            self.stats.pop(job_id, None)
+            self.flushed.pop(job_id, None)
+            self.dirty.discard(job_id)
+
+    def flush(self):
+        """Write all changed progress values now"""
+        with self._lock:
+            changes = {job_id: self.live[job_id] for job_id in self.dirty if job_id in self.live}
+            stats = {job_id: self.stats[job_id] for job_id in changes if job_id in self.stats}
+            self.dirty.clear()
+        if not changes:
+            return
+
+        try:
+            self.flush_callback(changes, stats)
+        except Exception as e:
+            print(f"Error flushing job progress: {e}")
+            with self._lock:
+                self.dirty.update(job_id for job_id in changes if job_id in self.live)
+            return
+
+        with self._lock:
+            for job_id, progress in changes.items():
+                if job_id in self.live:
+                    self.flushed[job_id] = progress
+
+    def _flush_loop(self):
+        while self._running:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            self.flush()
@@ -0,0 +1,126 @@
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from app.metrics import REGISTRY
+
+CACHE_HITS = REGISTRY.counter('rag_cache_hits_total', 'RAG queries answered from the cache')
+CACHE_MISSES = REGISTRY.counter('rag_cache_misses_total', 'RAG queries sent to the RAG service')
+CACHE_COALESCED = REGISTRY.counter(
+    'rag_cache_coalesced_total', 'RAG queries that waited for an identical query in flight'
+)
+
+
+def normalize_query(query):
+    """Query text reduced to what changes the answer: case, spacing and trailing punctuation do not"""
+    text = unicodedata.normalize('NFKC', str(query)).casefold()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.rstrip('?!.;, ')
+
+
+def rag_cache_key(payload):
+    """Cache key of a RAG payload"""
+    return json.dumps([
+        normalize_query(payload.get('query', '')),
+        int(payload.get('top_k') or 0),
+        bool(payload.get('use_rag')),
+        round(float(payload.get('temperature') or 0), 3)
+    ])
+
+
+class Flight:
+    """A query being answered upstream that identical queries can wait for"""
+
+    def __init__(self):
+        self.entry = None
+        self._done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Cached entry the leader produced, or None if it failed or took too long"""
+        self._done.wait(timeout)
+        return self.entry
+
+
+class RagCache:
+    """LRU cache of RAG answers that expire after ``ttl`` seconds
+
+    Concurrent identical queries are coalesced: ``claim`` makes the first
+    caller the leader, which asks the RAG service and then calls ``finish``
+    (or ``abandon`` if it failed); the others wait on its ``Flight``.
+    """
+
+    def __init__(self, max_entries=256, ttl=300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def claim(self, key):
+        """
+        Look a key up, returning one of:
+
+        ``('hit', entry)``: a cached ``{'body', 'content_type'}``;
+        ``('leader', flight)``: nobody is asking yet, the caller must;
+        ``('follower', flight)``: wait for the caller that is asking.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if time.monotonic() < entry['expires']:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    CACHE_HITS.inc()
+                    return 'hit', entry
+                del self._entries[key]
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                CACHE_COALESCED.inc()
+                return 'follower', flight
+
+            self.misses += 1
+            CACHE_MISSES.inc()
+            flight = self._flights[key] = Flight()
+            return 'leader', flight
+
+    def finish(self, key, flight, body, content_type):
+        """Store the leader's answer and hand it to everyone waiting"""
+        entry = {'body': body, 'content_type': content_type, 'expires': time.monotonic() + self.ttl}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.entry = entry
+        flight._done.set()
+
+    def abandon(self, key, flight):
+        """Give up on a flight; waiting callers go to the RAG service themselves"""
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight._done.set()
+
+    def stats(self):
+        """Entry count and hit/miss counters"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced
+            }
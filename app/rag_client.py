@@ -0,0 +1,202 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class RagBusy(Exception):
+    """Every connection to the RAG service stayed in use for too long"""
+
+
+class RagUnavailable(Exception):
+    """The RAG service failed repeatedly and is not being called for now"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RagStream:
+    """Upstream response whose body is passed through in chunks
+
+    The response holds one of the client's slots until its body has been
+    read or ``close()`` is called. ``on_complete``, if given, is called once
+    the whole body has been read.
+    """
+
+    def __init__(self, response, release, chunk_size, on_complete=None):
+        self.response = response
+        self.status_code = response.status_code
+        self.content_type = response.headers.get('Content-Type', 'application/json')
+        self.chunk_size = chunk_size
+        self.on_complete = on_complete
+        self._release = release
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            yield from self.response.iter_content(self.chunk_size)
+            if self.on_complete:
+                self.on_complete()
+        finally:
+            self.close()
+
+    def read(self):
+        """Whole body as bytes"""
+        try:
+            content = self.response.content
+            if self.on_complete:
+                self.on_complete()
+            return content
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.response.close()
+        self._release()
+
+
+class RagClient:
+    """Keep-alive HTTP client for the RAG service
+
+    Requests share one pooled session, so calls reuse open connections
+    instead of connecting each time. At most ``max_concurrent`` calls run at
+    once per process; a call that cannot get a slot within ``queue_timeout``
+    seconds raises ``RagBusy`` instead of tying up another web thread.
+
+    With a ``breaker`` (a ``CircuitBreaker``), calls fail at once with
+    ``RagUnavailable`` while the service is down. With ``latency`` (a
+    ``LatencyTracker``), the read timeout follows the service's recent
+    response times instead of always being ``read_timeout``. Streamed calls
+    count the time until the whole answer has been read, and calls that
+    time out count as taking the timeout they were given, so the timeout
+    grows again when the service slows down.
+    """
+
+    def __init__(self, url, max_concurrent=4, connect_timeout=3.0, read_timeout=120.0,
+                 queue_timeout=5.0, chunk_size=8192, breaker=None, latency=None):
+        self.url = url
+        self.max_concurrent = max(1, max_concurrent)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.queue_timeout = queue_timeout
+        self.chunk_size = chunk_size
+        self.breaker = breaker
+        self.latency = latency
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrent)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def active_count(self):
+        """Number of calls holding a slot"""
+        with self._lock:
+            return self._active
+
+    def status(self):
+        """Circuit state and the read timeout calls get right now"""
+        return {
+            'circuit': self.breaker.status()['state'] if self.breaker else None,
+            'read_timeout': round(self._timeout(None)[1], 3),
+            'active': self.active_count()
+        }
+
+    def open(self, payload, timeout=None):
+        """
+        Post a query and return a ``RagStream`` once the response headers arrive
+
+        ``timeout`` caps the read timeout of this call. The body is not read
+        yet; iterate the stream or close it to free the slot.
+        """
+        self._acquire()
+        started = time.monotonic()
+        try:
+            response = self._post(payload, timeout, stream=True)
+        except Exception:
+            self._release()
+            raise
+
+        on_complete = None
+        if self.latency and response.status_code < 400:
+            on_complete = lambda: self.latency.record(time.monotonic() - started)
+        return RagStream(response, self._release, self.chunk_size, on_complete)
+
+    def query(self, payload, timeout=None):
+        """Post a query and return the decoded JSON answer"""
+        self._acquire()
+        try:
+            response = self._post(payload, timeout)
+            response.raise_for_status()
+            return response.json()
+        finally:
+            self._release()
+
+    def _post(self, payload, timeout, stream=False):
+        started = time.monotonic()
+        limit = self._timeout(timeout)
+        try:
+            response = self.session.post(self.url, json=payload, timeout=limit, stream=stream)
+        except requests.exceptions.ReadTimeout:
+            # A caller that asked for less time than usual says nothing about the service
+            if timeout is not None and timeout < self._timeout(None)[1]:
+                if self.breaker:
+                    self.breaker.record_ignored()
+            else:
+                if self.breaker:
+                    self.breaker.record_failure()
+                if self.latency:
+                    self.latency.record_timeout(limit[1])
+            raise
+        except Exception:
+            if self.breaker:
+                self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            if self.breaker:
+                self.breaker.record_failure()
+            return response
+        if self.breaker:
+            self.breaker.record_success()
+        # Streamed calls are timed once their body has been read
+        if self.latency and not stream and response.status_code < 400:
+            self.latency.record(time.monotonic() - started)
+        return response
+
+    def _timeout(self, timeout):
+        read_timeout = self.latency.timeout() if self.latency else self.read_timeout
+        if timeout is not None:
+            read_timeout = min(timeout, read_timeout)
+        return (self.connect_timeout, read_timeout)
+
+    def _acquire(self):
+        # Fail fast without waiting for a slot while the circuit is open
+        if self.breaker and self.breaker.retry_after() > 0:
+            raise self._unavailable()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise RagBusy(f"All {self.max_concurrent} RAG connections are busy")
+        if self.breaker and not self.breaker.allow():
+            self._slots.release()
+            raise self._unavailable()
+        with self._lock:
+            self._active += 1
+
+    def _unavailable(self):
+        retry_after = self.breaker.retry_after()
+        return RagUnavailable(
+            f"RAG service is failing, retry in {max(1, round(retry_after))}s", retry_after
+        )
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+        self._slots.release()
@@ -0,0 +1,48 @@
+import hashlib
+import json
+import os
+import shutil
+
+# Settings that change how a job runs but not what it produces
+RUNTIME_SETTINGS = {'threads', 'segments', 'segment_min_duration'}
+
+
+def full_hash(path, block_size=1024 * 1024):
+    """Hash the whole content of a file"""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def settings_key(settings, output_format):
+    """Hash of the settings that determine the transcoded output"""
+    effective = {key: value for key, value in settings.items() if key not in RUNTIME_SETTINGS}
+    effective['output_format'] = output_format
+    encoded = json.dumps(effective, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def cache_key(content_key, settings_hash):
+    """Key of a transcode result: what went in and how it was encoded"""
+    return f"{content_key}:{settings_hash}"
+
+
+def reuse_output(cached_file, output_file):
+    """Make ``output_file`` a copy of an earlier result
+
+    The output is copied, not hardlinked: a later encode writing over either
+    path would otherwise truncate both files.
+    """
+    if os.path.exists(output_file) and os.path.samefile(cached_file, output_file):
+        return output_file
+
+    temp_file = f"{output_file}.reuse-{os.getpid()}"
+    try:
+        shutil.copy2(cached_file, temp_file)
+        os.replace(temp_file, output_file)
+    finally:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+    return output_file
@@ -0,0 +1,157 @@
+import os
+import threading
+
+
+def default_slot_count(threads_per_job=None):
+    """Number of concurrent transcodes that fit on this machine"""
+    cores = os.cpu_count() or 1
+    threads_per_job = max(1, int(threads_per_job or 1))
+    return max(1, cores // threads_per_job)
+
+
+class JobScheduler:
+    """Run queued transcode jobs on a fixed number of worker slots
+
+    The queue itself lives in the database; the scheduler only decides when
+    to pull the next job. ``claim_next_job`` must return the id of a job it
+    has taken ownership of (or None when the queue is empty) and
+    ``run_job`` is called with that id on one of the worker threads.
+    ``set_limit`` lowers how many of the slots may be busy at once.
+
+    ``maintenance``, if given, is called every ``maintenance_interval``
+    seconds with the ids of the jobs running in this process; it is where
+    leases are renewed and abandoned jobs are re-queued. A truthy return
+    value wakes the workers.
+    """
+
+    def __init__(self, claim_next_job, run_job, slots=None, poll_interval=5.0,
+                 maintenance=None, maintenance_interval=20.0):
+        self.claim_next_job = claim_next_job
+        self.run_job = run_job
+        self.slots = slots or default_slot_count()
+        # Jobs allowed to run at once; at most ``slots``, None = all slots
+        self.limit = None
+        self.poll_interval = poll_interval
+        self.maintenance = maintenance
+        self.maintenance_interval = maintenance_interval
+        self.maintenance_thread = None
+        self.workers = []
+        self.active_jobs = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._maintenance_wakeup = threading.Condition(self._lock)
+        self._pending_wakeups = 0
+        self._running = False
+
+    def start(self):
+        """Start the worker threads"""
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+
+        self.workers = [
+            threading.Thread(target=self._worker_loop, name=f'transcode-worker-{i}', daemon=True)
+            for i in range(self.slots)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        if self.maintenance:
+            self.maintenance_thread = threading.Thread(
+                target=self._maintenance_loop, name='transcode-maintenance', daemon=True
+            )
+            self.maintenance_thread.start()
+        print(f"Started job scheduler with {self.slots} worker slot(s)")
+
+    def stop(self, timeout=None):
+        """Stop the worker threads once their current jobs finish"""
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+            self._wakeup.notify_all()
+            self._maintenance_wakeup.notify_all()
+
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = []
+        if self.maintenance_thread:
+            self.maintenance_thread.join(timeout)
+            self.maintenance_thread = None
+        print("Stopped job scheduler")
+
+    def is_running(self):
+        """Check if the scheduler is running"""
+        return self._running
+
+    def notify(self, count=1):
+        """Wake idle workers because new jobs were queued"""
+        with self._lock:
+            self._pending_wakeups += count
+            self._wakeup.notify(count)
+
+    def active_count(self):
+        """Number of jobs currently occupying a slot"""
+        with self._lock:
+            return len(self.active_jobs)
+
+    def concurrency(self):
+        """Number of jobs allowed to run at once"""
+        return min(self.slots, self.limit or self.slots)
+
+    def set_limit(self, limit):
+        """Allow at most ``limit`` jobs at once; raising it wakes idle workers"""
+        with self._lock:
+            before = min(self.slots, self.limit or self.slots)
+            self.limit = max(1, limit)
+            added = min(self.slots, self.limit) - before
+            if added > 0:
+                self._pending_wakeups += added
+                self._wakeup.notify(added)
+
+    def _maintenance_loop(self):
+        while True:
+            with self._lock:
+                if not self._running:
+                    return
+                active_jobs = set(self.active_jobs)
+
+            try:
+                if self.maintenance(active_jobs):
+                    self.notify(self.slots)
+            except Exception as e:
+                print(f"Error during scheduler maintenance: {e}")
+
+            with self._lock:
+                if self._running:
+                    self._maintenance_wakeup.wait(self.maintenance_interval)
+
+    def _wait_for_work(self):
+        with self._lock:
+            if self._running and not self._pending_wakeups:
+                self._wakeup.wait(self.poll_interval)
+            self._pending_wakeups = max(0, self._pending_wakeups - 1)
+            return self._running
+
+    def _worker_loop(self):
+        while self._wait_for_work():
+            while self._running:
+                try:
+                    job_id = self.claim_next_job()
+                except Exception as e:
+                    print(f"Error claiming next job: {e}")
+                    break
+
+                if job_id is None:
+                    break
+
+                with self._lock:
+                    self.active_jobs.add(job_id)
+                try:
+                    self.run_job(job_id)
+                except Exception as e:
+                    print(f"Error running job {job_id}: {e}")
+                finally:
+                    with self._lock:
+                        self.active_jobs.discard(job_id)
@@ -0,0 +1,37 @@
+from sqlalchemy import inspect, text
+
+
+def upgrade_schema(db):
+    """Add columns and indexes that were introduced after the tables were created
+
+    ``db.create_all()`` only creates missing tables, so databases created by
+    an older version of the app would otherwise be missing newer columns.
+    """
+    engine = db.engine
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_columns = {col['name'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    default = column.server_default.arg
+                    default = f"'{default}'" if isinstance(default, str) else default.text
+                    ddl += f' DEFAULT {default}'
+                conn.execute(text(ddl))
+                print(f"Added column {table.name}.{column.name}")
+
+            existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(conn)
+                    print(f"Created index {index.name}")
@@ -0,0 +1,110 @@
+import threading
+import time
+import uuid
+
+# Known settings with their type and default value
+SETTINGS_SCHEMA = {
+    'source_folder': (str, ''),
+    'output_folder': (str, ''),
+    'watch_enabled': (bool, False),
+    'output_format': (str, 'mp4'),
+    'video_codec': (str, 'libx264'),
+    'audio_codec': (str, 'aac'),
+    'preset': (str, 'medium'),
+    'crf': (int, 23),
+    'renditions': (str, ''),
+}
+
+# Settings row whose value changes on every write
+VERSION_KEY = '_version'
+
+
+def parse_setting(key, raw):
+    """Convert a stored string to the setting's type"""
+    kind, default = SETTINGS_SCHEMA.get(key, (str, None))
+    if raw is None:
+        return default
+    if kind is bool:
+        return raw == 'true'
+    try:
+        return kind(raw)
+    except (TypeError, ValueError):
+        return default
+
+
+def format_setting(key, value):
+    """Convert a setting to the string stored in the database"""
+    kind, _ = SETTINGS_SCHEMA.get(key, (str, None))
+    if kind is bool:
+        return 'true' if value else 'false'
+    return str(kind(value))
+
+
+def new_version():
+    return uuid.uuid4().hex
+
+
+class SettingsStore:
+    """In-memory copy of the Settings table
+
+    Settings are loaded once and then served from memory. Every write stores
+    a new random version next to the settings; other processes notice the
+    version change (checked at most every ``check_interval`` seconds) and
+    reload.
+
+    ``load()`` returns all stored settings as a ``{key: raw_string}`` dict
+    including the version key, ``read_version()`` returns just the stored
+    version and ``save(raw_values)`` writes the given rows in one
+    transaction.
+    """
+
+    def __init__(self, load, read_version, save, check_interval=2.0):
+        self.load = load
+        self.read_version = read_version
+        self.save = save
+        self.check_interval = check_interval
+        self.version = None
+        self.raw = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Typed value of a setting"""
+        raw = self._current().get(key)
+        if raw is None and default is not None:
+            return default
+        return parse_setting(key, raw)
+
+    def get_raw(self, key, default=None):
+        """Stored string value of a setting"""
+        return self._current().get(key, default)
+
+    def all(self):
+        """Typed values of every known setting"""
+        raw = self._current()
+        return {key: parse_setting(key, raw.get(key)) for key in SETTINGS_SCHEMA}
+
+    def update(self, values):
+        """Write several settings atomically"""
+        raw_values = {key: format_setting(key, value) for key, value in values.items()}
+        version = new_version()
+        raw_values[VERSION_KEY] = version
+        self.save(raw_values)
+
+        with self._lock:
+            if self.raw is not None:
+                self.raw = {**self.raw, **raw_values}
+                self.version = version
+                self.checked_at = time.monotonic()
+
+    def _current(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.raw is not None and now - self.checked_at < self.check_interval:
+                return self.raw
+
+            if self.raw is None or self.read_version() != self.version:
+                self.raw = self.load()
+                self.version = self.raw.get(VERSION_KEY)
+            self.checked_at = now
+            return self.raw
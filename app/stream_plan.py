@@ -0,0 +1,133 @@
+from pathlib import Path
+
+# Codec produced by each FFmpeg encoder
+ENCODER_CODECS = {
+    'libx264': 'h264',
+    'h264_nvenc': 'h264',
+    'h264_qsv': 'h264',
+    'h264_vaapi': 'h264',
+    'libx265': 'hevc',
+    'hevc_nvenc': 'hevc',
+    'libvpx': 'vp8',
+    'libvpx-vp9': 'vp9',
+    'libaom-av1': 'av1',
+    'libsvtav1': 'av1',
+    'aac': 'aac',
+    'libfdk_aac': 'aac',
+    'libmp3lame': 'mp3',
+    'libopus': 'opus',
+    'libvorbis': 'vorbis',
+}
+
+# Codecs each container can hold without re-encoding: (video, audio)
+CONTAINER_CODECS = {
+    'mp4': ({'h264', 'hevc', 'av1', 'mpeg4'}, {'aac', 'mp3', 'ac3', 'eac3', 'alac', 'opus'}),
+    'm4v': ({'h264', 'hevc', 'av1', 'mpeg4'}, {'aac', 'mp3', 'ac3', 'eac3', 'alac'}),
+    'mov': ({'h264', 'hevc', 'mpeg4', 'prores'}, {'aac', 'mp3', 'ac3', 'alac', 'pcm_s16le'}),
+    'webm': ({'vp8', 'vp9', 'av1'}, {'opus', 'vorbis'}),
+    'mkv': (None, None),
+    # HLS (MPEG-TS segments) and DASH (fragmented MP4 segments)
+    'm3u8': ({'h264', 'hevc'}, {'aac', 'mp3', 'ac3', 'eac3'}),
+    'mpd': ({'h264', 'hevc', 'av1', 'vp9'}, {'aac', 'opus', 'ac3', 'eac3'}),
+}
+
+# Pixel formats every H.264/HEVC player can decode
+PLAYABLE_PIXEL_FORMATS = {'yuv420p', 'yuvj420p'}
+
+
+class StreamPlan:
+    """Whether each stream of a source is copied, encoded or absent"""
+
+    def __init__(self, video='encode', audio='encode', reasons=None):
+        self.video = video
+        self.audio = audio
+        self.reasons = reasons or []
+
+    @property
+    def mode(self):
+        """'remux', 'audio' (only audio is encoded), 'video' (only video) or 'encode'"""
+        video_copied = self.video != 'encode'
+        audio_copied = self.audio != 'encode'
+        if video_copied and audio_copied:
+            return 'remux'
+        if video_copied:
+            return 'audio'
+        if audio_copied:
+            return 'video'
+        return 'encode'
+
+    def to_dict(self):
+        return {'mode': self.mode, 'video': self.video, 'audio': self.audio, 'reasons': self.reasons}
+
+
+def target_codec(encoder):
+    """Codec an encoder produces (the encoder name itself if unknown)"""
+    return ENCODER_CODECS.get(encoder, encoder)
+
+
+def plan_streams(info, settings, output_file):
+    """
+    Decide per stream whether the source can be copied into the output
+
+    ``info`` is the result of ``VideoTranscoder.get_video_info``. A stream is
+    copied when passthrough is enabled, it already has the codec the target
+    encoder would produce, the output container can hold it, and its bitrate
+    (and for video its pixel format) is within the limits in ``settings``.
+    Setting a codec to ``copy`` always copies that stream. Anything the
+    probe did not report, including the whole probe when it failed, means
+    the stream is encoded.
+    """
+    container = Path(output_file).suffix.lstrip('.').lower()
+    allowed_video, allowed_audio = CONTAINER_CODECS.get(container, (set(), set()))
+    passthrough = settings.get('passthrough', False)
+    reasons = []
+
+    def decide(kind, stream, encoder, allowed, max_kbps):
+        if encoder == 'copy':
+            return 'copy'
+        if not info:
+            return 'encode'
+        if not stream:
+            return 'none'
+        if not passthrough:
+            return 'encode'
+
+        codec = stream.get('codec')
+        if codec != target_codec(encoder):
+            reasons.append(f"{kind} codec {codec} is not {target_codec(encoder)}")
+            return 'encode'
+        if allowed is not None and codec not in allowed:
+            reasons.append(f"{container} cannot hold {codec} {kind}")
+            return 'encode'
+        bitrate = stream.get('bitrate') or 0
+        if max_kbps and not bitrate:
+            reasons.append(f"{kind} bitrate is unknown")
+            return 'encode'
+        if max_kbps and bitrate > max_kbps * 1000:
+            reasons.append(f"{kind} bitrate {bitrate // 1000}k is above {max_kbps}k")
+            return 'encode'
+        max_height = settings.get('max_height')
+        if kind == 'video' and max_height and (stream.get('height') or 0) > max_height:
+            reasons.append(f"height {stream['height']} is above {max_height}")
+            return 'encode'
+        pix_fmt = stream.get('pix_fmt')
+        if kind == 'video' and codec in ('h264', 'hevc') and pix_fmt and pix_fmt not in PLAYABLE_PIXEL_FORMATS:
+            reasons.append(f"pixel format {pix_fmt} is not widely playable")
+            return 'encode'
+        return 'copy'
+
+    info = info or {}
+    if not info:
+        reasons.append("source could not be probed")
+    video = info.get('video')
+    if video and not video.get('bitrate'):
+        # Containers like MKV only report the overall bitrate
+        video = {**video, 'bitrate': info.get('bitrate', 0)}
+
+    return StreamPlan(
+        video=decide('video', video, settings.get('video_codec', 'libx264'),
+                     allowed_video, settings.get('max_video_bitrate', 0)),
+        audio=decide('audio', info.get('audio'), settings.get('audio_codec', 'aac'),
+                     allowed_audio, settings.get('max_audio_bitrate', 0)),
+        reasons=reasons
+    )
@@ -1,28 +1,142 @@
 import os
+import bisect
+import json
+import shutil
 import subprocess
-import re
+import tempfile
+import threading
+import time
 import ffmpeg
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
 
+from app.ffmpeg_progress import EncodeStats, ProgressParser
+from app.metrics import REGISTRY
+from app.probe_cache import probe_key
+from app.stream_plan import plan_streams
+
+PROBE_SECONDS = REGISTRY.histogram('transcoder_probe_seconds', 'Time spent running ffprobe (cache misses)')
+FFMPEG_SECONDS = REGISTRY.histogram('transcoder_ffmpeg_seconds', 'Wall time of FFmpeg runs')
+ENCODE_FPS = REGISTRY.histogram(
+    'transcoder_encode_fps', 'Frames per second of FFmpeg runs that produced video frames',
+    buckets=(1, 5, 10, 25, 50, 100, 200, 400, 800, 1600, 3200)
+)
+
+
+# Playlist written for each streaming output format
+PLAYLIST_NAMES = {
+    'hls': 'index.m3u8',
+    'dash': 'manifest.mpd',
+}
+
+
+def parse_renditions(value):
+    """Parse a rendition ladder like ``"1080,720,480"`` into heights, tallest first"""
+    heights = set()
+    for part in str(value or '').replace(' ', '').split(','):
+        part = part.lower().rstrip('p')
+        if part.isdigit() and int(part) > 0:
+            heights.add(int(part))
+    return sorted(heights, reverse=True)
+
+
+def rendition_path(output_file, height):
+    """Output file of one rendition, e.g. ``movie_transcoded_720p.mp4``"""
+    root, ext = os.path.splitext(output_file)
+    return f"{root}_{height}p{ext}"
+
 
 class VideoTranscoder:
     """Handle video transcoding operations"""
 
-    def __init__(self):
+    def __init__(self, probe_cache=None, frame_counter=None, stats_callback=None):
         self.ffmpeg_path = 'ffmpeg'
         self.ffprobe_path = 'ffprobe'
+        self.probe_cache = probe_cache
+        # Called with the number of newly encoded frames as encodes progress
+        self.frame_counter = frame_counter
+        # Called with EncodeStats.summary() after every FFmpeg progress block
+        self.stats_callback = stats_callback
+        self.encode_stats = EncodeStats()
+
+    def probe(self, input_file):
+        """Run ffprobe on a file, reusing the cached result while the file is unchanged"""
+        key = None
+        if self.probe_cache:
+            key = probe_key(input_file)
+            cached = self.probe_cache.get(key)
+            if cached is not None:
+                return cached
+
+        probe = self._run_ffprobe(input_file)
+        if key:
+            self.probe_cache.put(key, probe)
+        return probe
+
+    def probe_many(self, input_files, max_workers=4):
+        """
+        Probe several files, running up to ``max_workers`` ffprobe processes at once
+
+        Returns a dict mapping each file to its probe, or None if it could not
+        be probed. Cached results are used where possible and new results are
+        cached from the calling thread.
+        """
+        results = {}
+        missing = {}
+        for input_file in input_files:
+            try:
+                key = probe_key(input_file) if self.probe_cache else None
+            except OSError:
+                results[input_file] = None
+                continue
+            cached = self.probe_cache.get(key) if key else None
+            if cached is not None:
+                results[input_file] = cached
+            else:
+                missing[input_file] = key
+
+        if not missing:
+            return results
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as pool:
+            futures = {
+                pool.submit(self._run_ffprobe, input_file): input_file
+                for input_file in missing
+            }
+            for future in as_completed(futures):
+                input_file = futures[future]
+                try:
+                    probe = future.result()
+                except Exception as e:
+                    print(f"Error probing {input_file}: {e}")
+                    results[input_file] = None
+                    continue
+                results[input_file] = probe
+                if missing[input_file]:
+                    self.probe_cache.put(missing[input_file], probe)
+
+        return results
+
+    def _run_ffprobe(self, input_file):
+        with PROBE_SECONDS.time():
+            return ffmpeg.probe(input_file, cmd=self.ffprobe_path)
 
     def get_video_duration(self, input_file):
         """Get video duration in seconds"""
         try:
-            probe = ffmpeg.probe(input_file)
+            probe = self.probe(input_file)
             duration = float(probe['format']['duration'])
             return duration
         except Exception as e:
             print(f"Error getting video duration: {e}")
             return 0
 
-    def transcode(self, input_file, output_file, settings, progress_callback=None):
+    def plan_streams(self, input_file, output_file, settings):
+        """Decide which streams of the input can be copied instead of encoded"""
+        return plan_streams(self.get_video_info(input_file), settings, output_file)
+
+    def transcode(self, input_file, output_file, settings, progress_callback=None, dispatcher=None,
+                  plan=None, dispatch_workers=None):
         """
         Transcode a video file
 
@@ -31,31 +145,481 @@ class VideoTranscoder:
             output_file: Path to output video file
             settings: Dictionary with transcoding settings
             progress_callback: Optional callback function for progress updates
+            dispatcher: Optional chunk dispatcher for segmented transcodes
+            dispatch_workers: Chunks the dispatcher encodes at once on one machine
+            plan: Optional StreamPlan, decided from the probe when not given
         """
-        video_codec = settings.get('video_codec', 'libx264')
-        audio_codec = settings.get('audio_codec', 'aac')
-        preset = settings.get('preset', 'medium')
-        crf = settings.get('crf', 28)
+        # One probe gives the duration for progress and the stream layout
+        info = self.get_video_info(input_file) or {}
+        total_duration = info.get('duration') or self.get_video_duration(input_file)
+        self.encode_stats.duration = total_duration
+        if plan is None:
+            plan = plan_streams(info, settings, output_file)
+
+        segments = int(settings.get('segments') or 0)
+        if (segments > 1 and plan.video == 'encode'
+                and 0 < total_duration
+                and total_duration >= settings.get('segment_min_duration', 0)):
+            return self.transcode_segmented(
+                input_file, output_file, settings, segments, total_duration,
+                progress_callback, dispatcher, info, plan, dispatch_workers
+            )
+
+        # Build FFmpeg command, copying only what the plan confirmed can be copied
+        if plan.video == 'copy':
+            video_args = ['-c:v', 'copy']
+        else:
+            video_args = [
+                '-c:v', settings.get('video_codec', 'libx264'),
+                *self._video_options(settings),
+                *self._scale_options(settings)
+            ]
 
-        # Build FFmpeg command
         cmd = [
             self.ffmpeg_path,
+            *self._input_options(settings),
             '-i', input_file,
-            '-c:v', video_codec,
-            '-preset', preset,
-            '-crf', str(crf),
-            '-c:a', audio_codec,
-            '-b:a', '128k',
+            *video_args,
+            *self._audio_options(settings, plan.audio == 'copy'),
             '-movflags', '+faststart',
             '-y',  # Overwrite output file
             '-progress', 'pipe:1',  # Output progress to stdout
             output_file
         ]
 
-        # Get total duration for progress calculation
-        total_duration = self.get_video_duration(input_file)
+        def on_time(current_time):
+            if progress_callback and total_duration > 0:
+                progress_callback(min(100.0, (current_time / total_duration) * 100))
+
+        self._run_ffmpeg(cmd, on_time)
+
+        if progress_callback:
+            progress_callback(100.0)
+
+        return output_file
+
+    def transcode_ladder(self, input_file, output_file, settings, heights,
+                         progress_callback=None, plan=None):
+        """
+        Encode several scaled renditions of a video with a single decode
+
+        One FFmpeg process decodes the input once, splits the decoded video
+        in its filter graph and scales and encodes each branch to its own
+        file. Renditions taller than the source are left out rather than
+        upscaled. Returns a list of dicts describing each rendition, tallest
+        first.
+        """
+        info = self.get_video_info(input_file) or {}
+        total_duration = info.get('duration') or self.get_video_duration(input_file)
+        self.encode_stats.duration = total_duration
+        if plan is None:
+            plan = plan_streams(info, settings, output_file)
+
+        heights = self._ladder_heights(info, heights)
+
+        renditions = []
+        cmd = [
+            self.ffmpeg_path,
+            '-y',
+            '-progress', 'pipe:1',
+            *self._input_options(settings),
+            '-i', input_file,
+            '-filter_complex', self._ladder_filters(heights)
+        ]
+        for index, height in enumerate(heights):
+            rendition_file = rendition_path(output_file, height)
+            cmd += [
+                '-map', f'[out{index}]',
+                '-map', '0:a:0?',
+                '-c:v', settings.get('video_codec', 'libx264'),
+                *self._video_options(settings),
+                *self._audio_options(settings, plan.audio == 'copy'),
+                '-movflags', '+faststart',
+                rendition_file
+            ]
+            renditions.append({'label': f'{height}p', 'height': height, 'output_file': rendition_file})
+
+        def on_time(current_time):
+            if progress_callback and total_duration > 0:
+                progress_callback(min(100.0, (current_time / total_duration) * 100))
+
+        self._run_ffmpeg(cmd, on_time)
+
+        if progress_callback:
+            progress_callback(100.0)
+
+        return renditions
+
+    def package_stream(self, input_file, playlist_file, settings, packaging, heights=None,
+                       progress_callback=None, plan=None, segment_seconds=6):
+        """
+        Encode a video as HLS or DASH segments next to a playlist
+
+        ``packaging`` is ``'hls'`` (``playlist_file`` is an .m3u8) or
+        ``'dash'`` (an .mpd manifest). Segments are written to the playlist's
+        folder as they are produced and the playlist is rewritten after each
+        one, so players can start while the encode is still running. With
+        ``heights`` every rendition of the ladder is packaged from a single
+        decode and ``playlist_file`` becomes the master playlist.
+        """
+        info = self.get_video_info(input_file) or {}
+        total_duration = info.get('duration') or self.get_video_duration(input_file)
+        self.encode_stats.duration = total_duration
+        if plan is None:
+            plan = plan_streams(info, settings, playlist_file)
+
+        output_dir = os.path.dirname(os.path.abspath(playlist_file))
+        os.makedirs(output_dir, exist_ok=True)
+        has_audio = 'audio' in info
+
+        cmd = [self.ffmpeg_path, '-y', '-progress', 'pipe:1', *self._input_options(settings), '-i', input_file]
+        if heights:
+            heights = self._ladder_heights(info, heights)
+            cmd += ['-filter_complex', self._ladder_filters(heights)]
+            video_maps = [f'[out{index}]' for index in range(len(heights))]
+        else:
+            video_maps = ['0:v:0']
+
+        for video_map in video_maps:
+            cmd += ['-map', video_map]
+            # HLS variants each carry their own audio; DASH shares one audio set
+            if has_audio and (packaging == 'hls' or video_map == video_maps[0]):
+                cmd += ['-map', '0:a:0']
+
+        if heights or plan.video != 'copy':
+            cmd += [
+                '-c:v', settings.get('video_codec', 'libx264'),
+                *self._video_options(settings),
+                *([] if heights else self._scale_options(settings)),
+                # Keyframes on segment boundaries so every segment starts cleanly
+                '-force_key_frames', f'expr:gte(t,n_forced*{segment_seconds})'
+            ]
+        else:
+            cmd += ['-c:v', 'copy']
+        cmd += self._audio_options(settings, plan.audio == 'copy')
+
+        if packaging == 'hls':
+            cmd += [
+                '-f', 'hls',
+                '-hls_time', str(segment_seconds),
+                '-hls_playlist_type', 'event',
+                '-hls_flags', 'independent_segments+temp_file'
+            ]
+            if heights:
+                # Variant playlists sit next to the master playlist, which
+                # FFmpeg writes to the folder of the variant playlists
+                streams = [
+                    f'v:{index},a:{index},name:{height}p' if has_audio else f'v:{index},name:{height}p'
+                    for index, height in enumerate(heights)
+                ]
+                cmd += [
+                    '-var_stream_map', ' '.join(streams),
+                    '-master_pl_name', os.path.basename(playlist_file),
+                    '-hls_segment_filename', os.path.join(output_dir, 'stream_%v_%05d.ts'),
+                    os.path.join(output_dir, 'stream_%v.m3u8')
+                ]
+            else:
+                cmd += [
+                    '-hls_segment_filename', os.path.join(output_dir, 'segment_%05d.ts'),
+                    playlist_file
+                ]
+        elif packaging == 'dash':
+            cmd += [
+                '-f', 'dash',
+                '-seg_duration', str(segment_seconds),
+                '-use_template', '1',
+                '-use_timeline', '1',
+                '-adaptation_sets', 'id=0,streams=v id=1,streams=a' if has_audio else 'id=0,streams=v',
+                '-init_seg_name', 'init-$RepresentationID$.m4s',
+                '-media_seg_name', 'chunk-$RepresentationID$-$Number%05d$.m4s',
+                playlist_file
+            ]
+        else:
+            raise ValueError(f"Unknown packaging: {packaging}")
+
+        def on_time(current_time):
+            if progress_callback and total_duration > 0:
+                progress_callback(min(100.0, (current_time / total_duration) * 100))
+
+        self._run_ffmpeg(cmd, on_time)
+
+        if progress_callback:
+            progress_callback(100.0)
+
+        return playlist_file
+
+    def transcode_segmented(self, input_file, output_file, settings, segments,
+                            total_duration=None, progress_callback=None, dispatcher=None, info=None,
+                            plan=None, dispatch_workers=None):
+        """
+        Transcode a long video by encoding keyframe-aligned chunks in parallel
 
-        # Run FFmpeg
+        The video is cut at keyframes into about ``segments`` chunks which are
+        encoded by separate FFmpeg processes. Audio is encoded once for the
+        whole file so there are no gaps at chunk boundaries, and everything is
+        joined with the concat demuxer without re-encoding.
+
+        By default the chunks are encoded on this machine. A ``dispatcher``
+        can hand them to other workers instead: it is called with the list of
+        chunk dicts and a callback taking the index of each finished chunk,
+        and must block until every chunk file has been written.
+        ``dispatch_workers`` is how many chunks it encodes at once on one
+        machine, so each chunk gets its share of the job's threads.
+        """
+        if info is None:
+            info = self.get_video_info(input_file) or {}
+        if total_duration is None:
+            total_duration = info.get('duration', 0)
+        self.encode_stats.duration = total_duration
+
+        ranges = self.plan_segments(self.get_keyframes(input_file), total_duration, segments)
+
+        work_dir = tempfile.mkdtemp(
+            prefix='.segments-', dir=os.path.dirname(os.path.abspath(output_file))
+        )
+        abort = threading.Event()
+        progress_lock = threading.Lock()
+        encoded_time = [0.0] * len(ranges)
+
+        def report(index, current_time):
+            with progress_lock:
+                encoded_time[index] = current_time
+
+        try:
+            segment_files = [
+                os.path.join(work_dir, f'segment_{index:04d}.mkv')
+                for index in range(len(ranges))
+            ]
+            audio_file = os.path.join(work_dir, 'audio.mka') if 'audio' in info else None
+
+            # Chunks share the job's threads instead of each taking all of
+            # them: at most one local chunk runs per thread, and the threads
+            # are split between the chunks running at the same time
+            job_threads = int(settings.get('threads') or os.cpu_count() or 1)
+            if dispatcher:
+                segment_workers = max(1, min(len(ranges), dispatch_workers or 1))
+            else:
+                segment_workers = max(1, min(len(ranges), job_threads))
+            segment_settings = {**settings, 'threads': max(1, job_threads // segment_workers)}
+
+            chunks = [
+                {
+                    'index': index,
+                    'input_file': input_file,
+                    'output_file': segment_files[index],
+                    'start': start,
+                    'end': end,
+                    'settings': segment_settings
+                }
+                for index, (start, end) in enumerate(ranges)
+            ]
+
+            with ThreadPoolExecutor(max_workers=(1 if dispatcher else segment_workers) + 1) as pool:
+                # Audio goes first so it is not queued behind the chunks
+                futures = []
+                if audio_file:
+                    futures.append(pool.submit(
+                        self._encode_audio, input_file, audio_file, segment_settings, abort,
+                        plan is not None and plan.audio == 'copy'
+                    ))
+                if dispatcher:
+                    futures.append(pool.submit(
+                        dispatcher, chunks,
+                        lambda index: report(index, chunks[index]['end'] - chunks[index]['start'])
+                    ))
+                else:
+                    futures += [
+                        pool.submit(
+                            self.encode_segment, chunk['input_file'], chunk['output_file'],
+                            chunk['start'], chunk['end'], segment_settings, abort,
+                            lambda t, index=chunk['index']: report(index, t)
+                        )
+                        for chunk in chunks
+                    ]
+
+                # Progress is reported from this thread so callers can rely
+                # on being called from the thread that started the transcode
+                pending = set(futures)
+                reported = None
+                try:
+                    while pending:
+                        done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+
+                        with progress_lock:
+                            encoded = sum(encoded_time)
+                        if progress_callback and total_duration > 0 and encoded != reported:
+                            reported = encoded
+                            progress_callback(min(99.9, (encoded / total_duration) * 100))
+                except Exception:
+                    abort.set()
+                    raise
+
+            self._concat_segments(segment_files, audio_file, output_file, work_dir)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if progress_callback:
+            progress_callback(100.0)
+
+        return output_file
+
+    def get_keyframes(self, input_file):
+        """Get the timestamps (in seconds) of the video keyframes"""
+        cmd = [
+            self.ffprobe_path,
+            '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'packet=pts_time,flags',
+            '-of', 'json',
+            input_file
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise Exception(f"FFprobe failed with return code {result.returncode}")
+
+        packets = json.loads(result.stdout).get('packets', [])
+        return sorted(
+            float(packet['pts_time']) for packet in packets
+            if packet.get('flags', '').startswith('K') and packet.get('pts_time') not in (None, 'N/A')
+        )
+
+    def plan_segments(self, keyframes, duration, segments):
+        """Split a video into about ``segments`` (start, end) ranges starting on keyframes"""
+        cuts = [0.0]
+        for index in range(1, segments):
+            target = duration * index / segments
+            position = bisect.bisect_left(keyframes, target)
+            nearby = keyframes[max(0, position - 1):position + 1]
+            if not nearby:
+                continue
+            cut = min(nearby, key=lambda keyframe: abs(keyframe - target))
+            if cuts[-1] < cut < duration:
+                cuts.append(cut)
+
+        return list(zip(cuts, cuts[1:] + [duration]))
+
+    def measure_throughput(self, concurrency, threads, settings, duration=4, size='1280x720', rate=30):
+        """Run ``concurrency`` synthetic encodes at once and return their combined frames per second"""
+        settings = {**settings, 'threads': threads}
+        cmd = [
+            self.ffmpeg_path,
+            '-v', 'error',
+            '-progress', 'pipe:1',
+            *self._input_options(settings),
+            '-f', 'lavfi',
+            '-i', f'testsrc2=size={size}:rate={rate}:duration={duration}',
+            '-c:v', settings.get('video_codec', 'libx264'),
+            *self._video_options(settings),
+            '-f', 'null',
+            '-'
+        ]
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(self._run_ffmpeg, cmd) for _ in range(concurrency)]:
+                future.result()
+        return concurrency * duration * rate / (time.monotonic() - started)
+
+    def _ladder_heights(self, info, heights):
+        # Never upscale; fall back to the source height if nothing fits
+        source_height = info.get('video', {}).get('height') or 0
+        fitting = [height for height in heights if not source_height or height <= source_height]
+        return fitting or [source_height]
+
+    def _ladder_filters(self, heights):
+        # Decode once, split the frames and scale each branch to [outN]
+        if len(heights) == 1:
+            return f'[0:v]scale=-2:{heights[0]}[out0]'
+        branches = ''.join(f'[v{index}]' for index in range(len(heights)))
+        filters = [f'[0:v]split={len(heights)}{branches}']
+        for index, height in enumerate(heights):
+            filters.append(f'[v{index}]scale=-2:{height}[out{index}]')
+        return ';'.join(filters)
+
+    def _video_options(self, settings):
+        options = [
+            '-preset', settings.get('preset', 'medium'),
+            '-crf', str(settings.get('crf', 28)),
+        ]
+        threads = settings.get('threads')
+        if threads:
+            options += ['-threads', str(threads)]
+            # x265 sizes its own thread pool and ignores -threads
+            if settings.get('video_codec') == 'libx265':
+                options += ['-x265-params', f'pools={threads}']
+        return options
+
+    def _input_options(self, settings):
+        # Decoder threads default to one per core; keep them to the job's share
+        if not settings.get('threads'):
+            return []
+        return ['-threads', str(settings['threads'])]
+
+    def encode_segment(self, input_file, segment_file, start, end, settings, abort=None, on_time=None):
+        """Encode the video between ``start`` and ``end`` seconds to a chunk file"""
+        cmd = [
+            self.ffmpeg_path,
+            '-ss', f'{start:.6f}',
+            *self._input_options(settings),
+            '-i', input_file,
+            '-t', f'{end - start:.6f}',
+            '-map', '0:v:0',
+            '-an',
+            '-c:v', settings.get('video_codec', 'libx264'),
+            *self._video_options(settings),
+            *self._scale_options(settings),
+            '-y',
+            '-progress', 'pipe:1',
+            segment_file
+        ]
+        self._run_ffmpeg(cmd, on_time, abort)
+
+    def _scale_options(self, settings):
+        # Shrink to at most max_height lines, never upscale
+        if not settings.get('max_height'):
+            return []
+        return ['-vf', f"scale=-2:'min(ih,{int(settings['max_height'])})'"]
+
+    def _audio_options(self, settings, copy=False):
+        if copy:
+            return ['-c:a', 'copy']
+        return ['-c:a', settings.get('audio_codec', 'aac'), '-b:a', settings.get('audio_bitrate') or '128k']
+
+    def _encode_audio(self, input_file, audio_file, settings, abort, copy=False):
+        cmd = [
+            self.ffmpeg_path,
+            '-i', input_file,
+            '-map', '0:a:0',
+            '-vn',
+            *self._audio_options(settings, copy),
+            '-y',
+            '-progress', 'pipe:1',
+            audio_file
+        ]
+        self._run_ffmpeg(cmd, abort=abort)
+
+    def _concat_segments(self, segment_files, audio_file, output_file, work_dir):
+        list_file = os.path.join(work_dir, 'segments.txt')
+        with open(list_file, 'w') as f:
+            for segment_file in segment_files:
+                f.write(f"file '{segment_file}'\n")
+
+        cmd = [self.ffmpeg_path, '-f', 'concat', '-safe', '0', '-i', list_file]
+        if audio_file:
+            cmd += ['-i', audio_file, '-map', '0:v', '-map', '1:a']
+        cmd += [
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            '-y',
+            '-progress', 'pipe:1',
+            output_file
+        ]
+        self._run_ffmpeg(cmd)
+
+    def _run_ffmpeg(self, cmd, on_time=None, abort=None):
+        """Run an FFmpeg command, reporting encoded seconds from its progress output"""
+        started = time.perf_counter()
         process = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
@@ -63,38 +627,55 @@ class VideoTranscoder:
             universal_newlines=True
         )
 
-        # Parse progress
+        # Parse progress one block at a time
+        parser = ProgressParser()
+        run = self.encode_stats.start()
+        frames = 0
         for line in process.stdout:
-            if progress_callback and total_duration > 0:
-                # Look for time progress
-                time_match = re.search(r'out_time_ms=(\d+)', line)
-                if time_match:
-                    current_time = int(time_match.group(1)) / 1000000  # Convert microseconds to seconds
-                    progress = min(100.0, (current_time / total_duration) * 100)
-                    progress_callback(progress)
+            if abort is not None and abort.is_set():
+                process.terminate()
+                break
+            record = parser.feed(line)
+            if record is None:
+                continue
+
+            if record.get('frame', 0) > frames:
+                if self.frame_counter:
+                    self.frame_counter(record['frame'] - frames)
+                frames = record['frame']
+            if on_time and 'out_time' in record:
+                on_time(record['out_time'])
+            self.encode_stats.update(run, record)
+            if self.stats_callback:
+                stats = self.encode_stats.summary()
+                if stats:
+                    self.stats_callback(stats)
 
         process.wait()
 
-        if process.returncode != 0:
-            raise Exception(f"FFmpeg failed with return code {process.returncode}")
+        elapsed = time.perf_counter() - started
+        FFMPEG_SECONDS.observe(elapsed)
+        if frames and elapsed > 0 and process.returncode == 0:
+            ENCODE_FPS.observe(frames / elapsed)
 
-        if progress_callback:
-            progress_callback(100.0)
+        if abort is not None and abort.is_set():
+            raise Exception("FFmpeg was cancelled")
 
-        return output_file
+        if process.returncode != 0:
+            raise Exception(f"FFmpeg failed with return code {process.returncode}")
 
     def get_video_info(self, input_file):
         """Get detailed information about a video file"""
         try:
-            probe = ffmpeg.probe(input_file)
+            probe = self.probe(input_file)
 
             video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
             audio_stream = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
 
             info = {
                 'duration': float(probe['format']['duration']),
-                'size': int(probe['format']['size']),
-                'bitrate': int(probe['format']['bit_rate']),
+                'size': int(probe['format'].get('size', 0)),
+                'bitrate': int(probe['format'].get('bit_rate', 0)),
                 'format': probe['format']['format_name']
             }
 
@@ -103,14 +684,17 @@ class VideoTranscoder:
                     'codec': video_stream['codec_name'],
                     'width': video_stream['width'],
                     'height': video_stream['height'],
-                    'fps': eval(video_stream.get('r_frame_rate', '0/1'))
+                    'fps': eval(video_stream.get('r_frame_rate', '0/1')),
+                    'bitrate': int(video_stream.get('bit_rate', 0)),
+                    'pix_fmt': video_stream.get('pix_fmt')
                 }
 
             if audio_stream:
                 info['audio'] = {
                     'codec': audio_stream['codec_name'],
                     'sample_rate': int(audio_stream.get('sample_rate', 0)),
-                    'channels': audio_stream.get('channels', 0)
+                    'channels': audio_stream.get('channels', 0),
+                    'bitrate': int(audio_stream.get('bit_rate', 0))
                 }
 
             return info
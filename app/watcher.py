@@ -1,60 +1,177 @@
 import time
 import os
+import threading
 from pathlib import Path
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
+from app.metrics import REGISTRY
 
-class VideoFileHandler(FileSystemEventHandler):
-    """Handle filesystem events for video files"""
+SETTLE_SECONDS = REGISTRY.histogram(
+    'watcher_settle_seconds', 'Time from the first event for a file until it was handed on'
+)
+
+
+class FileSettler:
+    """Hold new files until they stop changing, then hand them to a callback
+
+    Files are polled every ``poll_interval`` seconds on a background thread
+    and dispatched once their size and mtime have stayed the same for
+    ``settle_time`` seconds. A file reported closed after writing is
+    dispatched as soon as one poll confirms it did not change.
+    """
 
-    def __init__(self, callback, video_extensions=None):
+    def __init__(self, callback, settle_time=5.0, poll_interval=1.0):
         self.callback = callback
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
+        self.pending = {}
+        self.thread = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start the polling thread"""
+        if self.thread:
+            return
+        self._stopped.clear()
+        self.thread = threading.Thread(target=self._poll_loop, name='watcher-settler', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the polling thread, dropping files that have not settled"""
+        self._stopped.set()
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        with self._lock:
+            self.pending.clear()
+
+    def track(self, file_path, closed=False):
+        """Start (or keep) watching a file; never blocks on the file itself"""
+        with self._lock:
+            entry = self.pending.get(file_path)
+            if entry is None:
+                entry = self.pending[file_path] = {
+                    'size': None,
+                    'mtime': None,
+                    'stable_since': None,
+                    'closed': False,
+                    'tracked_at': time.monotonic()
+                }
+            if closed:
+                entry['closed'] = True
+
+    def forget(self, file_path):
+        """Stop watching a file that was deleted or moved away"""
+        with self._lock:
+            self.pending.pop(file_path, None)
+
+    def poll(self):
+        """Check every pending file once and dispatch the settled ones"""
+        now = time.monotonic()
+        with self._lock:
+            paths = list(self.pending)
+
+        settled = []
+        for file_path in paths:
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                self.forget(file_path)
+                continue
+
+            with self._lock:
+                entry = self.pending.get(file_path)
+                if entry is None:
+                    continue
+                if (stat.st_size, stat.st_mtime) != (entry['size'], entry['mtime']):
+                    entry['size'] = stat.st_size
+                    entry['mtime'] = stat.st_mtime
+                    entry['stable_since'] = now
+                    continue
+                if entry['closed'] or now - entry['stable_since'] >= self.settle_time:
+                    del self.pending[file_path]
+                    settled.append(file_path)
+                    SETTLE_SECONDS.observe(now - entry['tracked_at'])
+
+        for file_path in settled:
+            try:
+                self.callback(file_path)
+            except Exception as e:
+                print(f"Error handling new file {file_path}: {e}")
+
+    def _poll_loop(self):
+        while not self._stopped.wait(self.poll_interval):
+            self.poll()
+
+
+class VideoFileHandler(FileSystemEventHandler):
+    """Handle filesystem events for video files
+
+    Events are only recorded here; waiting for files to finish copying
+    happens in the settler so the observer thread is never blocked.
+    """
+
+    def __init__(self, settler, video_extensions=None):
+        self.settler = settler
         self.video_extensions = video_extensions or {
             '.mp4', '.avi', '.mkv', '.mov', '.flv',
             '.wmv', '.m4v', '.webm', '.mpg', '.mpeg'
         }
-        self.processing_files = set()
+
+    def is_video(self, file_path):
+        return Path(file_path).suffix.lower() in self.video_extensions
 
     def on_created(self, event):
         """Called when a file is created"""
-        if event.is_directory:
-            return
+        if not event.is_directory and self.is_video(event.src_path):
+            self.settler.track(event.src_path)
 
-        file_path = event.src_path
-        file_ext = Path(file_path).suffix.lower()
+    def on_modified(self, event):
+        """Called while a file is being written"""
+        if not event.is_directory and self.is_video(event.src_path):
+            self.settler.track(event.src_path)
 
-        # Check if it's a video file
-        if file_ext in self.video_extensions:
-            # Wait for file to be completely written
-            time.sleep(2)
+    def on_closed(self, event):
+        """Called when a file opened for writing is closed (inotify only)"""
+        if not event.is_directory and self.is_video(event.src_path):
+            self.settler.track(event.src_path, closed=True)
+
+    def on_moved(self, event):
+        """Called when a file is renamed, e.g. at the end of an atomic copy"""
+        if event.is_directory:
+            return
+        self.settler.forget(event.src_path)
+        if self.is_video(event.dest_path):
+            self.settler.track(event.dest_path)
 
-            # Check if file is complete and not being processed
-            if os.path.exists(file_path) and file_path not in self.processing_files:
-                self.processing_files.add(file_path)
-                try:
-                    self.callback(file_path)
-                finally:
-                    # Remove from processing set after a delay
-                    time.sleep(1)
-                    self.processing_files.discard(file_path)
+    def on_deleted(self, event):
+        """Called when a file is deleted"""
+        if not event.is_directory:
+            self.settler.forget(event.src_path)
 
 
 class FolderWatcher:
     """Watch a folder for new video files"""
 
-    def __init__(self, folder_path, callback):
+    def __init__(self, folder_path, callback, settle_time=5.0, poll_interval=1.0):
         self.folder_path = folder_path
         self.callback = callback
+        self.settle_time = settle_time
+        self.poll_interval = poll_interval
         self.observer = None
         self.handler = None
+        self.settler = None
 
     def start(self):
         """Start watching the folder"""
         if not os.path.exists(self.folder_path):
             raise ValueError(f"Folder does not exist: {self.folder_path}")
 
-        self.handler = VideoFileHandler(self.callback)
+        self.settler = FileSettler(self.callback, self.settle_time, self.poll_interval)
+        self.settler.start()
+        self.handler = VideoFileHandler(self.settler)
         self.observer = Observer()
         self.observer.schedule(self.handler, self.folder_path, recursive=True)
         self.observer.start()
@@ -66,7 +183,9 @@ class FolderWatcher:
             self.observer.stop()
             self.observer.join()
             print(f"Stopped watching folder: {self.folder_path}")
+        if self.settler:
+            self.settler.stop()
 
     def is_running(self):
         """Check if watcher is running"""
-        return self.observer and self.observer.is_alive()
\ No newline at end of file
+        return self.observer and self.observer.is_alive()
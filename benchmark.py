@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the transcode pipeline
+
+This script generates synthetic test videos with FFmpeg's testsrc2 and sine
+sources and measures, at each concurrency level:
+1. VideoTranscoder.transcode called directly (encoder throughput)
+2. The full job path: API -> queue -> scheduler -> process_job -> database
+
+Results (fps, wall time, CPU utilization, database writes and queue latency)
+are written as JSON so runs can be compared against each other.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --concurrency 1,2,4 --files 8 --duration 10 --output results.json
+    python benchmark.py --compare baseline.json --tolerance 0.1
+
+The benchmark uses its own temporary database and folders; it never touches
+the configured database or media folders.
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import psutil
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the video transcode pipeline')
+    parser.add_argument('--concurrency', default='1,2,4',
+                        help='comma separated concurrency levels (default: 1,2,4)')
+    parser.add_argument('--files', type=int, default=4, help='synthetic videos per level (default: 4)')
+    parser.add_argument('--duration', type=int, default=10, help='seconds per video (default: 10)')
+    parser.add_argument('--size', default='1280x720', help='video size (default: 1280x720)')
+    parser.add_argument('--rate', type=int, default=30, help='frames per second (default: 30)')
+    parser.add_argument('--codec', default='libx264', help='video codec (default: libx264)')
+    parser.add_argument('--preset', default='veryfast', help='encoder preset (default: veryfast)')
+    parser.add_argument('--crf', type=int, default=23, help='CRF (default: 23)')
+    parser.add_argument('--stages', default='transcoder,pipeline',
+                        help='what to run: transcoder, pipeline or both (default: both)')
+    parser.add_argument('--timeout', type=float, default=1800, help='seconds to wait per level')
+    parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+    parser.add_argument('--compare', help='baseline JSON file to compare the results against')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='fps drop (fraction) counted as a regression (default: 0.1)')
+    parser.add_argument('--keep', action='store_true', help='keep the temporary folder')
+    return parser.parse_args()
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(values):
+    """Mean, median, p95 and max of a list of seconds"""
+    if not values:
+        return None
+    return {
+        'mean': round(sum(values) / len(values), 3),
+        'p50': round(percentile(values, 0.5), 3),
+        'p95': round(percentile(values, 0.95), 3),
+        'max': round(max(values), 3)
+    }
+
+
+def ffmpeg_version():
+    try:
+        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True)
+        return result.stdout.splitlines()[0] if result.stdout else None
+    except OSError:
+        return None
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=BASE_DIR)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def generate_media(folder, count, duration, size, rate):
+    """Write ``count`` distinct synthetic H.264/AAC videos"""
+    os.makedirs(folder, exist_ok=True)
+    files = []
+    for index in range(count):
+        path = os.path.join(folder, f'synthetic_{index:03d}.mp4')
+        cmd = [
+            'ffmpeg', '-v', 'error', '-y',
+            '-f', 'lavfi', '-i', f'testsrc2=size={size}:rate={rate}:duration={duration}',
+            # A different tone per file keeps the result cache from deduplicating them
+            '-f', 'lavfi', '-i', f'sine=frequency={440 + 20 * index}:duration={duration}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+            '-c:a', 'aac', '-shortest',
+            path
+        ]
+        subprocess.run(cmd, check=True)
+        files.append(path)
+    return files
+
+
+class CpuMeter:
+    """Average system CPU utilization between start() and stop()"""
+
+    def start(self):
+        psutil.cpu_percent(interval=None)
+        self.started = time.monotonic()
+
+    def stop(self):
+        return {
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'wall_seconds': round(time.monotonic() - self.started, 3)
+        }
+
+
+def bench_transcoder(files, output_dir, concurrency, settings, frames_per_file):
+    """Run VideoTranscoder.transcode on every file, ``concurrency`` at a time"""
+    from app.transcoder import VideoTranscoder
+
+    frames = [0]
+    lock = threading.Lock()
+
+    def count_frames(count):
+        with lock:
+            frames[0] += count
+
+    transcoder = VideoTranscoder(frame_counter=count_frames)
+    settings = {**settings, 'threads': max(1, (os.cpu_count() or 1) // concurrency)}
+
+    def run(path):
+        output_file = os.path.join(output_dir, f'direct_{concurrency}_{os.path.basename(path)}')
+        transcoder.transcode(path, output_file, settings)
+
+    meter = CpuMeter()
+    meter.start()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run, files))
+    measured = meter.stop()
+
+    encoded = frames[0] or frames_per_file * len(files)
+    return {
+        'concurrency': concurrency,
+        'threads_per_job': settings['threads'],
+        'jobs': len(files),
+        'frames': encoded,
+        'fps': round(encoded / measured['wall_seconds'], 2),
+        **measured
+    }
+
+
+def load_app(work_dir, max_concurrency):
+    """Import app.py against a private database and RUN_DIR with tuning features off"""
+    os.environ.update({
+        'DATABASE_URL': 'sqlite:///' + os.path.join(work_dir, 'benchmark.db'),
+        # Keep metrics snapshots out of the real service's RUN_DIR
+        'RUN_DIR': os.path.join(work_dir, 'run'),
+        'MAX_CONCURRENT_JOBS': str(max_concurrency),
+        'AUTOTUNE_ENABLED': 'False',
+        'RESULT_CACHE_ENABLED': 'False',
+        'PASSTHROUGH_ENABLED': 'False',
+        'SCHEDULER_POLL_INTERVAL': '0.5',
+        'CLUSTER_TRANSPORT': ''
+    })
+    spec = importlib.util.spec_from_file_location('transcoder_app', os.path.join(BASE_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['transcoder_app'] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class StatementCounter:
+    """Count SQL statements and commits issued through an engine"""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.counts = {}
+        self.commits = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        event.listen(engine, 'commit', self._on_commit)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else 'OTHER'
+        with self._lock:
+            self.counts[verb] = self.counts.get(verb, 0) + 1
+
+    def _on_commit(self, conn):
+        with self._lock:
+            self.commits += 1
+
+    def reset(self):
+        with self._lock:
+            self.counts = {}
+            self.commits = 0
+
+    def snapshot(self):
+        with self._lock:
+            writes = sum(self.counts.get(verb, 0) for verb in ('INSERT', 'UPDATE', 'DELETE'))
+            return {'statements': dict(self.counts), 'writes': writes, 'commits': self.commits}
+
+
+def bench_pipeline(module, counter, files, concurrency, frames_per_file, timeout):
+    """Queue every file through the API and wait for the scheduler to finish them"""
+    app = module.app
+    TranscodeJob = module.TranscodeJob
+    client = app.test_client()
+
+    threads = max(1, (os.cpu_count() or 1) // concurrency)
+    app.config['FFMPEG_THREADS_PER_JOB'] = threads
+    module.scheduler.set_limit(concurrency)
+
+    counter.reset()
+    meter = CpuMeter()
+    meter.start()
+    job_ids = []
+    for path in files:
+        response = client.post('/api/jobs', json={'source_file': path})
+        if response.status_code != 201:
+            raise RuntimeError(f"Could not queue {path}: {response.get_json()}")
+        job_ids.append(response.get_json()['id'])
+
+    deadline = time.monotonic() + timeout
+    with app.app_context():
+        while True:
+            unfinished = TranscodeJob.query.filter(
+                TranscodeJob.id.in_(job_ids),
+                TranscodeJob.status.in_(('pending', 'processing'))
+            ).count()
+            module.db.session.rollback()
+            if not unfinished:
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{unfinished} job(s) did not finish within {timeout}s")
+            time.sleep(0.2)
+    measured = meter.stop()
+    database = counter.snapshot()
+
+    with app.app_context():
+        jobs = TranscodeJob.query.filter(TranscodeJob.id.in_(job_ids)).all()
+        queue_wait = [
+            (job.started_at - job.created_at).total_seconds()
+            for job in jobs if job.started_at and job.created_at
+        ]
+        run_time = [
+            (job.completed_at - job.started_at).total_seconds()
+            for job in jobs if job.completed_at and job.started_at
+        ]
+        completed = sum(1 for job in jobs if job.status == 'completed')
+        errors = sorted({job.error_message for job in jobs if job.status == 'failed'})
+
+    frames = frames_per_file * completed
+    return {
+        'concurrency': concurrency,
+        'threads_per_job': threads,
+        'jobs': len(job_ids),
+        'completed': completed,
+        'failed': len(job_ids) - completed,
+        'errors': errors[:5],
+        'frames': frames,
+        'fps': round(frames / measured['wall_seconds'], 2),
+        **measured,
+        'queue_latency': summarize(queue_wait),
+        'job_seconds': summarize(run_time),
+        'database': {**database, 'writes_per_job': round(database['writes'] / max(1, len(job_ids)), 1)}
+    }
+
+
+def compare(baseline, results, tolerance):
+    """Print fps changes per stage and level; returns True if any level regressed"""
+    regressed = False
+    for stage in ('transcoder', 'pipeline'):
+        before = {run['concurrency']: run for run in baseline.get(stage) or []}
+        for run in results.get(stage) or []:
+            previous = before.get(run['concurrency'])
+            if not previous or not previous.get('fps'):
+                continue
+            change = (run['fps'] - previous['fps']) / previous['fps']
+            marker = ''
+            if change < -tolerance:
+                marker = '  <-- regression'
+                regressed = True
+            print(f"{stage:<11} x{run['concurrency']:<3} {previous['fps']:>9.1f} -> {run['fps']:>9.1f} fps "
+                  f"({change:+.1%}){marker}", file=sys.stderr)
+    return regressed
+
+
+def main():
+    args = parse_args()
+    levels = sorted({int(level) for level in args.concurrency.split(',') if level.strip()})
+    stages = {stage.strip() for stage in args.stages.split(',')}
+    if shutil.which('ffmpeg') is None:
+        print("FFmpeg was not found in PATH", file=sys.stderr)
+        return 2
+
+    # Read the baseline first so a bad path fails before the long run
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    work_dir = tempfile.mkdtemp(prefix='transcoder-benchmark-')
+    media_dir = os.path.join(work_dir, 'source')
+    output_dir = os.path.join(work_dir, 'output')
+    os.makedirs(output_dir)
+
+    settings = {
+        'video_codec': args.codec,
+        'audio_codec': 'aac',
+        'preset': args.preset,
+        'crf': args.crf
+    }
+    frames_per_file = args.duration * args.rate
+    results = {
+        'created_at': datetime.utcnow().isoformat(),
+        'host': {
+            'cpu_count': os.cpu_count(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'ffmpeg': ffmpeg_version(),
+            'commit': git_commit()
+        },
+        'parameters': {
+            'concurrency': levels,
+            'files': args.files,
+            'duration': args.duration,
+            'size': args.size,
+            'rate': args.rate,
+            **settings
+        },
+        'transcoder': [],
+        'pipeline': []
+    }
+
+    try:
+        print(f"Generating {args.files} synthetic video(s) in {media_dir}...", file=sys.stderr)
+        files = generate_media(media_dir, args.files, args.duration, args.size, args.rate)
+
+        if 'transcoder' in stages:
+            for level in levels:
+                print(f"Transcoder, {level} at a time...", file=sys.stderr)
+                results['transcoder'].append(
+                    bench_transcoder(files, output_dir, level, settings, frames_per_file)
+                )
+
+        if 'pipeline' in stages:
+            module = load_app(work_dir, max(levels))
+            module.settings_store.update({
+                'source_folder': media_dir,
+                'output_folder': output_dir,
+                'output_format': 'mp4',
+                'renditions': '',
+                **settings
+            })
+            with module.app.app_context():
+                counter = StatementCounter(module.db.engine)
+            for level in levels:
+                print(f"Pipeline, {level} at a time...", file=sys.stderr)
+                results['pipeline'].append(
+                    bench_pipeline(module, counter, files, level, frames_per_file, args.timeout)
+                )
+            module.scheduler.stop(timeout=5)
+    finally:
+        if args.keep:
+            print(f"Kept {work_dir}", file=sys.stderr)
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if baseline is not None and compare(baseline, results, args.tolerance):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
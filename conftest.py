@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Shared fixtures for tests that need app.py itself
+"""
+
+import importlib.util
+import os
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+@pytest.fixture(scope='session')
+def webapp(tmp_path_factory):
+    """app.py imported against a scratch database and RUN_DIR
+
+    Importing the app starts its scheduler and background threads; they are
+    stopped again so tests drive claiming and lease maintenance by hand.
+    """
+    work_dir = tmp_path_factory.mktemp('webapp')
+    patch = pytest.MonkeyPatch()
+    for key, value in {
+        'DATABASE_URL': 'sqlite:///' + str(work_dir / 'transcoder.db'),
+        'RUN_DIR': str(work_dir / 'run'),
+        'MAX_CONCURRENT_JOBS': '2',
+        'JOB_MAX_ATTEMPTS': '3',
+        'AUTOTUNE_ENABLED': 'False',
+        'CLUSTER_TRANSPORT': ''
+    }.items():
+        patch.setenv(key, value)
+
+    spec = importlib.util.spec_from_file_location('transcoder_app', os.path.join(BASE_DIR, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    for service in (module.scheduler, module.progress_tracker, module.change_feed,
+                    module.system_sampler, module.REGISTRY):
+        service.stop()
+
+    yield module
+    patch.undo()
+
+
+@pytest.fixture
+def db_session(webapp):
+    """App context with an empty job table"""
+    with webapp.app.app_context():
+        webapp.TranscodeJob.query.delete()
+        webapp.db.session.commit()
+        yield webapp.db.session
+        webapp.db.session.remove()
@@ -1,10 +1,14 @@
 // API Base URL
 const API_BASE = '/api';
+const JOBS_PAGE_SIZE = 50;
 
 // State
 let currentFilter = 'all';
 let jobs = [];
+let nextCursor = null;
 let refreshInterval;
+let eventSource;
+let statusRefreshTimer;
 
 // Initialize app
 document.addEventListener('DOMContentLoaded', () => {
@@ -12,7 +16,11 @@ document.addEventListener('DOMContentLoaded', () => {
     loadJobs();
     loadStatus();
     setupEventListeners();
-    startAutoRefresh();
+    if (window.EventSource) {
+        connectEvents();
+    } else {
+        startAutoRefresh();
+    }
 });
 
 // Setup event listeners
@@ -36,9 +44,12 @@ function setupEventListeners() {
             document.querySelectorAll('.filter-btn').forEach(b => b.classList.remove('active'));
             e.target.classList.add('active');
             currentFilter = e.target.dataset.filter;
-            renderJobs();
+            loadJobs();
         });
     });
+
+    // Load more button
+    document.getElementById('loadMoreBtn').addEventListener('click', loadMoreJobs);
 }
 
 // Load settings
@@ -55,6 +66,7 @@ async function loadSettings() {
         document.getElementById('preset').value = settings.preset || 'medium';
         document.getElementById('crf').value = settings.crf || 23;
         document.getElementById('crfValue').textContent = settings.crf || 23;
+        document.getElementById('renditions').value = settings.renditions || '';
         document.getElementById('watchEnabled').checked = settings.watch_enabled || false;
     } catch (error) {
         showNotification('Failed to load settings', 'error');
@@ -74,6 +86,7 @@ async function saveSettings(e) {
         audio_codec: document.getElementById('audioCodec').value,
         preset: document.getElementById('preset').value,
         crf: parseInt(document.getElementById('crf').value),
+        renditions: document.getElementById('renditions').value,
         watch_enabled: document.getElementById('watchEnabled').checked
     };
 
@@ -120,19 +133,48 @@ async function scanFolder() {
 }
 
 // Load jobs
+async function fetchJobsPage(cursor) {
+    const params = new URLSearchParams({ limit: JOBS_PAGE_SIZE });
+    if (currentFilter !== 'all') {
+        params.set('status', currentFilter);
+    }
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    const response = await fetch(`${API_BASE}/jobs?${params}`);
+    return response.json();
+}
+
 async function loadJobs() {
     try {
-        const response = await fetch(`${API_BASE}/jobs`);
-        jobs = await response.json();
+        const page = await fetchJobsPage(null);
+        jobs = page.jobs;
+        nextCursor = page.next_cursor;
         renderJobs();
     } catch (error) {
         console.error('Error loading jobs:', error);
     }
 }
 
+async function loadMoreJobs() {
+    if (!nextCursor) {
+        return;
+    }
+    try {
+        const page = await fetchJobsPage(nextCursor);
+        const known = new Set(jobs.map(j => j.id));
+        jobs = jobs.concat(page.jobs.filter(j => !known.has(j.id)));
+        nextCursor = page.next_cursor;
+        renderJobs();
+    } catch (error) {
+        console.error('Error loading more jobs:', error);
+    }
+}
+
 // Render jobs
 function renderJobs() {
     const jobsList = document.getElementById('jobsList');
+    document.getElementById('loadMoreBtn').style.display = nextCursor ? '' : 'none';
 
     // Filter jobs
     let filteredJobs = jobs;
@@ -167,7 +209,7 @@ function renderJobs() {
                     <div class="progress-bar">
                         <div class="progress-fill" style="width: ${job.progress}%"></div>
                     </div>
-                    <p class="progress-text">${job.progress.toFixed(1)}% complete</p>
+                    <p class="progress-text">${job.progress.toFixed(1)}% complete${formatEncodeStats(job)}</p>
                 </div>
             ` : ''}
             
@@ -219,7 +261,82 @@ async function loadStatus() {
     }
 }
 
-// Auto-refresh
+// Live updates pushed by the server
+function connectEvents() {
+    eventSource = new EventSource(`${API_BASE}/events`);
+
+    // (Re)connected: reload once to pick up anything missed while offline
+    eventSource.addEventListener('open', () => {
+        loadJobs();
+        loadStatus();
+    });
+
+    eventSource.addEventListener('job', (e) => {
+        upsertJob(JSON.parse(e.data));
+        scheduleStatusRefresh();
+    });
+
+    eventSource.addEventListener('progress', (e) => {
+        const update = JSON.parse(e.data);
+        const job = jobs.find(j => j.id === update.id);
+        if (job) {
+            Object.assign(job, update);
+            renderJobs();
+        }
+    });
+
+    eventSource.addEventListener('job_deleted', (e) => {
+        const deleted = JSON.parse(e.data);
+        jobs = jobs.filter(j => j.id !== deleted.id);
+        renderJobs();
+        scheduleStatusRefresh();
+    });
+
+    eventSource.addEventListener('resync', () => {
+        loadJobs();
+    });
+
+    // The server turned the stream away (too many open): poll for a while
+    // and then try to stream again
+    eventSource.addEventListener('error', () => {
+        if (eventSource.readyState !== EventSource.CLOSED) {
+            return;
+        }
+        eventSource = null;
+        clearInterval(refreshInterval);
+        startAutoRefresh();
+        setTimeout(() => {
+            clearInterval(refreshInterval);
+            connectEvents();
+        }, 60000);
+    });
+
+    // CPU and memory are not pushed, refresh them slowly
+    clearInterval(refreshInterval);
+    refreshInterval = setInterval(loadStatus, 30000);
+}
+
+function upsertJob(job) {
+    const index = jobs.findIndex(j => j.id === job.id);
+    if (index === -1) {
+        jobs.unshift(job);
+    } else {
+        jobs[index] = job;
+    }
+    renderJobs();
+}
+
+function scheduleStatusRefresh() {
+    if (statusRefreshTimer) {
+        return;
+    }
+    statusRefreshTimer = setTimeout(() => {
+        statusRefreshTimer = null;
+        loadStatus();
+    }, 1000);
+}
+
+// Auto-refresh (fallback for browsers without EventSource)
 function startAutoRefresh() {
     refreshInterval = setInterval(() => {
         loadJobs();
@@ -232,6 +349,18 @@ function getFileName(path) {
     return path.split('/').pop();
 }
 
+function formatEncodeStats(job) {
+    const parts = [];
+    if (job.encode_fps) parts.push(`${job.encode_fps.toFixed(1)} fps`);
+    if (job.encode_speed) parts.push(`${job.encode_speed.toFixed(2)}x`);
+    if (job.encode_bitrate) parts.push(`${Math.round(job.encode_bitrate)} kbit/s`);
+    if (job.eta_seconds != null) {
+        const eta = Math.round(job.eta_seconds);
+        parts.push(`ETA ${Math.floor(eta / 60)}:${String(eta % 60).padStart(2, '0')}`);
+    }
+    return parts.length ? ` · ${parts.join(' · ')}` : '';
+}
+
 function formatDate(dateString) {
     if (!dateString) return 'N/A';
     const date = new Date(dateString);
@@ -254,4 +383,7 @@ window.addEventListener('beforeunload', () => {
     if (refreshInterval) {
         clearInterval(refreshInterval);
     }
+    if (eventSource) {
+        eventSource.close();
+    }
 });
\ No newline at end of file
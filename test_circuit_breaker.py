@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the RAG circuit breaker and adaptive read timeout
+"""
+
+import pytest
+
+from app import circuit_breaker
+from app.circuit_breaker import CircuitBreaker, LatencyTracker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic clock the test moves forward by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.status() == {'state': 'closed', 'failures': 2}
+
+    breaker.record_failure()
+
+    assert breaker.status()['state'] == 'open'
+    assert not breaker.allow()
+    assert breaker.retry_after() == 30
+
+
+def test_success_resets_the_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.status() == {'state': 'closed', 'failures': 1}
+
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+
+    clock[0] += 31
+    assert breaker.retry_after() == 0
+    assert breaker.allow()
+    assert breaker.status()['state'] == 'half_open'
+    # Only one trial at a time
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.status() == {'state': 'closed', 'failures': 0}
+    assert breaker.allow()
+
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.status()['state'] == 'open'
+    assert breaker.retry_after() == 30
+
+
+def test_ignored_trial_lets_another_through(clock):
+    """A trial that says nothing about the service frees the trial slot"""
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow()
+
+    breaker.record_ignored()
+
+    assert breaker.status()['state'] == 'half_open'
+    assert breaker.allow()
+
+
+def test_timeout_follows_recent_latency():
+    tracker = LatencyTracker(maximum=120.0, minimum=5.0, percentile=90, multiplier=3.0, min_samples=10)
+    assert tracker.timeout() == 120.0
+
+    for latency in [1.0] * 9 + [4.0]:
+        tracker.record(latency)
+
+    assert tracker.latency() == 4.0
+    assert tracker.timeout() == 12.0
+
+
+def test_timeout_stays_within_bounds():
+    tracker = LatencyTracker(maximum=60.0, minimum=5.0, min_samples=1)
+    tracker.record(0.1)
+    assert tracker.timeout() == 5.0
+
+    tracker = LatencyTracker(maximum=60.0, minimum=5.0, min_samples=1)
+    tracker.record(50.0)
+    assert tracker.timeout() == 60.0
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for distributed chunk encoding
+
+Chunks are encoded by a stand-in ``ffmpeg`` that writes the chunk's start
+time into each chunk file and joins the chunk files on concat, so the tests
+can check that every chunk was dispatched, retried and reassembled in order
+without a real FFmpeg.
+"""
+
+import os
+import stat
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+from app.cluster import ChunkCoordinator, ChunkTransport, LocalTransport, encode_chunk
+from app.transcoder import VideoTranscoder
+
+FAKE_FFMPEG = '''#!{python}
+import sys
+args = sys.argv[1:]
+output = args[-1]
+if '-f' in args and args[args.index('-f') + 1] == 'concat':
+    listing = args[args.index('-i') + 1]
+    with open(output, 'w') as out:
+        for line in open(listing):
+            out.write(open(line.strip()[len("file '"):-1]).read())
+elif '-ss' in args:
+    open(output, 'w').write('chunk ' + args[args.index('-ss') + 1] + '\\n')
+else:
+    open(output, 'w').write('audio\\n')
+print('frame=1')
+print('progress=end', flush=True)
+'''
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    """Put the stand-in ffmpeg first on PATH (worker processes inherit it)"""
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    ffmpeg = bin_dir / 'ffmpeg'
+    ffmpeg.write_text(FAKE_FFMPEG.format(python=sys.executable))
+    ffmpeg.chmod(ffmpeg.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return ffmpeg
+
+
+def make_chunks(tmp_path, count=4):
+    return [
+        {
+            'index': index,
+            'input_file': str(tmp_path / 'input.mp4'),
+            'output_file': str(tmp_path / f'segment_{index:04d}.mkv'),
+            'start': float(index * 2),
+            'end': float(index * 2 + 2),
+            'settings': {'video_codec': 'libx264'}
+        }
+        for index in range(count)
+    ]
+
+
+class FlakyTransport(ChunkTransport):
+    """Fail the first ``failures`` attempts of some chunks, pass the rest on"""
+
+    def __init__(self, transport, failures):
+        self.transport = transport
+        self.failures = dict(failures)
+
+    def submit(self, chunk):
+        if self.failures.get(chunk['index'], 0) > 0:
+            self.failures[chunk['index']] -= 1
+            future = Future()
+            future.set_exception(RuntimeError('worker lost'))
+            return future
+        return self.transport.submit(chunk)
+
+
+def test_dispatches_every_chunk_to_local_workers(tmp_path, fake_ffmpeg):
+    """Each chunk is encoded once by a worker process and reported done"""
+    chunks = make_chunks(tmp_path)
+    updates = []
+    done = []
+    transport = LocalTransport(workers=2)
+    try:
+        ChunkCoordinator(transport, on_update=lambda *update: updates.append(update)).run(
+            chunks, done.append
+        )
+    finally:
+        transport.shutdown()
+
+    assert sorted(done) == [0, 1, 2, 3]
+    for chunk in chunks:
+        assert open(chunk['output_file']).read() == f"chunk {chunk['start']:.6f}\n"
+    completed = [update for update in updates if update[1] == 'completed']
+    assert len(completed) == 4
+    assert all(update[3] and update[3] != f"{os.uname().nodename}:{os.getpid()}" for update in completed)
+
+
+def test_retries_failed_chunks(tmp_path, fake_ffmpeg):
+    """A chunk whose worker fails is dispatched again"""
+    chunks = make_chunks(tmp_path)
+    updates = []
+    transport = LocalTransport(workers=2)
+    try:
+        ChunkCoordinator(
+            FlakyTransport(transport, {1: 2}),
+            max_retries=2,
+            on_update=lambda chunk, status, attempt, worker, error: updates.append(
+                (chunk['index'], status, attempt)
+            )
+        ).run(chunks)
+    finally:
+        transport.shutdown()
+
+    assert (1, 'retrying', 1) in updates
+    assert (1, 'retrying', 2) in updates
+    assert (1, 'completed', 3) in updates
+    assert os.path.exists(chunks[1]['output_file'])
+
+
+def test_gives_up_after_max_retries(tmp_path, fake_ffmpeg):
+    """A chunk that keeps failing fails the whole run"""
+    chunks = make_chunks(tmp_path, count=2)
+    updates = []
+    transport = LocalTransport(workers=1)
+    try:
+        with pytest.raises(Exception, match='Chunk 0 failed after 2 attempt'):
+            ChunkCoordinator(
+                FlakyTransport(transport, {0: 5}),
+                max_retries=1,
+                on_update=lambda chunk, status, attempt, worker, error: updates.append(
+                    (chunk['index'], status)
+                )
+            ).run(chunks)
+    finally:
+        transport.shutdown()
+
+    assert (0, 'failed') in updates
+
+
+def test_reassembles_cluster_chunks_in_order(tmp_path, fake_ffmpeg):
+    """Chunks encoded on the cluster are joined in timeline order"""
+    source = tmp_path / 'input.mp4'
+    source.write_text('source')
+    output = tmp_path / 'output.mp4'
+
+    transcoder = VideoTranscoder()
+    transcoder.get_keyframes = lambda input_file: [0.0, 2.0, 4.0, 6.0, 8.0]
+    transport = LocalTransport(workers=2)
+    try:
+        coordinator = ChunkCoordinator(FlakyTransport(transport, {2: 1}))
+        transcoder.transcode_segmented(
+            str(source), str(output), {'video_codec': 'libx264'}, 4,
+            total_duration=10.0,
+            dispatcher=coordinator.run,
+            info={'duration': 10.0}
+        )
+    finally:
+        transport.shutdown()
+
+    assert output.read_text().splitlines() == [
+        'chunk 0.000000', 'chunk 2.000000', 'chunk 4.000000', 'chunk 8.000000'
+    ]
+    # The work directory with the chunk files is cleaned up
+    assert sorted(os.listdir(tmp_path)) == ['bin', 'input.mp4', 'output.mp4']
+
+
+def test_dispatched_chunks_share_the_job_threads(tmp_path, fake_ffmpeg):
+    """Each chunk gets the job's threads divided by the chunks one host runs at once"""
+    source = tmp_path / 'input.mp4'
+    source.write_text('source')
+    dispatched = []
+
+    def dispatcher(chunks, on_chunk_done):
+        for chunk in chunks:
+            dispatched.append(chunk['settings']['threads'])
+            encode_chunk(chunk)
+            on_chunk_done(chunk['index'])
+
+    transcoder = VideoTranscoder()
+    transcoder.get_keyframes = lambda input_file: [0.0, 2.0, 4.0, 6.0, 8.0]
+    transcoder.transcode_segmented(
+        str(source), str(tmp_path / 'output.mp4'), {'video_codec': 'libx264', 'threads': 8}, 4,
+        total_duration=10.0,
+        dispatcher=dispatcher,
+        info={'duration': 10.0},
+        dispatch_workers=16
+    )
+
+    assert dispatched == [2, 2, 2, 2]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for parsing FFmpeg -progress output and combining it per job
+"""
+
+from app import ffmpeg_progress
+from app.ffmpeg_progress import EncodeStats, ProgressParser
+
+BLOCK = """frame=240
+fps=48.0
+stream_0_0_q=28.0
+bitrate=1500.5kbits/s
+total_size=1875000
+out_time_us=10000000
+out_time_ms=10000000
+out_time=00:00:10.000000
+dup_frames=1
+drop_frames=0
+speed=2.0x
+progress=continue
+"""
+
+
+def feed_all(parser, text):
+    return [record for record in map(parser.feed, text.splitlines()) if record is not None]
+
+
+def test_one_record_per_block():
+    records = feed_all(ProgressParser(), BLOCK)
+
+    assert records == [{
+        'frame': 240,
+        'fps': 48.0,
+        'bitrate': 1500.5,
+        'total_size': 1875000,
+        'out_time': 10.0,
+        'dup_frames': 1,
+        'drop_frames': 0,
+        'speed': 2.0,
+        'progress': 'continue'
+    }]
+
+
+def test_na_values_and_log_lines_are_skipped():
+    """N/A values and merged stderr lines do not break the record"""
+    text = """Input #0, mov,mp4,m4a,3gp,3g2,mj2, from 'in.mp4':
+frame=0
+fps=0.00
+bitrate=N/A
+out_time_us=N/A
+speed=N/A
+progress=continue
+frame=10
+progress=end
+"""
+    records = feed_all(ProgressParser(), text)
+
+    assert records == [
+        {'frame': 0, 'fps': 0.0, 'progress': 'continue'},
+        {'frame': 10, 'progress': 'end'}
+    ]
+
+
+def test_blocks_do_not_leak_into_each_other():
+    parser = ProgressParser()
+    feed_all(parser, BLOCK)
+
+    assert feed_all(parser, "frame=300\nprogress=end\n") == [{'frame': 300, 'progress': 'end'}]
+
+
+def test_stats_sum_parallel_runs(monkeypatch):
+    """Chunks encoding at once add up; runs without video frames do not count"""
+    monkeypatch.setattr(ffmpeg_progress.time, 'monotonic', lambda: 100.0)
+    stats = EncodeStats(duration=60.0)
+    first, second, audio = stats.start(), stats.start(), stats.start()
+    stats.update(first, {'frame': 240, 'fps': 48.0, 'speed': 2.0, 'out_time': 10.0,
+                         'bitrate': 1000.0, 'progress': 'continue'})
+    stats.update(second, {'frame': 120, 'fps': 24.0, 'speed': 1.0, 'out_time': 5.0,
+                          'bitrate': 2000.0, 'dup_frames': 2, 'progress': 'continue'})
+    stats.update(audio, {'out_time': 30.0, 'speed': 50.0, 'progress': 'continue'})
+
+    assert stats.summary() == {
+        'frame': 360,
+        'fps': 72.0,
+        'speed': 3.0,
+        'bitrate': 1500.0,
+        'dup_frames': 2,
+        'drop_frames': 0,
+        'eta': 15.0
+    }
+
+
+def test_stats_average_the_whole_job_once_finished(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(ffmpeg_progress.time, 'monotonic', lambda: now[0])
+    stats = EncodeStats(duration=20.0)
+    assert stats.summary() is None
+
+    run = stats.start()
+    now[0] += 10
+    stats.update(run, {'frame': 480, 'fps': 60.0, 'speed': 3.0, 'out_time': 20.0, 'progress': 'end'})
+
+    summary = stats.summary()
+    assert (summary['fps'], summary['speed'], summary['eta']) == (48.0, 2.0, 0.0)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental source folder scan
+"""
+
+import os
+import time
+
+from app.file_index import quick_fingerprint, scan_tree
+
+EXTENSIONS = {'.mp4', '.mkv'}
+
+
+def make_tree(root):
+    (root / 'a' / 'deep').mkdir(parents=True)
+    (root / 'b').mkdir()
+    (root / 'top.mp4').write_bytes(b'top')
+    (root / 'a' / 'one.MKV').write_bytes(b'one')
+    (root / 'a' / 'notes.txt').write_text('not a video')
+    (root / 'a' / 'deep' / 'two.mp4').write_bytes(b'two')
+
+
+def known_from(result, scanned_at):
+    """The ``known_dirs`` a caller would store after ``result``"""
+    children = {path: [] for path in result.listed_dirs}
+    for path, parent in result.new_dirs.items():
+        if parent is not None:
+            children[parent].append(path)
+    return {path: (mtime, scanned_at, children[path]) for path, mtime in result.listed_dirs.items()}
+
+
+def age_dirs(root, seconds):
+    """Backdate every directory so its mtime is trusted by the next scan"""
+    past = time.time() - seconds
+    for path, _, _ in os.walk(root):
+        os.utime(path, (past, past))
+
+
+def test_first_scan_lists_every_video(tmp_path):
+    """A scan without history lists every directory and only video files"""
+    make_tree(tmp_path)
+    result = scan_tree(str(tmp_path), EXTENSIONS, {})
+
+    assert sorted(os.path.relpath(path, tmp_path) for path in result.files) == [
+        'a/deep/two.mp4', 'a/one.MKV', 'top.mp4'
+    ]
+    assert set(result.new_dirs) == {str(tmp_path), str(tmp_path / 'a'), str(tmp_path / 'a' / 'deep'),
+                                    str(tmp_path / 'b')}
+    assert result.skipped_dirs == 0
+
+
+def test_unchanged_directories_are_skipped(tmp_path):
+    """A rescan only lists directories whose entries changed"""
+    make_tree(tmp_path)
+    age_dirs(tmp_path, 60)
+    known = known_from(scan_tree(str(tmp_path), EXTENSIONS, {}), time.time())
+
+    (tmp_path / 'b' / 'new.mp4').write_bytes(b'new')
+    result = scan_tree(str(tmp_path), EXTENSIONS, known)
+
+    assert list(result.files) == [str(tmp_path / 'b' / 'new.mp4')]
+    assert set(result.listed_dirs) == {str(tmp_path / 'b')}
+    assert result.skipped_dirs == 3
+    assert not result.new_dirs
+
+
+def test_full_scan_lists_everything(tmp_path):
+    """``full`` ignores the stored directory mtimes"""
+    make_tree(tmp_path)
+    age_dirs(tmp_path, 60)
+    known = known_from(scan_tree(str(tmp_path), EXTENSIONS, {}), time.time())
+
+    result = scan_tree(str(tmp_path), EXTENSIONS, known, full=True)
+
+    assert len(result.files) == 3
+    assert result.skipped_dirs == 0
+
+
+def test_removed_directories_are_reported(tmp_path):
+    """Known directories missing from their parent's listing are removed"""
+    make_tree(tmp_path)
+    age_dirs(tmp_path, 60)
+    known = known_from(scan_tree(str(tmp_path), EXTENSIONS, {}), time.time())
+
+    (tmp_path / 'a' / 'deep' / 'two.mp4').unlink()
+    (tmp_path / 'a' / 'deep').rmdir()
+    result = scan_tree(str(tmp_path), EXTENSIONS, known)
+
+    assert result.removed_dirs == {str(tmp_path / 'a' / 'deep')}
+
+
+def test_fingerprint_covers_size_head_and_tail(tmp_path):
+    """Files differing at either end or in size get different fingerprints"""
+    body = b'x' * (300 * 1024)
+    variants = {
+        'same': body,
+        'head': b'y' + body[1:],
+        'tail': body[:-1] + b'y',
+        'longer': body + b'x',
+    }
+    for name, data in variants.items():
+        (tmp_path / name).write_bytes(data)
+    (tmp_path / 'copy').write_bytes(body)
+
+    fingerprints = {name: quick_fingerprint(str(tmp_path / name)) for name in variants}
+    assert len(set(fingerprints.values())) == 4
+    assert quick_fingerprint(str(tmp_path / 'copy')) == fingerprints['same']
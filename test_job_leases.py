@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Tests for claiming queued jobs and maintaining their leases
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+
+def add_job(webapp, session, **fields):
+    job = webapp.TranscodeJob(source_file=f"/videos/{fields.pop('name', 'a')}.mp4", **fields)
+    session.add(job)
+    session.commit()
+    return job.id
+
+
+def load_job(webapp, session, job_id):
+    session.expire_all()
+    return session.get(webapp.TranscodeJob, job_id)
+
+
+def test_claim_takes_the_highest_priority_job(webapp, db_session):
+    low = add_job(webapp, db_session, name='low', priority=0)
+    high = add_job(webapp, db_session, name='high', priority=5)
+
+    assert webapp.claim_next_job() == high
+
+    job = load_job(webapp, db_session, high)
+    assert (job.status, job.claimed_by, job.attempts) == ('processing', webapp.worker_id(), 1)
+    assert job.lease_expires_at > datetime.utcnow()
+    assert load_job(webapp, db_session, low).status == 'pending'
+
+
+def test_racing_claimers_get_a_job_once(webapp, db_session):
+    job_id = add_job(webapp, db_session)
+    barrier = threading.Barrier(8)
+    claimed = []
+
+    def claim():
+        barrier.wait()
+        claimed.append(webapp.claim_next_job())
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(claimed, key=str) == [job_id] + [None] * 7
+    assert load_job(webapp, db_session, job_id).attempts == 1
+
+
+def test_row_taken_by_another_claimer_is_skipped(webapp, db_session, monkeypatch):
+    """The UPDATE only matches a row that is still pending"""
+    first = add_job(webapp, db_session, name='first', priority=1)
+    second = add_job(webapp, db_session, name='second')
+    real_worker_id = webapp.worker_id
+    calls = []
+
+    def claimed_elsewhere():
+        # Another worker claims the candidate between our SELECT and UPDATE
+        if not calls:
+            with webapp.db.engine.begin() as conn:
+                conn.execute(
+                    update(webapp.TranscodeJob)
+                    .where(webapp.TranscodeJob.id == first)
+                    .values(status='processing', claimed_by='other-host:1')
+                )
+        calls.append(1)
+        return real_worker_id()
+
+    monkeypatch.setattr(webapp, 'worker_id', claimed_elsewhere)
+
+    assert webapp.claim_next_job() == second
+    assert load_job(webapp, db_session, first).claimed_by == 'other-host:1'
+
+
+def test_claims_stop_at_the_host_limit(webapp, db_session):
+    for name in 'abc':
+        add_job(webapp, db_session, name=name)
+
+    claimed = [webapp.claim_next_job() for _ in range(3)]
+
+    assert claimed[2] is None
+    assert None not in claimed[:2]
+
+
+def test_leases_of_running_jobs_are_renewed(webapp, db_session):
+    soon = datetime.utcnow() + timedelta(seconds=5)
+    job_id = add_job(webapp, db_session, status='processing', claimed_by=webapp.worker_id(),
+                     lease_expires_at=soon, attempts=1)
+
+    assert not webapp.maintain_leases({job_id})
+
+    job = load_job(webapp, db_session, job_id)
+    assert job.status == 'processing'
+    assert job.lease_expires_at > soon + timedelta(seconds=30)
+
+
+def test_expired_lease_is_requeued(webapp, db_session):
+    """A job whose worker stopped renewing goes back to the queue"""
+    job_id = add_job(webapp, db_session, status='processing', claimed_by='other-host:1',
+                     lease_expires_at=datetime.utcnow() - timedelta(seconds=1), attempts=1, progress=40.0)
+    alive = add_job(webapp, db_session, name='alive', status='processing', claimed_by='other-host:2',
+                    lease_expires_at=datetime.utcnow() + timedelta(seconds=60), attempts=1)
+
+    assert webapp.maintain_leases(set())
+
+    job = load_job(webapp, db_session, job_id)
+    assert (job.status, job.claimed_by, job.lease_expires_at, job.progress) == ('pending', None, None, 0.0)
+    assert load_job(webapp, db_session, alive).status == 'processing'
+    # The next claim counts as another attempt
+    assert webapp.claim_next_job() == job_id
+    assert load_job(webapp, db_session, job_id).attempts == 2
+
+
+def test_job_fails_once_attempts_run_out(webapp, db_session):
+    job_id = add_job(webapp, db_session, status='processing', claimed_by='other-host:1',
+                     lease_expires_at=datetime.utcnow() - timedelta(seconds=1),
+                     attempts=webapp.app.config['JOB_MAX_ATTEMPTS'])
+
+    assert not webapp.maintain_leases(set())
+
+    job = load_job(webapp, db_session, job_id)
+    assert (job.status, job.lease_expires_at) == ('failed', None)
+    assert job.error_message == 'Worker stopped responding too many times'
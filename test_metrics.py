@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for metrics shared between worker processes
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.metrics import RETIRED_FILE, Registry
+
+
+@pytest.fixture
+def dead_pid():
+    """Pid of a process that has already exited"""
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def make_registry(directory, jobs=0):
+    registry = Registry()
+    registry.share(str(directory))
+    registry.counter('jobs_total', 'Jobs').inc(jobs)
+    registry.histogram('took_seconds', 'Took', buckets=(1,)).observe(0.5)
+    registry.gauge('active', 'Active', lambda: 1)
+    return registry
+
+
+def write_worker_snapshot(directory, pid, jobs):
+    with open(os.path.join(directory, f'{pid}-100.json'), 'w') as f:
+        json.dump({'pid': pid, 'metrics': {
+            'jobs_total': [[[], jobs]],
+            'took_seconds': [[[], [1, 0.5, 1]]],
+            'active': [[[], 7]]
+        }}, f)
+
+
+def test_live_workers_are_summed(tmp_path):
+    registry = make_registry(tmp_path, jobs=2)
+    write_worker_snapshot(tmp_path, os.getppid(), 3)
+
+    text = registry.render()
+
+    assert 'jobs_total 5' in text
+    assert 'took_seconds_count 2' in text
+    assert f'active{{worker="{os.getpid()}"}} 1' in text
+    assert f'active{{worker="{os.getppid()}"}} 7' in text
+
+
+def test_dead_worker_snapshot_is_retired(tmp_path, dead_pid):
+    """A stopped worker's counters are kept in retired.json and its file removed"""
+    registry = make_registry(tmp_path, jobs=2)
+    write_worker_snapshot(tmp_path, dead_pid, 3)
+
+    text = registry.render()
+
+    assert 'jobs_total 5' in text
+    assert 'took_seconds_count 2' in text
+    assert f'worker="{dead_pid}"' not in text
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('.json')) == sorted([
+        RETIRED_FILE, f'{os.getpid()}-{registry._started_at}.json'
+    ])
+
+    # Rendering again does not count the retired worker twice
+    assert 'jobs_total 5' in registry.render()
+    write_worker_snapshot(tmp_path, dead_pid + 100000, 4)
+    assert 'jobs_total 9' in registry.render()
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for the FFmpeg commands that package HLS and DASH outputs
+"""
+
+import os
+
+from app.transcoder import VideoTranscoder
+
+INFO = {
+    'duration': 10.0,
+    'video': {'codec': 'h264', 'width': 1920, 'height': 1080, 'bitrate': 4000000, 'pix_fmt': 'yuv420p'},
+    'audio': {'codec': 'aac', 'bitrate': 128000}
+}
+
+
+def packaging_command(tmp_path, packaging, playlist_name, heights=None):
+    transcoder = VideoTranscoder()
+    transcoder.get_video_info = lambda input_file: INFO
+    commands = []
+    transcoder._run_ffmpeg = lambda cmd, on_time: commands.append(cmd)
+    playlist = tmp_path / 'movie_transcoded' / playlist_name
+    transcoder.package_stream('in.mp4', str(playlist), {'video_codec': 'libx264'}, packaging, heights=heights)
+    return commands[0], playlist
+
+
+def test_hls_ladder_master_playlist_is_the_job_output(tmp_path):
+    """FFmpeg puts the master next to the variant playlists, at the playlist path"""
+    cmd, playlist = packaging_command(tmp_path, 'hls', 'index.m3u8', heights=[720, 480])
+
+    variant_playlist = cmd[-1]
+    master = os.path.join(os.path.dirname(variant_playlist), cmd[cmd.index('-master_pl_name') + 1])
+    assert master == str(playlist)
+    assert cmd[cmd.index('-var_stream_map') + 1] == 'v:0,a:0,name:720p v:1,a:1,name:480p'
+    assert variant_playlist == str(playlist.parent / 'stream_%v.m3u8')
+    assert os.path.dirname(cmd[cmd.index('-hls_segment_filename') + 1]) == str(playlist.parent)
+
+
+def test_single_hls_stream_writes_the_playlist_path(tmp_path):
+    cmd, playlist = packaging_command(tmp_path, 'hls', 'index.m3u8')
+
+    assert cmd[-1] == str(playlist)
+    assert '-master_pl_name' not in cmd
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for buffering job progress and writing it in batches
+"""
+
+import threading
+
+from app.progress import ProgressTracker
+
+
+class Recorder:
+    """Flush callback that remembers every batch"""
+
+    def __init__(self, fail=0):
+        self.batches = []
+        self.fail = fail
+        self.flushed = threading.Event()
+
+    def __call__(self, changes, stats):
+        if self.fail:
+            self.fail -= 1
+            raise RuntimeError('database is locked')
+        self.batches.append((changes, stats))
+        self.flushed.set()
+
+
+def test_updates_are_batched_until_flush():
+    """Only the latest value of each changed job is written"""
+    flush = Recorder()
+    tracker = ProgressTracker(flush, interval=60, min_delta=5)
+    for progress in (1.0, 2.0, 3.0):
+        tracker.update(1, progress)
+    tracker.update(2, 4.0)
+    tracker.update_stats(2, {'fps': 30.0})
+    assert tracker.get(1) == 3.0
+
+    tracker.flush()
+    tracker.flush()
+
+    assert flush.batches == [({1: 3.0, 2: 4.0}, {2: {'fps': 30.0}})]
+
+
+def test_large_jump_flushes_before_the_interval():
+    flush = Recorder()
+    tracker = ProgressTracker(flush, interval=60, min_delta=5)
+    tracker.start()
+    try:
+        tracker.update(1, 1.0)
+        assert not flush.flushed.wait(0.2)
+
+        tracker.update(1, 6.0)
+        assert flush.flushed.wait(5)
+    finally:
+        tracker.stop()
+
+    assert flush.batches[0][0] == {1: 6.0}
+
+
+def test_failed_flush_is_retried():
+    flush = Recorder(fail=1)
+    tracker = ProgressTracker(flush, interval=60)
+    tracker.update(1, 10.0)
+
+    tracker.flush()
+    assert flush.batches == []
+    tracker.flush()
+
+    assert flush.batches == [({1: 10.0}, {})]
+
+
+def test_finished_jobs_are_not_written():
+    flush = Recorder()
+    tracker = ProgressTracker(flush, interval=60)
+    tracker.update(1, 50.0)
+    tracker.update_stats(1, {'fps': 30.0})
+
+    tracker.finish(1)
+    tracker.flush()
+
+    assert flush.batches == []
+    assert tracker.get(1) is None and tracker.get_stats(1) is None
+
+
+def test_stop_writes_what_is_left():
+    flush = Recorder()
+    tracker = ProgressTracker(flush, interval=60, min_delta=50)
+    tracker.start()
+    tracker.update(1, 1.0)
+
+    tracker.stop()
+
+    assert flush.batches == [({1: 1.0}, {})]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for answering several RAG queries in one request (/api/rag/batch)
+"""
+
+import threading
+import time
+
+import pytest
+import requests
+
+from app.rag_cache import RagCache
+from app.rag_client import RagBusy
+
+
+class FakeRag:
+    """Stands in for RagClient.query, answering with what it was asked"""
+
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, payload, timeout=None):
+        with self._lock:
+            self.calls.append((payload, timeout))
+        time.sleep(0.05)
+        if payload['query'] == 'busy':
+            raise RagBusy('All RAG connections are busy')
+        if payload['query'] == 'slow':
+            raise requests.exceptions.ReadTimeout('read timed out')
+        return {'answer': payload['query'], 'top_k': payload['top_k']}
+
+
+@pytest.fixture
+def rag(webapp, monkeypatch):
+    fake = FakeRag()
+    monkeypatch.setattr(webapp.rag_client, 'query', fake)
+    monkeypatch.setattr(webapp, 'rag_cache', RagCache(max_entries=16, ttl=60))
+    return fake
+
+
+@pytest.fixture
+def client(webapp):
+    return webapp.app.test_client()
+
+
+def test_items_use_the_batch_parameters_unless_they_set_their_own(client, rag):
+    response = client.post('/api/rag/batch', json={
+        'queries': ['first', {'query': 'second', 'top_k': 7}],
+        'top_k': 2,
+        'temperature': 0.5,
+        'timeout': 10
+    })
+
+    assert response.status_code == 200
+    assert response.json == {
+        'results': [
+            {'answer': {'answer': 'first', 'top_k': 2}},
+            {'answer': {'answer': 'second', 'top_k': 7}}
+        ],
+        'succeeded': 2,
+        'failed': 0
+    }
+    assert sorted((payload['query'], payload['temperature'], timeout) for payload, timeout in rag.calls) == [
+        ('first', 0.5, 10.0), ('second', 0.5, 10.0)
+    ]
+
+
+def test_failed_items_do_not_fail_the_batch(client, rag):
+    """Each bad or failed item gets an error entry with the status it would have had alone"""
+    response = client.post('/api/rag/batch', json={
+        'queries': ['fine', {'top_k': 3}, {'query': 'bad', 'top_k': 'abc'}, 'busy', 'slow']
+    })
+
+    assert response.status_code == 200
+    results = response.json['results']
+    assert results[0] == {'answer': {'answer': 'fine', 'top_k': 3}}
+    assert results[1] == {'error': 'Query is required', 'status_code': 400}
+    assert results[2] == {'error': 'top_k and temperature must be numbers', 'status_code': 400}
+    assert (results[3]['error'], results[3]['status_code']) == ('RAG service busy', 503)
+    assert (results[4]['error'], results[4]['status_code']) == ('RAG service timeout', 504)
+    assert (response.json['succeeded'], response.json['failed']) == (1, 4)
+    # Invalid items never reach the service
+    assert sorted(payload['query'] for payload, _ in rag.calls) == ['busy', 'fine', 'slow']
+
+
+def test_identical_queries_reach_the_service_once(client, rag):
+    response = client.post('/api/rag/batch', json={'queries': ['What is yoga?', 'what is  yoga', 'What is yoga?']})
+
+    assert response.json['succeeded'] == 3
+    assert len(rag.calls) == 1
+
+    response = client.post('/api/rag/batch', json={'queries': ['What is yoga?'], 'cache': False})
+    assert len(rag.calls) == 2
+
+
+def test_invalid_batches_are_rejected(webapp, client, rag, monkeypatch):
+    monkeypatch.setitem(webapp.app.config, 'RAG_BATCH_MAX_ITEMS', 2)
+
+    for body in ({}, {'queries': []}, {'queries': 'yoga'}, {'queries': ['a', 'b', 'c']},
+                 {'queries': ['a'], 'timeout': 'soon'}):
+        response = client.post('/api/rag/batch', json=body)
+        assert response.status_code == 400, body
+        assert 'error' in response.json
+
+    assert rag.calls == []
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tests for the RAG answer cache and query coalescing
+"""
+
+import threading
+import time
+
+from app import rag_cache
+from app.rag_cache import RagCache, normalize_query, rag_cache_key
+
+
+def answer(cache, key, body=b'{}'):
+    """Answer a query as the leader would"""
+    state, flight = cache.claim(key)
+    assert state == 'leader'
+    cache.finish(key, flight, body, 'application/json')
+
+
+def test_equivalent_queries_share_a_key():
+    """Case, spacing and trailing punctuation do not change the key"""
+    assert normalize_query('  What is  Yoga?? ') == 'what is yoga'
+    assert rag_cache_key({'query': 'What is Yoga?', 'top_k': 3}) == rag_cache_key({'query': 'what is yoga', 'top_k': '3'})
+    assert rag_cache_key({'query': 'yoga', 'top_k': 3}) != rag_cache_key({'query': 'yoga', 'top_k': 5})
+    assert rag_cache_key({'query': 'yoga', 'use_rag': True}) != rag_cache_key({'query': 'yoga', 'use_rag': False})
+
+
+def test_hit_after_finish():
+    cache = RagCache(max_entries=4, ttl=60)
+    answer(cache, 'a', b'{"answer": 1}')
+
+    state, entry = cache.claim('a')
+
+    assert state == 'hit'
+    assert entry['body'] == b'{"answer": 1}'
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'coalesced': 0}
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rag_cache.time, 'monotonic', lambda: now[0])
+    cache = RagCache(max_entries=4, ttl=10)
+    answer(cache, 'a')
+
+    now[0] += 11
+    state, _ = cache.claim('a')
+
+    assert state == 'leader'
+    assert cache.stats()['entries'] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = RagCache(max_entries=2, ttl=60)
+    answer(cache, 'a')
+    answer(cache, 'b')
+    assert cache.claim('a')[0] == 'hit'
+
+    answer(cache, 'c')
+
+    assert cache.claim('a')[0] == 'hit'
+    assert cache.claim('b')[0] == 'leader'
+
+
+def test_identical_queries_wait_for_the_leader():
+    """Followers get the leader's answer without asking the service themselves"""
+    cache = RagCache(max_entries=4, ttl=60)
+    state, flight = cache.claim('a')
+    assert state == 'leader'
+
+    results = []
+
+    def follow():
+        state, waiting = cache.claim('a')
+        results.append((state, waiting.wait(5)))
+
+    followers = [threading.Thread(target=follow) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while cache.stats()['coalesced'] < 3:
+        time.sleep(0.01)
+    cache.finish('a', flight, b'shared', 'application/json')
+    for thread in followers:
+        thread.join()
+
+    assert [(state, entry['body']) for state, entry in results] == [('follower', b'shared')] * 3
+    assert cache.stats()['misses'] == 1
+
+
+def test_abandoned_flight_releases_followers():
+    """When the leader fails, followers get nothing and the next caller leads"""
+    cache = RagCache(max_entries=4, ttl=60)
+    _, flight = cache.claim('a')
+    state, waiting = cache.claim('a')
+    assert state == 'follower'
+
+    cache.abandon('a', flight)
+
+    assert waiting.wait(1) is None
+    assert cache.claim('a')[0] == 'leader'
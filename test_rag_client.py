@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled RAG client against mock_rag_service.py
+
+The mock service runs in a background thread on a free port, with its
+simulated processing time shortened so the tests stay quick.
+"""
+
+import json
+import threading
+
+import requests
+
+import pytest
+from werkzeug.serving import make_server
+
+import mock_rag_service
+from app.circuit_breaker import LatencyTracker
+from app.rag_client import RagBusy, RagClient
+
+PAYLOAD = {'query': 'What is quantum computing?', 'top_k': 2, 'use_rag': True}
+
+# Seconds the mock service takes to answer
+DELAY = {'seconds': 0.2}
+
+
+@pytest.fixture(scope='module')
+def rag_url():
+    patch = pytest.MonkeyPatch()
+    patch.setattr(mock_rag_service.random, 'uniform', lambda low, high: DELAY['seconds'])
+    server = make_server('127.0.0.1', 0, mock_rag_service.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/api/query'
+    server.shutdown()
+    thread.join()
+    patch.undo()
+
+
+def connections_opened(client):
+    """Connections the client's pool has opened to the service so far"""
+    adapter = client.session.get_adapter(client.url)
+    return adapter.poolmanager.connection_from_url(client.url).num_connections
+
+
+def test_queries_reuse_one_connection(rag_url):
+    """Calls one after another share a single keep-alive connection"""
+    client = RagClient(rag_url, max_concurrent=2)
+
+    for _ in range(3):
+        answer = client.query(PAYLOAD)
+        assert answer['query'] == PAYLOAD['query']
+        assert answer['sources'] == ['document_1.pdf', 'document_2.pdf']
+
+    assert connections_opened(client) == 1
+    assert client.active_count() == 0
+
+
+def test_calls_beyond_the_cap_are_refused(rag_url):
+    """With every slot taken, a call fails with RagBusy after queue_timeout"""
+    client = RagClient(rag_url, max_concurrent=2, queue_timeout=0.2)
+    streams = [client.open(PAYLOAD), client.open(PAYLOAD)]
+    assert client.active_count() == 2
+
+    with pytest.raises(RagBusy):
+        client.query(PAYLOAD)
+
+    # Closing a stream frees its slot
+    streams[0].close()
+    assert client.query(PAYLOAD)['query'] == PAYLOAD['query']
+    streams[1].close()
+    assert client.active_count() == 0
+
+
+def test_waiting_calls_run_when_a_slot_frees(rag_url):
+    """Concurrent calls queue for a slot instead of failing"""
+    client = RagClient(rag_url, max_concurrent=2, queue_timeout=5.0)
+    answers = []
+
+    def ask():
+        answers.append(client.query(PAYLOAD))
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(answers) == 4
+    assert connections_opened(client) <= 2
+
+
+def test_stream_relays_the_body_in_chunks(rag_url):
+    """Iterating a stream yields the upstream body and frees the slot at the end"""
+    client = RagClient(rag_url, max_concurrent=1, chunk_size=64)
+    stream = client.open(PAYLOAD)
+    assert stream.status_code == 200
+    assert stream.content_type == 'application/json'
+
+    chunks = list(stream)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 64 for chunk in chunks)
+    assert json.loads(b''.join(chunks))['answer'] == mock_rag_service.SAMPLE_RESPONSES['quantum']
+    assert client.active_count() == 0
+
+
+def test_timeout_grows_back_when_the_service_slows_down(rag_url):
+    """Calls that time out widen the learned timeout until answers fit again"""
+    tracker = LatencyTracker(maximum=10.0, minimum=0.05, multiplier=1.5, window=10, min_samples=3)
+    client = RagClient(rag_url, latency=tracker)
+    for _ in range(3):
+        client.query(PAYLOAD)
+    learned = tracker.timeout()
+    assert learned < 0.6
+
+    DELAY['seconds'] = 0.6
+    timeouts = 0
+    try:
+        for _ in range(10):
+            try:
+                client.query(PAYLOAD)
+                break
+            except requests.exceptions.ReadTimeout:
+                timeouts += 1
+        else:
+            pytest.fail('the client never recovered')
+    finally:
+        DELAY['seconds'] = 0.2
+
+    assert timeouts >= 1
+    assert tracker.timeout() > learned
+
+
+def test_stream_latency_covers_the_whole_answer(rag_url):
+    """A streamed call is timed when its body has been read, not at the headers"""
+    tracker = LatencyTracker(maximum=10.0, min_samples=1)
+    client = RagClient(rag_url, latency=tracker)
+
+    stream = client.open(PAYLOAD)
+    assert tracker.latency() is None
+    stream.read()
+
+    assert tracker.latency() >= 0.2
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the job scheduler's worker slots, limit and maintenance hook
+"""
+
+import threading
+import time
+
+import pytest
+
+from app.scheduler import JobScheduler
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            pytest.fail('condition not reached in time')
+        time.sleep(0.01)
+
+
+class FakeQueue:
+    """Jobs waiting to be claimed, honouring the scheduler's limit like app.py does"""
+
+    def __init__(self):
+        self.jobs = []
+        self.scheduler = None
+        self._lock = threading.Lock()
+
+    def add(self, *job_ids):
+        with self._lock:
+            self.jobs.extend(job_ids)
+
+    def claim(self):
+        if self.scheduler.active_count() >= self.scheduler.concurrency():
+            return None
+        with self._lock:
+            return self.jobs.pop(0) if self.jobs else None
+
+
+@pytest.fixture
+def queue():
+    return FakeQueue()
+
+
+def make_scheduler(queue, run_job, **kwargs):
+    # A long poll interval so workers only react to wakeups
+    scheduler = JobScheduler(queue.claim, run_job, poll_interval=60, **kwargs)
+    queue.scheduler = scheduler
+    return scheduler
+
+
+def test_notify_runs_queued_jobs(queue):
+    ran = []
+    scheduler = make_scheduler(queue, ran.append, slots=2)
+    scheduler.start()
+    try:
+        queue.add(1, 2, 3)
+        scheduler.notify()
+        wait_until(lambda: len(ran) == 3)
+    finally:
+        scheduler.stop()
+
+    assert sorted(ran) == [1, 2, 3]
+    assert scheduler.active_count() == 0
+
+
+def test_concurrency_stays_within_the_slots(queue):
+    scheduler = make_scheduler(queue, lambda job_id: None, slots=4)
+    assert scheduler.concurrency() == 4
+
+    scheduler.set_limit(2)
+    assert scheduler.concurrency() == 2
+    scheduler.set_limit(10)
+    assert scheduler.concurrency() == 4
+    scheduler.set_limit(0)
+    assert scheduler.concurrency() == 1
+
+
+def test_raising_the_limit_wakes_idle_workers(queue):
+    release = threading.Event()
+    scheduler = make_scheduler(queue, lambda job_id: release.wait(5), slots=3)
+    scheduler.set_limit(1)
+    scheduler.start()
+    try:
+        queue.add(1, 2, 3)
+        scheduler.notify(3)
+        wait_until(lambda: scheduler.active_count() == 1)
+        time.sleep(0.1)
+        assert scheduler.active_count() == 1
+
+        scheduler.set_limit(3)
+        wait_until(lambda: scheduler.active_count() == 3)
+    finally:
+        release.set()
+        scheduler.stop()
+
+
+def test_maintenance_sees_running_jobs_and_can_wake_workers(queue):
+    """A truthy maintenance result (jobs were re-queued) makes idle workers claim"""
+    release = threading.Event()
+    seen = []
+
+    def maintenance(active_jobs):
+        seen.append(active_jobs)
+        if len(seen) == 1:
+            queue.add(7)
+            return True
+        return False
+
+    scheduler = make_scheduler(queue, lambda job_id: release.wait(5), slots=2,
+                               maintenance=maintenance, maintenance_interval=0.05)
+    scheduler.start()
+    try:
+        wait_until(lambda: {7} in seen)
+    finally:
+        release.set()
+        scheduler.stop()
+
+
+def test_stop_waits_for_running_jobs(queue):
+    started = threading.Event()
+    release = threading.Event()
+
+    def run_job(job_id):
+        started.set()
+        release.wait(5)
+
+    scheduler = make_scheduler(queue, run_job, slots=1)
+    scheduler.start()
+    queue.add(1)
+    scheduler.notify()
+    assert started.wait(5)
+
+    stopper = threading.Thread(target=scheduler.stop)
+    stopper.start()
+    stopper.join(0.2)
+    assert stopper.is_alive()
+
+    release.set()
+    stopper.join(5)
+    assert not stopper.is_alive()
+    assert not scheduler.is_running()
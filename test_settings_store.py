@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory settings copy and its version check
+"""
+
+import pytest
+
+from app import settings_store
+from app.settings_store import VERSION_KEY, SettingsStore
+
+
+class FakeTable:
+    """Settings rows shared by several stores, counting reads"""
+
+    def __init__(self, **rows):
+        self.rows = dict(rows)
+        self.loads = 0
+        self.version_reads = 0
+
+    def load(self):
+        self.loads += 1
+        return dict(self.rows)
+
+    def read_version(self):
+        self.version_reads += 1
+        return self.rows.get(VERSION_KEY)
+
+    def save(self, raw_values):
+        self.rows.update(raw_values)
+
+    def store(self, check_interval=2.0):
+        return SettingsStore(self.load, self.read_version, self.save, check_interval=check_interval)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(settings_store.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_reads_are_served_from_memory(clock):
+    table = FakeTable(crf='20', watch_enabled='true')
+    store = table.store()
+
+    assert store.get('crf') == 20
+    assert store.get('watch_enabled') is True
+    assert store.get('preset') == 'medium'
+    clock[0] += 1
+    assert store.all()['crf'] == 20
+
+    assert (table.loads, table.version_reads) == (1, 0)
+
+
+def test_unchanged_version_does_not_reload(clock):
+    table = FakeTable(crf='20', **{VERSION_KEY: 'v1'})
+    store = table.store()
+    store.get('crf')
+
+    clock[0] += 3
+    store.get('crf')
+
+    assert (table.loads, table.version_reads) == (1, 1)
+
+
+def test_write_from_another_process_is_picked_up(clock):
+    """A new version makes the other store reload once its check interval passed"""
+    table = FakeTable(crf='20')
+    first, second = table.store(), table.store()
+    assert second.get('crf') == 20
+
+    first.update({'crf': 28})
+    assert first.get('crf') == 28
+    assert second.get('crf') == 20
+
+    clock[0] += 3
+    assert second.get('crf') == 28
+    assert table.rows[VERSION_KEY] == second.version
+
+
+def test_update_writes_one_batch_with_a_new_version(clock):
+    table = FakeTable()
+    store = table.store()
+    store.get('crf')
+
+    store.update({'crf': 30, 'watch_enabled': False})
+    version = table.rows[VERSION_KEY]
+    store.update({'preset': 'fast'})
+
+    assert table.rows[VERSION_KEY] != version
+    assert (table.rows['crf'], table.rows['watch_enabled']) == ('30', 'false')
+    # The writer's own copy is current without reloading
+    assert store.all()['preset'] == 'fast'
+    assert table.loads == 1
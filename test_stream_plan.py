@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Tests for deciding which streams are copied instead of encoded
+"""
+
+from app.stream_plan import plan_streams
+
+SETTINGS = {
+    'video_codec': 'libx264',
+    'audio_codec': 'aac',
+    'passthrough': True,
+    'max_video_bitrate': 8000,
+    'max_audio_bitrate': 320
+}
+
+
+def make_info(**video):
+    return {
+        'duration': 10.0,
+        'bitrate': 5000000,
+        'video': {'codec': 'h264', 'height': 1080, 'bitrate': 4000000, 'pix_fmt': 'yuv420p', **video},
+        'audio': {'codec': 'aac', 'bitrate': 128000}
+    }
+
+
+def test_matching_streams_are_copied():
+    """A source already in the target codecs is only remuxed"""
+    plan = plan_streams(make_info(), SETTINGS, 'out.mp4')
+
+    assert (plan.video, plan.audio, plan.mode) == ('copy', 'copy', 'remux')
+    assert plan.reasons == []
+
+
+def test_failed_probe_encodes_everything():
+    """Without probe info nothing is assumed to be copyable"""
+    for info in (None, {}):
+        plan = plan_streams(info, SETTINGS, 'out.mp4')
+        assert (plan.video, plan.audio, plan.mode) == ('encode', 'encode', 'encode')
+        assert plan.reasons == ['source could not be probed']
+
+
+def test_passthrough_disabled_encodes():
+    plan = plan_streams(make_info(), {**SETTINGS, 'passthrough': False}, 'out.mp4')
+
+    assert (plan.video, plan.audio) == ('encode', 'encode')
+
+
+def test_bitrate_limits():
+    """Streams above the cap, or of unknown bitrate, are encoded"""
+    high = plan_streams(make_info(bitrate=12000000), SETTINGS, 'out.mp4')
+    assert high.video == 'encode'
+    assert high.reasons == ['video bitrate 12000k is above 8000k']
+
+    unknown = make_info(bitrate=0)
+    del unknown['bitrate']
+    plan = plan_streams(unknown, SETTINGS, 'out.mp4')
+    assert plan.video == 'encode'
+    assert plan.reasons == ['video bitrate is unknown']
+
+    # Containers that only report the overall bitrate use that instead
+    assert plan_streams(make_info(bitrate=0), SETTINGS, 'out.mp4').video == 'copy'
+
+
+def test_codec_container_and_pixel_format_checks():
+    assert plan_streams(make_info(codec='hevc'), SETTINGS, 'out.mp4').video == 'encode'
+    assert plan_streams(make_info(), SETTINGS, 'out.webm').video == 'encode'
+    assert plan_streams(make_info(pix_fmt='yuv422p10le'), SETTINGS, 'out.mp4').video == 'encode'
+    assert plan_streams(make_info(height=2160), {**SETTINGS, 'max_height': 1080}, 'out.mp4').video == 'encode'
+
+
+def test_missing_stream_and_explicit_copy():
+    """A stream the probe says is absent is 'none'; codec 'copy' always copies"""
+    info = make_info()
+    del info['audio']
+    assert plan_streams(info, SETTINGS, 'out.mp4').audio == 'none'
+
+    plan = plan_streams(None, {**SETTINGS, 'video_codec': 'copy'}, 'out.mp4')
+    assert (plan.video, plan.audio) == ('copy', 'encode')
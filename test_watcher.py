@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for holding new files until they have finished copying
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from app import watcher
+from app.watcher import FileSettler, VideoFileHandler
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(watcher.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_file_is_dispatched_once_it_stops_changing(tmp_path, clock):
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'x' * 10)
+    handled = []
+    settler = FileSettler(handled.append, settle_time=5)
+    settler.track(str(video))
+
+    settler.poll()
+    clock[0] += 3
+    with open(video, 'ab') as f:
+        f.write(b'x' * 10)
+    settler.poll()
+    clock[0] += 3
+    settler.poll()
+    assert handled == []
+
+    clock[0] += 3
+    settler.poll()
+
+    assert handled == [str(video)]
+    assert settler.pending == {}
+
+
+def test_closed_file_needs_one_unchanged_poll(tmp_path, clock):
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'x')
+    handled = []
+    settler = FileSettler(handled.append, settle_time=60)
+    settler.track(str(video), closed=True)
+
+    settler.poll()
+    assert handled == []
+    settler.poll()
+
+    assert handled == [str(video)]
+
+
+def test_missing_and_forgotten_files_are_dropped(tmp_path, clock):
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'x')
+    handled = []
+    settler = FileSettler(handled.append, settle_time=0)
+    settler.track(str(tmp_path / 'gone.mp4'))
+    settler.track(str(video))
+    settler.forget(str(video))
+
+    settler.poll()
+    settler.poll()
+
+    assert handled == []
+    assert settler.pending == {}
+
+
+def test_callback_errors_do_not_stop_other_files(tmp_path, clock):
+    paths = []
+    for name in ('a.mp4', 'b.mp4'):
+        (tmp_path / name).write_bytes(b'x')
+        paths.append(str(tmp_path / name))
+    handled = []
+
+    def callback(path):
+        handled.append(path)
+        raise RuntimeError('queue is full')
+
+    settler = FileSettler(callback, settle_time=0)
+    for path in paths:
+        settler.track(path, closed=True)
+    settler.poll()
+    settler.poll()
+
+    assert sorted(handled) == paths
+
+
+def test_handler_tracks_video_files_only():
+    """A rename at the end of an atomic copy moves the tracking to the new name"""
+    settler = FileSettler(lambda path: None)
+    handler = VideoFileHandler(settler)
+
+    handler.on_created(SimpleNamespace(is_directory=False, src_path='/in/notes.txt'))
+    handler.on_created(SimpleNamespace(is_directory=False, src_path='/in/.a.mp4.part'))
+    handler.on_moved(SimpleNamespace(is_directory=False, src_path='/in/.a.mp4.part', dest_path='/in/a.mp4'))
+    handler.on_closed(SimpleNamespace(is_directory=False, src_path='/in/a.mp4'))
+
+    assert list(settler.pending) == ['/in/a.mp4']
+    assert settler.pending['/in/a.mp4']['closed']